@@ -1,43 +1,103 @@
 from django.contrib import admin
-from .models import UserProfile, SkillCategory, Skill, Project, Education, WorkExperience
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from .models import (
+    UserProfile, SkillCategory, Skill, Project, Education, WorkExperience,
+    GitHubRepository, GitHubCommitStats, QiitaArticle
+)
+
+# 大量の行がある前提の設定
+# - 一覧の外部キーは list_select_related でまとめて取得する
+# - show_full_result_count=False で絞り込み時の全件 COUNT(*) を行わず、絞り込みのない一覧は推定件数を使う
+# - 検索は本文（bio/description）の部分一致ではなく、前方一致（^）・完全一致（=）に限定する
+# - 関連の選択は全件を読み込む filter_horizontal / セレクトボックスではなく autocomplete を使う
+# - 既定の並び順は主キーの降順にする（モデルの ordering はユーザーごとのインデックスしかなく、全件の並べ替えになる）
+
+
+class EstimatedCountPaginator(Paginator):
+    """絞り込みのない一覧では COUNT(*) の代わりに PostgreSQL の統計情報による推定件数を使う"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            # 一度もANALYZEされていないテーブルは -1 になるため通常の件数取得にする
+            if row and row[0] >= 0:
+                return row[0]
+        return super().count
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+    show_full_result_count = False
+    ordering = ('-pk',)
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(ScalableModelAdmin):
     list_display = ('display_name', 'user', 'title', 'portfolio_slug', 'created_at')
-    search_fields = ('display_name', 'user__username', 'title', 'bio', 'specialty')
+    search_fields = ('=portfolio_slug', '^display_name', '^user__username', '=user__email')
     readonly_fields = ('created_at', 'updated_at')
     list_filter = ('created_at', 'updated_at')
 
 @admin.register(SkillCategory)
-class SkillCategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'order')
-    ordering = ('order', 'name')
+class SkillCategoryAdmin(ScalableModelAdmin):
+    list_display = ('name', 'user', 'order')
+    search_fields = ('^name', '^user__username')
 
 @admin.register(Skill)
-class SkillAdmin(admin.ModelAdmin):
+class SkillAdmin(ScalableModelAdmin):
     list_display = ('name', 'user', 'category', 'level', 'experience_years')
-    list_filter = ('category', 'level')
-    search_fields = ('name', 'user__display_name', 'description')
-    ordering = ('category', 'order', 'name')
+    list_select_related = ('user', 'category')
+    # カテゴリはユーザーごとに作られるため、絞り込みの選択肢にすると全件を読み込んでしまう
+    list_filter = ('level',)
+    search_fields = ('^name', '^user__display_name')
+    autocomplete_fields = ('user', 'category')
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(ScalableModelAdmin):
     list_display = ('title', 'user', 'is_featured', 'start_date', 'end_date')
     list_filter = ('is_featured', 'start_date', 'end_date')
-    search_fields = ('title', 'description', 'user__display_name')
+    search_fields = ('^title', '^user__display_name')
     readonly_fields = ('created_at', 'updated_at')
-    filter_horizontal = ('technologies_used',)
+    autocomplete_fields = ('user', 'technologies_used')
 
 @admin.register(Education)
-class EducationAdmin(admin.ModelAdmin):
-    list_display = ('institution', 'start_date', 'end_date', 'is_visible')
+class EducationAdmin(ScalableModelAdmin):
+    list_display = ('institution', 'user', 'start_date', 'end_date', 'is_visible')
     list_filter = ('is_visible',)
-    search_fields = ('institution', 'description')
-    ordering = ('-end_date', '-start_date')
+    search_fields = ('^institution', '^user__display_name')
 
 @admin.register(WorkExperience)
-class WorkExperienceAdmin(admin.ModelAdmin):
+class WorkExperienceAdmin(ScalableModelAdmin):
     list_display = ('position', 'company', 'user', 'start_date', 'end_date', 'current')
     list_filter = ('start_date', 'end_date', 'current')
-    search_fields = ('company', 'position', 'description', 'user__display_name')
-    filter_horizontal = ('skills_used',)
+    search_fields = ('^company', '^position', '^user__display_name')
+    autocomplete_fields = ('user', 'skills_used')
+
+@admin.register(GitHubRepository)
+class GitHubRepositoryAdmin(ScalableModelAdmin):
+    list_display = ('full_name', 'user', 'language', 'stargazers_count', 'featured', 'is_private', 'pushed_at')
+    list_filter = ('featured', 'is_private', 'is_fork')
+    search_fields = ('^full_name', '^user__display_name')
+
+@admin.register(GitHubCommitStats)
+class GitHubCommitStatsAdmin(ScalableModelAdmin):
+    list_display = ('user', 'commit_count_total', 'commit_count_last_year', 'last_updated')
+    search_fields = ('^user__display_name',)
+    readonly_fields = ('last_updated',)
+
+@admin.register(QiitaArticle)
+class QiitaArticleAdmin(ScalableModelAdmin):
+    list_display = ('title', 'user', 'likes_count', 'stocks_count', 'is_featured', 'created_at')
+    list_filter = ('is_featured',)
+    search_fields = ('=article_id', '^title', '^user__display_name')
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+        from PIL import Image
+
+        from . import signals  # noqa: F401
+        from .timing import instrument_serializers
+
+        # シリアライザの評価時間をリクエストの計測（api/timing.py）に含める
+        instrument_serializers()
+
+        # 画素数の多い画像（解凍爆弾）をヘッダーを読んだ時点で拒否する
+        Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
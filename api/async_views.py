@@ -0,0 +1,154 @@
+"""
+非同期版のビュー（ASGI で uvicorn ワーカーを使う場合に ASYNC_VIEWS で有効にする）
+
+DRF 3.14 のビューは非同期に対応していないため、認証・レート制限・シリアライズは同期版と同じクラスを
+sync_to_async で呼び出し、DBの読み込みは非同期ORM、外部APIの呼び出しは httpx の非同期クライアントで行う。
+外部APIの応答を待つ間もイベントループは他のリクエストを処理できるため、応答の遅い連携先があっても
+ワーカー数（スレッド数）で同時に処理できるリクエスト数が頭打ちにならない。
+"""
+import json
+import math
+from functools import wraps
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedTokenAuthentication
+from .integrations import (
+    UpstreamError, fetch_github_data, fetch_qiita_articles,
+    save_commit_stats, save_github_repositories, save_qiita_articles,
+)
+from .metrics import track_sync
+from .models import UserProfile
+from .serializers import UserProfilePublicSerializer
+from .throttling import AnonReadThrottle, SyncThrottle, async_limit_concurrent_syncs
+from .views import PublicProfileView
+
+
+def _json(data, status=status.HTTP_200_OK, headers=None):
+    return JsonResponse(data, status=status, headers=headers, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+def _authenticate(request):
+    """トークン認証を行い request.user を設定する（トークンがなければ匿名ユーザー）"""
+    result = CachedTokenAuthentication().authenticate(request)
+    request.user = result[0] if result else AnonymousUser()
+
+
+def _throttle(request, throttle_class):
+    """レート制限を超えていれば Retry-After（秒）を、超えていなければ None を返す"""
+    throttle = throttle_class()
+    if throttle.allow_request(request, None):
+        return None
+    return math.ceil(throttle.wait())
+
+
+def _error(detail, status):
+    """DRF の例外と同じ {'detail': ...} 形式のエラー"""
+    return _json({'detail': detail}, status)
+
+
+def async_api_view(throttle_class, authenticated=False):
+    """
+    トークン認証とレート制限を行い、同期版のDRFのビューと同じ形式のエラーを返すデコレータ
+
+    外部APIへの接続・タイムアウトの失敗（httpx.HTTPError）と、JSONでない応答は 502 にする。
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                await sync_to_async(_authenticate)(request)
+            except AuthenticationFailed as e:
+                return _error(str(e.detail), status.HTTP_401_UNAUTHORIZED)
+            if authenticated and not request.user.is_authenticated:
+                return _error('認証情報が含まれていません。', status.HTTP_401_UNAUTHORIZED)
+
+            wait = await sync_to_async(_throttle)(request, throttle_class)
+            if wait is not None:
+                return _json(
+                    {'detail': f'リクエストの処理は絞られました。{wait}秒後に再度お試しください。'},
+                    status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(wait)}
+                )
+            try:
+                return await view_func(request, *args, **kwargs)
+            except httpx.HTTPError as e:
+                return _error(f'外部APIの呼び出し中にエラーが発生しました: {e}', status.HTTP_502_BAD_GATEWAY)
+            except json.JSONDecodeError:
+                return _error('外部APIの応答を解析できませんでした。', status.HTTP_502_BAD_GATEWAY)
+        return wrapper
+    return decorator
+
+
+@require_GET
+@async_api_view(AnonReadThrottle)
+async def public_profile(request, slug):
+    """公開プロフィール（PublicProfileView の非同期版）"""
+    try:
+        profile = await PublicProfileView().get_queryset().aget(portfolio_slug=slug)
+    except UserProfile.DoesNotExist:
+        return _error('見つかりませんでした。', status.HTTP_404_NOT_FOUND)
+
+    serializer = UserProfilePublicSerializer(profile, context={'request': request})
+    return _json(await sync_to_async(lambda: serializer.data)())
+
+
+async def _get_profile(request):
+    return await UserProfile.objects.filter(user_id=request.user.pk).afirst()
+
+
+@csrf_exempt
+@require_POST
+@async_api_view(SyncThrottle, authenticated=True)
+@track_sync('github')
+@async_limit_concurrent_syncs
+async def github_sync(request):
+    """GitHubからリポジトリ情報を同期する（GitHubRepositoryViewSet.sync の非同期版）"""
+    profile = await _get_profile(request)
+    if profile is None:
+        return _error('ユーザープロフィールが見つかりません。', status.HTTP_404_NOT_FOUND)
+    if not profile.github_username:
+        return _error(
+            'GitHubユーザー名が設定されていません。プロフィール設定画面で設定してください。', status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        repositories, total_commits = await fetch_github_data(profile)
+    except UpstreamError as e:
+        return _error(f'GitHub APIからの取得に失敗しました: {e.text}', status.HTTP_400_BAD_REQUEST)
+
+    synced = await sync_to_async(save_github_repositories)(profile, repositories)
+    await sync_to_async(save_commit_stats)(profile, total_commits)
+    return _json({'message': 'GitHubリポジトリを同期しました', 'repository_count': len(synced)})
+
+
+@csrf_exempt
+@require_POST
+@async_api_view(SyncThrottle, authenticated=True)
+@track_sync('qiita')
+@async_limit_concurrent_syncs
+async def qiita_sync(request):
+    """Qiitaから記事を同期する（QiitaArticleViewSet.sync の非同期版）"""
+    profile = await _get_profile(request)
+    if profile is None:
+        return _error('ユーザープロフィールが見つかりません。', status.HTTP_404_NOT_FOUND)
+    if not profile.qiita_username or not profile.qiita_access_token:
+        return _error('Qiitaのユーザー名とアクセストークンを設定してください。', status.HTTP_400_BAD_REQUEST)
+
+    try:
+        articles_data = await fetch_qiita_articles(profile)
+    except UpstreamError as e:
+        return _error(f'Qiita APIエラー: {e.status_code}: {e.text}', status.HTTP_400_BAD_REQUEST)
+
+    synced_count = await sync_to_async(save_qiita_articles)(profile, articles_data)
+    return _json({
+        'success': True,
+        'message': f'{synced_count}件の記事を同期しました',
+        'articles_count': synced_count,
+    })
@@ -0,0 +1,59 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .metrics import record_cache_lookup
+
+
+# キャッシュに保存するユーザーのフィールド（パスワードのハッシュなどは含めない）
+CACHED_USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def token_cache_key(key):
+    # トークンそのものをキャッシュのキーに残さない
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return f'auth-token:{digest}'
+
+
+def invalidate_tokens(keys):
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    トークン → ユーザーの対応を AUTH_TOKEN_CACHE_SECONDS の間キャッシュするトークン認証
+
+    通常の TokenAuthentication はリクエストごとに auth_token と auth_user を JOIN して読み込むが、
+    キャッシュが有効な間はDBにアクセスしない。キャッシュには CACHED_USER_FIELDS の値だけを保存し、
+    そこから組み立てたユーザーを返すため、返したユーザーを save() してはならない。トークンの削除・再発行や
+    ユーザーの無効化・パスワードなどの変更時には signals.py でキャッシュを削除する。
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        values = cache.get(cache_key)
+        record_cache_lookup('auth_token', values is not None)
+        if values is not None and values['is_active']:
+            user = User(**values)
+            user._state.adding = False
+            return (user, Token(key=key, user=user))
+
+        # 公開エンドポイントではビューの前からレプリカ読み込みが有効になっているが、発行直後のトークンが
+        # レプリカの遅延で見つからず401にならないよう、トークンは常にプライマリから読み込む
+        try:
+            token = Token.objects.using(DEFAULT_DB_ALIAS).select_related('user').get(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        user = token.user
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        values = {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+        cache.set(cache_key, values, settings.AUTH_TOKEN_CACHE_SECONDS)
+        return (user, token)
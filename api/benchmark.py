@@ -0,0 +1,318 @@
+"""
+ベンチマークの共通処理（負荷の生成と、レイテンシの集計）
+
+manage.py bench は、公開プロフィールの閲覧・ダッシュボードでの編集・トークン発行・外部APIとの同期を
+重み付けで混ぜたリクエストを、プロセス内の WSGI アプリケーション（django.test.Client）か、
+起動中のサーバー（ローカルの gunicorn など）に送り、名前ごとのレイテンシ・req/s・クエリ数を集計する。
+"""
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import date
+
+import httpx
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import Client
+from rest_framework.authtoken.models import Token
+from rest_framework.throttling import SimpleRateThrottle
+
+from .models import Project, Skill, SkillCategory, UserProfile, WorkExperience
+from .timing import parse_server_timing
+
+BENCH_USERNAME = 'bench-owner'
+BENCH_PASSWORD = 'bench-password'
+BENCH_SLUG = 'bench'
+
+# 操作の種類ごとの既定の重み（公開ページの閲覧が大半を占める想定）
+DEFAULT_MIX = {'public': 60, 'dashboard': 25, 'auth': 10, 'sync': 5}
+
+
+def percentile(sorted_values, fraction):
+    """昇順に並んだ値の百分位数（最近傍法）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, statuses):
+    """レイテンシ（秒）のリスト・全体の所要時間・ステータスコードの集計から結果の辞書を作る"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'elapsed_seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+        'statuses': {str(code): count for code, count in sorted(Counter(statuses).items())},
+    }
+
+
+async def run_http_load(base_url, requests, concurrency, timeout=120):
+    """
+    (メソッド, パス, ヘッダー) のリストを concurrency 件ずつ並行して送り、集計結果を返す
+
+    接続の確立やタイムアウトで失敗したリクエストはステータス 0 として数える。
+    """
+    latencies = []
+    statuses = []
+    pending = iter(requests)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            for method, path, headers in pending:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, headers=headers)
+                    statuses.append(response.status_code)
+                except httpx.HTTPError:
+                    statuses.append(0)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, statuses)
+
+
+def prepare_fixture(skills=10, projects=10):
+    """ベンチマーク用のユーザー（bench-owner）とポートフォリオを用意し、操作に使う値を返す（既にあれば再利用する）"""
+    user, created = User.objects.get_or_create(username=BENCH_USERNAME)
+    if created:
+        user.set_password(BENCH_PASSWORD)
+        user.save(update_fields=['password'])
+    profile = UserProfile.objects.get(user=user)
+    UserProfile.objects.filter(pk=profile.pk).update(
+        portfolio_slug=BENCH_SLUG, display_name='ベンチマーク', title='バックエンドエンジニア',
+        github_username=BENCH_USERNAME, qiita_username=BENCH_USERNAME, qiita_access_token='bench'
+    )
+
+    if not Skill.objects.filter(user=profile).exists():
+        category = SkillCategory.objects.create(name='言語', user=user)
+        for index in range(skills):
+            Skill.objects.create(user=profile, category=category, name=f'スキル{index}', level=1 + index % 5)
+    skill_ids = list(Skill.objects.filter(user=profile).order_by('id').values_list('id', flat=True))
+    if not Project.objects.filter(user=profile).exists():
+        for index in range(projects):
+            project = Project.objects.create(user=profile, title=f'プロジェクト{index}', description='説明' * 50, order=index)
+            project.technologies_used.set(skill_ids[index % len(skill_ids):][:3])
+        for index in range(3):
+            WorkExperience.objects.create(
+                user=profile, position='エンジニア', start_date=date(2015 + index, 4, 1), description='業務内容' * 30,
+                languages_used=['Python', 'TypeScript'], frameworks_used=['Django', 'React'], process_roles=['設計', '実装']
+            )
+    return {
+        'slug': BENCH_SLUG,
+        'token': Token.objects.get_or_create(user=user)[0].key,
+        'skill_ids': skill_ids,
+    }
+
+
+def _public(send, context, choice):
+    if choice < 0.6:
+        send('public-profile', 'GET', f"/api/profile/{context['slug']}/")
+    elif choice < 0.8:
+        send('public-profile-summary', 'GET', f"/api/profile/{context['slug']}/summary/")
+    else:
+        send('search', 'GET', '/api/search/?q=プロジェクト')
+
+
+def _dashboard(send, context, choice):
+    """一覧の取得・作成・更新・削除を続けて行う（作成したものは削除するため、データは増えない）"""
+    token = context['token']
+    send('projects-list', 'GET', '/api/projects/', token=token)
+    status_code, body = send('projects-create', 'POST', '/api/projects/', token=token, data={
+        'title': 'ベンチマーク', 'description': '説明', 'technologies_ids': context['skill_ids'][:3],
+    })
+    if status_code != 201:
+        return
+    path = f"/api/projects/{body['id']}/"
+    send('projects-update', 'PATCH', path, token=token, data={'title': 'ベンチマーク（更新）'})
+    send('projects-delete', 'DELETE', path, token=token)
+
+
+def _auth(send, context, choice):
+    send('api-token-auth', 'POST', '/api/api-token-auth/', data={'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+
+
+def _sync(send, context, choice):
+    if choice < 0.5:
+        send('qiita-articles-sync', 'POST', '/api/qiita-articles/sync/', token=context['token'])
+    else:
+        send('github-repositories-sync', 'POST', '/api/github-repositories/sync/', token=context['token'])
+
+
+OPERATIONS = {'public': _public, 'dashboard': _dashboard, 'auth': _auth, 'sync': _sync}
+
+
+def parse_mix(value):
+    """'public=60,dashboard=25' の形式の重みを辞書にする"""
+    mix = {}
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        if name not in OPERATIONS:
+            raise ValueError(f'不明な操作です: {name}（{", ".join(OPERATIONS)} のいずれか）')
+        mix[name] = float(weight)
+    return mix
+
+
+def build_plan(mix, count, seed):
+    """重みに従って (操作, 乱数) を count 件並べる（シードが同じなら同じ並びになる）"""
+    rng = random.Random(seed)
+    names = list(mix)
+    return [(name, rng.random()) for name in rng.choices(names, weights=[mix[name] for name in names], k=count)]
+
+
+class InProcessTarget:
+    """プロセス内の WSGI アプリケーションにリクエストを送り、リクエストごとのクエリ数も数える"""
+    counts_queries = True
+
+    def __init__(self):
+        self.client = Client()
+        self.queries = 0
+
+    def _count(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def request(self, method, path, data=None, token=None):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        self.queries = 0
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self._count))
+            response = self.client.generic(
+                method, path, json.dumps(data) if data is not None else '',
+                content_type='application/json', secure=True, headers=headers
+            )
+        return response.status_code, _json_body(response.content), self.queries
+
+
+class HttpTarget:
+    """起動中のサーバーにリクエストを送る（クエリ数はレスポンスの Server-Timing ヘッダーがあれば読み取る）"""
+    counts_queries = True
+
+    def __init__(self, base_url):
+        self.client = httpx.Client(base_url=base_url, timeout=120)
+
+    def request(self, method, path, data=None, token=None):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        response = self.client.request(method, path, json=data, headers=headers)
+        db = parse_server_timing(response.headers.get('Server-Timing')).get('db', {})
+        queries = int(db['desc'].split()[0]) if 'desc' in db else None
+        return response.status_code, _json_body(response.content), queries
+
+
+def _json_body(content):
+    try:
+        return json.loads(content) if content else None
+    except ValueError:
+        return None
+
+
+@contextmanager
+def throttles_disabled():
+    """DEFAULT_THROTTLE_RATES を一時的に無効にする（プロセス内で実行する場合だけ使える）"""
+    rates = SimpleRateThrottle.THROTTLE_RATES
+    saved = dict(rates)
+    rates.update({scope: None for scope in saved})
+    try:
+        yield
+    finally:
+        rates.update(saved)
+
+
+def run_benchmark(make_target, context, plan, concurrency=1, warmup=()):
+    """
+    計画した操作を concurrency 個のスレッドで実行し、名前ごとと全体の集計結果を返す
+
+    make_target はスレッドごとに呼び出し、リクエストを送るオブジェクトを作る。warmup の操作は計測の前に実行し、集計しない。
+    """
+    records = defaultdict(list)
+    lock = threading.Lock()
+    position = itertools.count()
+
+    target = make_target()
+    for name, choice in warmup:
+        OPERATIONS[name](lambda label, *args, **kwargs: target.request(*args, **kwargs)[:2], context, choice)
+
+    def worker(target):
+        def send(label, method, path, data=None, token=None):
+            started = time.perf_counter()
+            status_code, body, queries = target.request(method, path, data=data, token=token)
+            with lock:
+                records[label].append((time.perf_counter() - started, status_code, queries))
+            return status_code, body
+
+        while (index := next(position)) < len(plan):
+            name, choice = plan[index]
+            OPERATIONS[name](send, context, choice)
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        # プロセス内で実行する場合は呼び出し元と同じスレッド（同じDB接続）で実行する
+        worker(target)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(lambda: worker(make_target())) for _ in range(concurrency)]:
+                future.result()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {label: _summarize_records(rows, elapsed) for label, rows in sorted(records.items())}
+    total = _summarize_records([row for rows in records.values() for row in rows], elapsed)
+    return {'total': total, 'endpoints': endpoints}
+
+
+def _summarize_records(rows, elapsed):
+    result = summarize([row[0] for row in rows], elapsed, [row[1] for row in rows])
+    queries = [row[2] for row in rows if row[2] is not None]
+    result['queries_per_request'] = round(sum(queries) / len(queries), 2) if queries else None
+    result['errors'] = sum(1 for row in rows if row[1] == 0 or row[1] >= 400)
+    return result
+
+
+COMPARED_METRICS = [
+    ('latency_ms.p50', False), ('latency_ms.p95', False), ('latency_ms.p99', False),
+    ('requests_per_second', True), ('queries_per_request', False),
+]
+
+
+def _metric(result, key):
+    for part in key.split('.'):
+        result = (result or {}).get(part)
+    return result
+
+
+def compare_results(baseline, current):
+    """
+    2つの結果ファイルの内容を比べ、(名前, 指標, 基準値, 今回の値, 悪化率%) のリストを返す
+
+    悪化率は値が悪くなった方向を正とする（レイテンシ・クエリ数は増加、req/s は減少）。
+    """
+    rows = []
+    names = ['total'] + sorted(set(baseline['endpoints']) | set(current['endpoints']))
+    for name in names:
+        before = baseline['total'] if name == 'total' else baseline['endpoints'].get(name)
+        after = current['total'] if name == 'total' else current['endpoints'].get(name)
+        for key, higher_is_better in COMPARED_METRICS:
+            # 名前ごとの req/s は操作の重みで決まるため、全体の値だけを比べる
+            if key == 'requests_per_second' and name != 'total':
+                continue
+            old, new = _metric(before, key), _metric(after, key)
+            if old is None or new is None:
+                continue
+            change = ((new - old) / old * 100) if old else 0.0
+            rows.append((name, key, old, new, round(-change if higher_is_better else change, 1)))
+    return rows
@@ -0,0 +1,95 @@
+"""
+アップロードファイル（MediaBlob）の参照数の管理
+
+同じ内容のファイルは複数の行（別の利用者のスキルアイコンなど）から参照されるため、
+ファイルは直接削除せず参照数を増減し、参照数が0になったものを gc_media コマンドで削除する。
+"""
+from collections import Counter
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MediaBlob, UserProfile, Project, Skill
+
+# モデルごとのファイル項目
+MEDIA_FIELDS = {
+    UserProfile: ['profile_image', 'resume'],
+    Project: ['thumbnail'],
+    Skill: ['icon'],
+}
+
+# 縮小版のパスを保存している JSON フィールド（api/images.py）
+VARIANT_FIELDS = {
+    UserProfile: ['profile_image_variants'],
+    Project: ['thumbnail_variants'],
+    Skill: ['icon_variants'],
+}
+
+
+def variant_paths(variants):
+    """縮小版の辞書（形式 → 幅 → パス）に含まれるファイルのパスを返す"""
+    return [
+        name
+        for image_format, paths in (variants or {}).items() if image_format != 'source'
+        for name in paths.values()
+    ]
+
+
+def _file_name(value):
+    return getattr(value, 'name', value) or None
+
+
+def referenced_names(instance):
+    """インスタンスが参照しているファイルのパスを数える（読み込まれていない項目は数えない）"""
+    names = Counter()
+    values = instance.__dict__
+    for field_name in MEDIA_FIELDS[type(instance)]:
+        name = _file_name(values.get(field_name))
+        if name:
+            names[name] += 1
+    for variants_field in VARIANT_FIELDS[type(instance)]:
+        names.update(variant_paths(values.get(variants_field)))
+    return names
+
+
+def adjust_media_refs(deltas):
+    """パス → 増減数 の参照数の変化を反映する（参照数が同じ変化量のものは1回のUPDATEにまとめる）"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name) for name in deltas], ignore_conflicts=True
+    )
+    by_delta = {}
+    for name, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(name)
+    now = timezone.now()
+    for delta, names in by_delta.items():
+        MediaBlob.objects.filter(name__in=names).update(ref_count=F('ref_count') + delta, updated_at=now)
+
+
+def touch_blob(name):
+    """
+    保存済みのファイルを再利用する際に MediaBlob の更新時刻を新しくする（未登録なら参照数0で登録する）
+
+    参照数が増えるのはモデルの保存後のため、それまでの間に gc_media の猶予期間を過ぎたものとして削除されないようにする。
+    """
+    if not MediaBlob.objects.filter(name=name).update(updated_at=timezone.now()):
+        MediaBlob.objects.bulk_create([MediaBlob(name=name)], ignore_conflicts=True)
+
+
+def register_unreferenced(names):
+    """保存したが参照されなかったファイルを、参照数0として gc_media の削除対象にする"""
+    MediaBlob.objects.bulk_create([MediaBlob(name=name) for name in names], ignore_conflicts=True)
+
+
+def count_references():
+    """全モデルを走査して、実際の参照数（パス → 参照数）を数える"""
+    counts = Counter()
+    for model, field_names in MEDIA_FIELDS.items():
+        variant_fields = VARIANT_FIELDS[model]
+        for row in model.objects.values_list(*field_names, *variant_fields).iterator(chunk_size=2000):
+            counts.update(name for name in row[:len(field_names)] if name)
+            for variants in row[len(field_names):]:
+                counts.update(variant_paths(variants))
+    return counts
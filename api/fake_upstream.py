@@ -0,0 +1,143 @@
+"""
+ベンチマーク用の GitHub・Qiita API の擬似サーバー
+
+同期処理が呼び出すエンドポイントだけを、固定の遅延（応答の遅い連携先）を入れて返す。
+GITHUB_API_BASE_URL と QIITA_API_BASE_URL をこのサーバーに向けて使う（Qiita は /api/v2 を付けても付けなくてもよい）。
+"""
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+GITHUB_TIMESTAMP = '2024-01-01T00:00:00Z'
+LANGUAGES = ['Python', 'TypeScript', 'Go', 'Rust', 'JavaScript']
+
+
+def _repository(username, index):
+    return {
+        'name': f'repo-{index}',
+        'full_name': f'{username}/repo-{index}',
+        'html_url': f'https://github.com/{username}/repo-{index}',
+        'description': f'ベンチマーク用のリポジトリ {index}',
+        'language': LANGUAGES[index % len(LANGUAGES)],
+        'stargazers_count': index,
+        'forks_count': index // 2,
+        'open_issues_count': 0,
+        'watchers_count': index,
+        'created_at': GITHUB_TIMESTAMP,
+        'updated_at': GITHUB_TIMESTAMP,
+        'pushed_at': GITHUB_TIMESTAMP,
+        'fork': index % 5 == 4,
+        'private': False,
+    }
+
+
+def _article(username, index):
+    return {
+        'id': f'{username}-{index:020d}',
+        'title': f'ベンチマーク用の記事 {index}',
+        'url': f'https://qiita.com/{username}/items/{index}',
+        'likes_count': index,
+        'stocks_count': index,
+        'comments_count': 0,
+        'created_at': '2024-01-01T00:00:00+09:00',
+        'updated_at': '2024-01-01T00:00:00+09:00',
+        'tags': [{'name': 'Python'}, {'name': 'Django'}],
+        'body': f'# 記事 {index}\n\n本文',
+        'rendered_body': f'<h1>記事 {index}</h1><p>本文</p>',
+    }
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    routes = [
+        (re.compile(r'^/users/(?P<username>[^/]+)$'), 'user'),
+        (re.compile(r'^/users/(?P<username>[^/]+)/repos$'), 'repos'),
+        (re.compile(r'^/repos/(?P<owner>[^/]+)/(?P<name>[^/]+)/topics$'), 'topics'),
+        (re.compile(r'^/repos/(?P<owner>[^/]+)/(?P<name>[^/]+)/languages$'), 'languages'),
+        (re.compile(r'^/search/commits$'), 'commits'),
+        (re.compile(r'^(?:/api/v2)?/users/(?P<username>[^/]+)/items$'), 'items'),
+    ]
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        path = urlsplit(self.path).path
+        for pattern, name in self.routes:
+            match = pattern.match(path)
+            if match:
+                return self._send(200, getattr(self, f'_{name}')(**match.groupdict()), self._rate_limit_headers(name))
+        return self._send(404, {'message': 'Not Found'})
+
+    def _rate_limit_headers(self, name):
+        # 実際の API と同じヘッダーで、呼び出しのたびに減るレート制限の残り回数を返す
+        remaining = self.server.consume_rate_limit()
+        if name == 'items':
+            return {'Rate-Limit': str(self.server.rate_limit), 'Rate-Remaining': str(remaining)}
+        return {'X-RateLimit-Limit': str(self.server.rate_limit), 'X-RateLimit-Remaining': str(remaining)}
+
+    def _user(self, username):
+        return {'login': username, 'name': username, 'public_repos': self.server.repositories}
+
+    def _repos(self, username):
+        return [_repository(username, index) for index in range(self.server.repositories)]
+
+    def _topics(self, owner, name):
+        return {'names': ['benchmark', name]}
+
+    def _languages(self, owner, name):
+        return {'Python': 1000}
+
+    def _commits(self):
+        return {'total_count': 1234}
+
+    def _items(self, username):
+        return [_article(username, index) for index in range(self.server.articles)]
+
+    def _send(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+    """delay 秒の遅延を入れて応答する擬似サーバー（リクエストごとにスレッドで処理する）"""
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address=('127.0.0.1', 0), delay=0.5, repositories=10, articles=20, rate_limit=5000):
+        super().__init__(address, FakeUpstreamHandler)
+        self.delay = delay
+        self.repositories = repositories
+        self.articles = articles
+        self.rate_limit = rate_limit
+        self._calls = itertools.count(1)
+
+    def consume_rate_limit(self):
+        """呼び出し1回分を数え、レート制限の残り回数を返す（0 になったら上限に戻る）"""
+        return self.rate_limit - next(self._calls) % self.rate_limit
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """バックグラウンドのスレッドで起動し、自身を返す"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,68 @@
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+# 保存形式を示す先頭1バイトのマーカー
+_RAW_MARKER = b'r'
+_ZLIB_MARKER = b'z'
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    テキストを(任意で)zlib圧縮してバイナリとして保存するフィールド
+
+    Python側からは通常の文字列として読み書きできる。
+    圧縮の有無は settings.TEXT_COMPRESSION_ENABLED で切り替え、
+    読み込み時は先頭のマーカーで判別するため混在していても問題ない。
+    """
+    description = "Compressed text"
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if kwargs.get('editable') is True:
+            del kwargs['editable']
+        return name, path, args, kwargs
+
+    def encode(self, value):
+        """文字列を保存用のバイト列に変換する"""
+        data = value.encode('utf-8')
+        if getattr(settings, 'TEXT_COMPRESSION_ENABLED', True):
+            level = getattr(settings, 'TEXT_COMPRESSION_LEVEL', 6)
+            compressed = zlib.compress(data, level)
+            # 圧縮しても小さくならない短い本文はそのまま保存する
+            if len(compressed) < len(data):
+                return _ZLIB_MARKER + compressed
+        return _RAW_MARKER + data
+
+    def decode(self, value):
+        """保存されたバイト列を文字列に戻す"""
+        value = bytes(value)
+        if not value:
+            return ''
+        marker, payload = value[:1], value[1:]
+        if marker == _ZLIB_MARKER:
+            payload = zlib.decompress(payload)
+        return payload.decode('utf-8')
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.decode(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return self.decode(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, str):
+            value = self.encode(value)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
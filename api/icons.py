@@ -0,0 +1,56 @@
+"""
+スキルアイコンのカタログ（api/data/skill_icons.json）
+
+アイコンID → 共有のアイコン画像URLとメタデータの対応をプロセスごとに1回だけ読み込む。
+画像は SKILL_ICON_BASE_URL 以下の共通のファイルを参照するため、利用者ごとのアップロードは不要になる。
+"""
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+CATALOG_PATH = Path(__file__).resolve().parent / 'data' / 'skill_icons.json'
+
+
+@lru_cache(maxsize=None)
+def load_icon_catalog():
+    """カタログを読み込み、(バージョン, アイコンID → アイコン, 別名 → アイコンID) を返す"""
+    raw = CATALOG_PATH.read_bytes()
+    version = hashlib.sha256(raw).hexdigest()[:16]
+    icons = {}
+    aliases = {}
+    for entry in json.loads(raw)['icons']:
+        icon = {
+            'id': entry['id'],
+            'name': entry['name'],
+            'category': entry['category'],
+            'url': settings.SKILL_ICON_BASE_URL + entry['path'],
+        }
+        icons[icon['id']] = icon
+        for alias in [entry['id'], *entry.get('aliases', [])]:
+            aliases[alias.lower()] = icon['id']
+    return version, icons, aliases
+
+
+def catalog_version():
+    return load_icon_catalog()[0]
+
+
+def icon_list():
+    return list(load_icon_catalog()[1].values())
+
+
+def resolve_icon_id(icon_id):
+    """大文字小文字・別名（js → javascript など）を正規のアイコンIDに変換する（カタログにない場合は None）"""
+    if not icon_id:
+        return None
+    version, icons, aliases = load_icon_catalog()
+    return aliases.get(icon_id.strip().lower())
+
+
+def icon_url(icon_id):
+    """アイコンIDに対応する共有のアイコン画像URL（カタログにない場合は None）"""
+    resolved = resolve_icon_id(icon_id)
+    return load_icon_catalog()[1][resolved]['url'] if resolved else None
@@ -0,0 +1,148 @@
+"""
+アップロード画像の縮小版（WebP と JPEG / 透過画像は PNG）を固定の幅で生成する
+
+生成はリクエストの外（コミット後にスレッドプールのワーカー）で行い、結果は
+{"source": 元画像のパス, "webp": {"320": パス, ...}, "jpeg": {...}} の形でモデルの JSON フィールドに保存する。
+"""
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .blobs import adjust_media_refs, register_unreferenced, variant_paths
+from .models import UserProfile, Project, Skill
+
+logger = logging.getLogger(__name__)
+
+# モデルごとの (画像フィールド, 縮小版を保存するフィールド, 生成する幅)
+IMAGE_VARIANT_FIELDS = {
+    UserProfile: [('profile_image', 'profile_image_variants', (160, 320, 640))],
+    Project: [('thumbnail', 'thumbnail_variants', (320, 640, 1280))],
+    Skill: [('icon', 'icon_variants', (32, 64, 128))],
+}
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VARIANT_WORKERS, thread_name_prefix='image-variants'
+        )
+    return _executor
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    if image_format == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif image_format == 'jpeg':
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def build_variants(file, widths):
+    """画像ファイルから縮小版を作成して保存し、形式 → 幅 → パスの辞書を返す（元画像より大きくはしない）"""
+    storage = file.storage
+    directory, filename = os.path.split(file.name)
+    stem = os.path.splitext(filename)[0]
+
+    with storage.open(file.name, 'rb') as source, Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened)
+        fallback = 'png' if _has_alpha(image) else 'jpeg'
+        image = image.convert('RGBA' if fallback == 'png' else 'RGB')
+
+        variants = {'webp': {}, fallback: {}}
+        for width in sorted({min(width, image.width) for width in widths}):
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for image_format in variants:
+                name = os.path.join(directory, 'variants', f'{stem}-{width}w.{image_format}')
+                variants[image_format][str(width)] = storage.save(
+                    name, ContentFile(_encode(resized, image_format))
+                )
+    return variants
+
+
+def generate_image_variants(model, pk, field_name, force=False):
+    """
+    1つの画像フィールドの縮小版を作り直して保存する
+
+    元画像が作成中に差し替えられていた場合は結果を破棄する（新しい画像の保存時に改めて生成される）。
+    update() ではシグナルが発行されないため、縮小版の参照数はここで増減する。
+    """
+    variants_field, widths = next(
+        (variants_field, widths) for name, variants_field, widths in IMAGE_VARIANT_FIELDS[model] if name == field_name
+    )
+    instance = model.objects.filter(pk=pk).only(field_name, variants_field).first()
+    if instance is None:
+        return None
+
+    file = getattr(instance, field_name)
+    previous = getattr(instance, variants_field) or {}
+    if not force and previous.get('source') == (file.name or None):
+        return previous
+
+    variants = {}
+    if file:
+        variants['source'] = file.name
+        try:
+            variants.update(build_variants(file, widths))
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # 壊れた画像は元画像のまま配信し、再生成を繰り返さないよう source だけ記録する
+            logger.warning('縮小版を作成できませんでした: %s', file.name, exc_info=True)
+
+    queryset = model.objects.filter(pk=pk)
+    if file:
+        queryset = queryset.filter(**{field_name: file.name})
+    if queryset.update(**{variants_field: variants}) == 0:
+        register_unreferenced(variant_paths(variants))
+        return None
+    deltas = Counter(variant_paths(variants))
+    deltas.subtract(Counter(variant_paths(previous)))
+    adjust_media_refs(deltas)
+    return variants
+
+
+def _run(model, pk, field_name):
+    try:
+        generate_image_variants(model, pk, field_name)
+    except Exception:
+        logger.exception('縮小版の作成に失敗しました: %s(pk=%s).%s', model.__name__, pk, field_name)
+    finally:
+        # ワーカースレッドのDB接続を閉じる
+        connections.close_all()
+
+
+def schedule_image_variants(instance):
+    """画像が変更されたフィールドの縮小版の作成をコミット後に予約する"""
+    model = type(instance)
+    for field_name, variants_field, widths in IMAGE_VARIANT_FIELDS[model]:
+        file = getattr(instance, field_name)
+        variants = getattr(instance, variants_field) or {}
+        if variants.get('source') == (file.name or None):
+            continue
+        if settings.IMAGE_VARIANTS_ASYNC:
+            transaction.on_commit(
+                lambda field_name=field_name: _get_executor().submit(_run, model, instance.pk, field_name)
+            )
+        else:
+            transaction.on_commit(
+                lambda field_name=field_name: generate_image_variants(model, instance.pk, field_name)
+            )
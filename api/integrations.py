@@ -0,0 +1,236 @@
+"""
+GitHub・Qiita 連携の共通処理
+
+APIのURL（GITHUB_API_BASE_URL / QIITA_API_BASE_URL）と取得結果のDB保存は、同期版のビュー（views.py）と
+非同期版のビュー（async_views.py）で共有する。非同期版は httpx でリポジトリごとの情報を並行して取得する。
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+import httpx
+import requests
+from django.conf import settings
+from django.db import transaction
+
+from .models import GitHubRepository, GitHubCommitStats, QiitaArticle, QiitaArticleBody
+from .search import search_batch
+from .stats import stats_batch
+from .metrics import record_upstream_response
+from .timing import record_upstream
+
+logger = logging.getLogger(__name__)
+
+GITHUB_TOPICS_ACCEPT = 'application/vnd.github.mercy-preview+json'
+GITHUB_SEARCH_ACCEPT = 'application/vnd.github.cloak-preview+json'
+
+
+class UpstreamError(Exception):
+    """連携先のAPIが200以外を返した場合の例外"""
+
+    def __init__(self, status_code, text):
+        super().__init__(f'{status_code}: {text}')
+        self.status_code = status_code
+        self.text = text
+
+
+def github_url(path):
+    return settings.GITHUB_API_BASE_URL.rstrip('/') + path
+
+
+def qiita_url(path):
+    return settings.QIITA_API_BASE_URL.rstrip('/') + path
+
+
+def _record_upstream(provider, response, seconds):
+    """外部APIの呼び出し1回分を、リクエストの処理時間の計測とメトリクスに記録する"""
+    record_upstream(seconds)
+    if response is None:
+        record_upstream_response(provider, None, None, seconds)
+    else:
+        record_upstream_response(provider, response.status_code, response.headers, seconds)
+
+
+def upstream_request(provider, method, url, **kwargs):
+    """外部API（provider は 'github' か 'qiita'）を requests で呼び出す"""
+    started, response = time.perf_counter(), None
+    try:
+        response = requests.request(method, url, **kwargs)
+        return response
+    finally:
+        _record_upstream(provider, response, time.perf_counter() - started)
+
+
+def github_headers(profile):
+    """アクセストークンがあれば認証付き、なければ認証なし（レート制限あり）のヘッダー"""
+    if profile.github_access_token:
+        return {'Authorization': f'token {profile.github_access_token}'}
+    return {}
+
+
+def _parse_github_datetime(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ') if value else None
+
+
+def save_github_repositories(profile, repositories):
+    """
+    (リポジトリのデータ, トピック) のリストを保存し、含まれないリポジトリ（リモートで削除されたもの）を削除する
+
+    保存したリポジトリの full_name のリストを返す。保存に失敗したリポジトリはログに記録して続行する
+    （リポジトリごとのセーブポイントで戻すため、他のリポジトリと集計値の更新はそのまま反映する）。
+    """
+    synced = []
+    with transaction.atomic(), stats_batch():
+        for repo_data, topics in repositories:
+            try:
+                with transaction.atomic():
+                    GitHubRepository.objects.update_or_create(
+                        user=profile,
+                        full_name=repo_data['full_name'],
+                        defaults={
+                            'name': repo_data['name'],
+                            'html_url': repo_data['html_url'],
+                            'description': repo_data['description'] or '',
+                            'language': repo_data['language'] or '',
+                            'stargazers_count': repo_data['stargazers_count'],
+                            'forks_count': repo_data['forks_count'],
+                            'open_issues_count': repo_data['open_issues_count'],
+                            'watchers_count': repo_data['watchers_count'],
+                            'created_at': _parse_github_datetime(repo_data['created_at']),
+                            'updated_at': _parse_github_datetime(repo_data['updated_at']),
+                            'pushed_at': _parse_github_datetime(repo_data['pushed_at']),
+                            'topics': topics,
+                            'is_fork': repo_data['fork'],
+                            'is_private': repo_data['private'],
+                        }
+                    )
+                synced.append(repo_data['full_name'])
+            except Exception:
+                logger.exception('リポジトリのDB保存に失敗しました: %s', repo_data.get('full_name'))
+
+        GitHubRepository.objects.filter(user=profile).exclude(full_name__in=synced).delete()
+    return synced
+
+
+def save_commit_stats(profile, total_commits):
+    """コミット数と、フォーク以外のリポジトリの主要言語の集計を保存する"""
+    languages_count = {}
+    languages = GitHubRepository.objects.filter(user=profile, is_fork=False).values_list('language', flat=True)
+    for language in languages:
+        if language and language not in ['', 'null', 'None']:
+            languages_count[language] = languages_count.get(language, 0) + 1
+
+    # 月別コントリビューションはAPI v3では取得できないため0で埋める
+    monthly_contributions = {f'{month:02d}': 0 for month in range(1, 13)}
+    github_stats, created = GitHubCommitStats.objects.update_or_create(
+        user=profile,
+        defaults={
+            'commit_count_total': total_commits,
+            'commit_count_last_year': min(total_commits, 1000),  # 概算
+            'contributions_by_month': monthly_contributions,
+            'languages_used': languages_count,
+        }
+    )
+    return github_stats
+
+
+def save_qiita_articles(profile, articles_data):
+    """Qiita APIの記事一覧を保存し、保存した件数を返す（本文は別テーブルへまとめてupsertする）"""
+    bodies = []
+    with transaction.atomic(), stats_batch(), search_batch():
+        for article_data in articles_data:
+            tags = [tag.get('name') for tag in article_data.get('tags', [])]
+            article, created = QiitaArticle.objects.update_or_create(
+                user=profile,
+                article_id=article_data['id'],
+                defaults={
+                    'title': article_data['title'],
+                    'url': article_data['url'],
+                    'likes_count': article_data['likes_count'],
+                    'stocks_count': article_data.get('stocks_count', 0),
+                    'comments_count': article_data['comments_count'],
+                    'created_at': article_data['created_at'],
+                    'updated_at': article_data['updated_at'],
+                    'tags': tags,
+                }
+            )
+            bodies.append(QiitaArticleBody(
+                article=article,
+                body_md=article_data.get('body', ''),
+                body_html=article_data.get('rendered_body', '')
+            ))
+
+        QiitaArticleBody.objects.bulk_create(
+            bodies,
+            update_conflicts=True,
+            unique_fields=['article'],
+            update_fields=['body_md', 'body_html']
+        )
+    return len(bodies)
+
+
+def _async_client(provider, headers=None):
+    """レスポンスのヘッダーを受け取るまでの時間を、呼び出しごとに記録する非同期クライアント"""
+    async def start_timer(request):
+        request.extensions['started'] = time.perf_counter()
+
+    async def record(response):
+        _record_upstream(provider, response, time.perf_counter() - response.request.extensions['started'])
+
+    return httpx.AsyncClient(
+        headers=headers, timeout=settings.UPSTREAM_TIMEOUT_SECONDS,
+        event_hooks={'request': [start_timer], 'response': [record]}
+    )
+
+
+async def fetch_github_data(profile):
+    """
+    リポジトリ一覧・各リポジトリのトピック・コミット数を取得し、((リポジトリ, トピック) のリスト, コミット数) を返す
+
+    トピックとコミット数の取得は SYNC_UPSTREAM_CONCURRENCY 件ずつ並行して行う。
+    """
+    username = profile.github_username
+    async with _async_client('github', github_headers(profile)) as client:
+        user_response = await client.get(github_url(f'/users/{username}'))
+        if user_response.status_code != 200:
+            raise UpstreamError(user_response.status_code, user_response.text)
+
+        repos_response = await client.get(github_url(f'/users/{username}/repos'), params={'per_page': 100})
+        if repos_response.status_code != 200:
+            raise UpstreamError(repos_response.status_code, repos_response.text)
+        repos_data = repos_response.json()
+
+        slots = asyncio.Semaphore(settings.SYNC_UPSTREAM_CONCURRENCY)
+
+        async def fetch_topics(repo_data):
+            async with slots:
+                response = await client.get(
+                    github_url(f"/repos/{repo_data['full_name']}/topics"), headers={'Accept': GITHUB_TOPICS_ACCEPT}
+                )
+            return response.json().get('names', []) if response.status_code == 200 else []
+
+        async def fetch_commit_count():
+            async with slots:
+                response = await client.get(
+                    github_url('/search/commits'), params={'q': f'author:{username}'},
+                    headers={'Accept': GITHUB_SEARCH_ACCEPT}
+                )
+            return response.json().get('total_count', 0) if response.status_code == 200 else 0
+
+        total_commits, *topics = await asyncio.gather(
+            fetch_commit_count(), *[fetch_topics(repo_data) for repo_data in repos_data]
+        )
+    return list(zip(repos_data, topics)), total_commits
+
+
+async def fetch_qiita_articles(profile):
+    """自分の記事（最大100件）を取得する"""
+    headers = {'Authorization': f'Bearer {profile.qiita_access_token}'}
+    async with _async_client('qiita', headers) as client:
+        response = await client.get(
+            qiita_url(f'/users/{profile.qiita_username}/items'), params={'per_page': 100}
+        )
+    if response.status_code != 200:
+        raise UpstreamError(response.status_code, response.text)
+    return response.json()
@@ -0,0 +1,129 @@
+import json
+import platform
+import subprocess
+from contextlib import ExitStack
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from api.benchmark import (
+    DEFAULT_MIX, HttpTarget, InProcessTarget, build_plan, compare_results, parse_mix,
+    prepare_fixture, run_benchmark, throttles_disabled,
+)
+from api.fake_upstream import FakeUpstreamServer
+
+
+class Command(BaseCommand):
+    help = (
+        '公開プロフィールの閲覧・ダッシュボードの編集・トークン発行・同期を混ぜたリクエストを送り、'
+        '名前ごとの p50/p95/p99・req/s・クエリ数をJSONに出力する。'
+        '既定ではプロセス内の WSGI アプリケーションに送る（開発用のデータベースを使うこと）。'
+        '--url で起動中のサーバーに送る場合は、同じデータベースを使い、GITHUB_API_BASE_URL・QIITA_API_BASE_URL を'
+        '擬似サーバー（--upstream-port）に向け、THROTTLE_RATE_* を十分に大きくして起動しておく'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='起動中のサーバー（例: http://127.0.0.1:8000）。省略時はプロセス内で実行する')
+        parser.add_argument('--requests', type=int, default=500, help='実行する操作の数（ダッシュボードは1操作で4リクエスト）')
+        parser.add_argument('--warmup', type=int, default=20, help='計測の前に実行する（集計しない）操作の数')
+        parser.add_argument('--concurrency', type=int, default=1, help='同時に実行するスレッド数（--url の場合のみ）')
+        parser.add_argument('--mix', default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+                            help='操作の重み（public, dashboard, auth, sync）')
+        parser.add_argument('--seed', type=int, default=0, help='操作の並びを決める乱数のシード')
+        parser.add_argument('--upstream-delay', type=float, default=0.05, help='擬似サーバーの応答にかける秒数')
+        parser.add_argument('--upstream-port', type=int, default=0, help='擬似サーバーのポート（0 は空いているポート）')
+        parser.add_argument('--output', help='結果を書き出すJSONファイル')
+        parser.add_argument('--compare', help='比較する以前の結果のJSONファイル')
+        parser.add_argument('--max-regression', type=float,
+                            help='--compare で p95 または req/s がこの割合（%%）を超えて悪化した場合に失敗する')
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['url'] is None and options['concurrency'] != 1:
+            raise CommandError('プロセス内で実行する場合、--concurrency は 1 のみ指定できます')
+
+        context = prepare_fixture()
+        plan = build_plan(mix, options['requests'], options['seed'])
+        warmup = build_plan(mix, options['warmup'], options['seed'] + 1)
+
+        upstream = FakeUpstreamServer(('127.0.0.1', options['upstream_port']), delay=options['upstream_delay']).start()
+        try:
+            with ExitStack() as stack:
+                if options['url']:
+                    self.stdout.write(f'擬似サーバー: {upstream.url}（サーバーの GITHUB_API_BASE_URL・QIITA_API_BASE_URL に設定すること）')
+                    make_target = lambda: HttpTarget(options['url'])  # noqa: E731
+                else:
+                    stack.enter_context(throttles_disabled())
+                    stack.enter_context(override_settings(
+                        GITHUB_API_BASE_URL=upstream.url, QIITA_API_BASE_URL=upstream.url
+                    ))
+                    make_target = InProcessTarget
+                results = run_benchmark(make_target, context, plan, options['concurrency'], warmup)
+        finally:
+            upstream.stop()
+
+        results['meta'] = {
+            'created_at': timezone.now().isoformat(),
+            'commit': _git_commit(),
+            'target': options['url'] or 'in-process',
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'mix': mix,
+            'seed': options['seed'],
+            'upstream_delay': options['upstream_delay'],
+            'database': settings.DATABASES['default']['ENGINE'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        }
+        self.print_results(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f'結果を書き出しました: {options["output"]}')
+        if options['compare']:
+            self.compare(options['compare'], results, options['max_regression'])
+
+    def print_results(self, results):
+        self.stdout.write(f'{"名前":<28}{"件数":>7}{"p50":>10}{"p95":>10}{"p99":>10}{"req/s":>10}{"クエリ":>8}{"エラー":>7}')
+        for name, result in [*results['endpoints'].items(), ('total', results['total'])]:
+            latency = result['latency_ms']
+            queries = result['queries_per_request']
+            self.stdout.write(
+                f'{name:<30}{result["requests"]:>7}{latency["p50"]:>10}{latency["p95"]:>10}{latency["p99"]:>10}'
+                f'{result["requests_per_second"]:>10}{"-" if queries is None else queries:>10}{result["errors"]:>8}'
+            )
+
+    def compare(self, path, results, max_regression):
+        with open(path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        self.stdout.write(f'\n{path}（{baseline["meta"].get("commit") or "?"}）との比較（悪化率は悪くなった方向が正）')
+        for key in ('target', 'mix', 'concurrency', 'database'):
+            if baseline['meta'].get(key) != results['meta'][key]:
+                self.stdout.write(self.style.WARNING(
+                    f'{key} が異なります（{baseline["meta"].get(key)} → {results["meta"][key]}）。結果は直接比較できません'
+                ))
+        regressions = []
+        for name, key, old, new, change in compare_results(baseline, results):
+            line = f'{name:<30}{key:<24}{old:>10} → {new:<10}{change:+.1f}%'
+            is_regression = (max_regression is not None and change > max_regression
+                             and key in ('latency_ms.p95', 'requests_per_second'))
+            if is_regression:
+                regressions.append(line)
+            self.stdout.write(self.style.ERROR(line) if is_regression else line)
+        if regressions:
+            raise CommandError(f'{len(regressions)}件の指標が {max_regression}% を超えて悪化しました')
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from api.benchmark import run_http_load
+from api.models import UserProfile
+
+ENDPOINTS = {
+    'qiita': '/api/qiita-articles/sync/',
+    'github': '/api/github-repositories/sync/',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        '起動中のサーバーに同期処理（外部APIの呼び出しを含む）を並行して送り、同時に処理できる数を測る。'
+        'サーバーは fake_upstream コマンドの擬似サーバーに GITHUB_API_BASE_URL・QIITA_API_BASE_URL を向け、'
+        'THROTTLE_RATE_SYNC と SYNC_MAX_CONCURRENT を十分に大きくして、同じデータベースを使って起動しておく。'
+        'WSGI（gunicorn の sync/gthread ワーカー）と ASGI（uvicorn ワーカー、ASYNC_VIEWS=True）で比較する'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='測定対象のサーバー')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='qiita')
+        parser.add_argument('--concurrency', type=int, default=50, help='同時に送るリクエスト数')
+        parser.add_argument('--requests', type=int, default=200, help='送るリクエストの総数')
+        parser.add_argument('--users', type=int, default=None, help='使うユーザー数（既定は同時実行数と同じ）')
+        parser.add_argument('--json', action='store_true', help='結果をJSONで出力する')
+
+    def handle(self, *args, **options):
+        tokens = self.prepare_users(options['users'] or options['concurrency'])
+        path = ENDPOINTS[options['endpoint']]
+        requests = [
+            ('POST', path, {'Authorization': f'Token {tokens[index % len(tokens)]}'})
+            for index in range(options['requests'])
+        ]
+        result = asyncio.run(run_http_load(options['url'], requests, options['concurrency']))
+        result.update(url=options['url'], endpoint=path, concurrency=options['concurrency'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, ensure_ascii=False, indent=2))
+            return
+        latency = result['latency_ms']
+        self.stdout.write(
+            f'{path} を同時 {options["concurrency"]} 件で {result["requests"]} 件: '
+            f'{result["requests_per_second"]} req/s, p50 {latency["p50"]}ms, p95 {latency["p95"]}ms, '
+            f'p99 {latency["p99"]}ms, ステータス {result["statuses"]}'
+        )
+
+    def prepare_users(self, count):
+        """bench-sync-N ユーザーとトークンを用意する（既存のものは再利用する）"""
+        tokens = []
+        for index in range(count):
+            username = f'bench-sync-{index}'
+            user, created = User.objects.get_or_create(username=username)
+            UserProfile.objects.filter(user=user).update(
+                github_username=username, qiita_username=username, qiita_access_token='bench'
+            )
+            tokens.append(Token.objects.get_or_create(user=user)[0].key)
+        return tokens
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.fake_upstream import FakeUpstreamServer
+
+
+class Command(BaseCommand):
+    help = '遅延を入れて応答する GitHub・Qiita API の擬似サーバーを起動する（ベンチマーク用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=9100)
+        parser.add_argument('--delay', type=float, default=0.5, help='1回の応答にかける秒数')
+        parser.add_argument('--repositories', type=int, default=10, help='ユーザーごとのリポジトリ数')
+        parser.add_argument('--articles', type=int, default=20, help='ユーザーごとのQiita記事数')
+
+    def handle(self, *args, **options):
+        server = FakeUpstreamServer(
+            (options['host'], options['port']), delay=options['delay'],
+            repositories=options['repositories'], articles=options['articles']
+        )
+        self.stdout.write(
+            f'{server.url} で起動しました（遅延 {options["delay"]}秒）。'
+            f'GITHUB_API_BASE_URL と QIITA_API_BASE_URL にこのURLを設定してください。'
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,78 @@
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.blobs import count_references
+from api.models import MediaBlob
+from api.storage import BLOB_DIRECTORY
+
+
+class Command(BaseCommand):
+    help = '参照されなくなったアップロードファイル（MediaBlob の参照数が0のもの）を削除する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true',
+                            help='削除の前に全モデルを走査して参照数を数え直す（差分更新のずれを修正する）')
+        parser.add_argument('--orphans', action='store_true',
+                            help='MediaBlob に登録されていない blobs/ 以下のファイルも削除する')
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='アップロード中のファイルを消さないよう、この時間以内に更新されたものは残す')
+        parser.add_argument('--dry-run', action='store_true', help='削除せずに対象の件数だけ表示する')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        dry_run = options['dry_run']
+        if options['recount']:
+            self.stdout.write(f'参照数を修正: {self.recount(dry_run)}件')
+
+        deleted = 0
+        names = MediaBlob.objects.filter(ref_count=0, updated_at__lt=cutoff).values_list('name', flat=True)
+        for name in names.iterator(chunk_size=1000):
+            if dry_run:
+                deleted += 1
+                continue
+            # 判定後に再び参照された場合・同じ内容のアップロードで再利用された場合は削除しない
+            if MediaBlob.objects.filter(name=name, ref_count=0, updated_at__lt=cutoff).delete()[0]:
+                default_storage.delete(name)
+                deleted += 1
+        self.stdout.write(f'参照されていないファイル: {deleted}件')
+
+        if options['orphans']:
+            self.stdout.write(f'未登録のファイル: {self.delete_orphans(cutoff, dry_run)}件')
+        self.stdout.write(self.style.SUCCESS('完了しました' if not dry_run else '（dry-run のため削除していません）'))
+
+    def recount(self, dry_run):
+        counts = count_references()
+        existing = dict(MediaBlob.objects.values_list('name', 'ref_count'))
+        to_create = [MediaBlob(name=name, ref_count=count) for name, count in counts.items() if name not in existing]
+        to_update = [
+            MediaBlob(name=name, ref_count=counts.get(name, 0), updated_at=timezone.now())
+            for name, ref_count in existing.items() if counts.get(name, 0) != ref_count
+        ]
+        if not dry_run:
+            MediaBlob.objects.bulk_create(to_create, batch_size=1000, ignore_conflicts=True)
+            MediaBlob.objects.bulk_update(to_update, ['ref_count', 'updated_at'], batch_size=1000)
+        return len(to_create) + len(to_update)
+
+    def delete_orphans(self, cutoff, dry_run):
+        deleted = 0
+        pending = [BLOB_DIRECTORY]
+        while pending:
+            directory = pending.pop()
+            try:
+                subdirectories, files = default_storage.listdir(directory)
+            except FileNotFoundError:
+                continue
+            pending.extend(os.path.join(directory, name) for name in subdirectories)
+            paths = [os.path.join(directory, name) for name in files]
+            registered = set(MediaBlob.objects.filter(name__in=paths).values_list('name', flat=True))
+            for path in paths:
+                if path in registered or default_storage.get_modified_time(path) >= cutoff:
+                    continue
+                if not dry_run:
+                    default_storage.delete(path)
+                deleted += 1
+        return deleted
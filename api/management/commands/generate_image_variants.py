@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from api.images import IMAGE_VARIANT_FIELDS, generate_image_variants
+
+MODELS = {model._meta.model_name: model for model in IMAGE_VARIANT_FIELDS}
+
+
+class Command(BaseCommand):
+    help = 'アップロード済みの画像の縮小版（WebP / JPEG）を作成する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', dest='models', choices=sorted(MODELS),
+                            help='対象のモデル（複数指定可、省略時は全モデル）')
+        parser.add_argument('--force', action='store_true', help='作成済みの縮小版も作り直す')
+        parser.add_argument('--batch-size', type=int, default=500, help='1回に読み込む件数')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model_name in options['models'] or MODELS:
+            model = MODELS[model_name]
+            for field_name, variants_field, widths in IMAGE_VARIANT_FIELDS[model]:
+                total = 0
+                last_id = 0
+                queryset = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                while True:
+                    rows = list(
+                        queryset.filter(pk__gt=last_id).order_by('pk')
+                        .values_list('pk', field_name, variants_field)[:batch_size]
+                    )
+                    if not rows:
+                        break
+                    for pk, name, variants in rows:
+                        if options['force'] or (variants or {}).get('source') != name:
+                            generate_image_variants(model, pk, field_name, force=options['force'])
+                            total += 1
+                    last_id = rows[-1][0]
+                self.stdout.write(f'{model_name}.{field_name}: {total}件')
+        self.stdout.write(self.style.SUCCESS('縮小版を作成しました'))
@@ -0,0 +1,294 @@
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from api.icons import icon_list
+from api.models import (
+    GitHubRepository, Project, QiitaArticle, QiitaArticleBody, Skill, SkillCategory, UserProfile, WorkExperience,
+)
+from api.search import index_instances
+from api.skill_index import index_skills
+from api.stats import refresh_portfolio_stats
+
+# アイコンカタログのカテゴリ → スキルカテゴリ名（カタログにないスキルは「その他」）
+CATEGORY_NAMES = {'language': '言語', 'framework': 'フレームワーク', 'database': 'データベース', 'tool': 'ツール'}
+OTHER_SKILLS = [
+    'AWS', 'GCP', 'Azure', 'Rust', 'Scala', 'Elixir', 'Spring Boot', 'Ruby on Rails', 'Laravel', 'FastAPI',
+    'Express', 'Angular', 'Svelte', 'Elasticsearch', 'BigQuery', 'Jenkins', 'CircleCI', 'GitHub Actions', 'Ansible', 'Nginx',
+]
+TITLES = ['バックエンドエンジニア', 'フロントエンドエンジニア', 'フルスタックエンジニア', 'インフラエンジニア', 'SRE', 'テックリード']
+LOCATIONS = ['東京都', '大阪府', '神奈川県', '福岡県', '愛知県', '北海道', 'リモート']
+COMPANIES = ['株式会社サンプル', '合同会社テスト', '株式会社デモシステムズ', 'サンプル商事株式会社', None]
+OS_NAMES = ['Linux', 'Windows', 'macOS']
+PROCESS_ROLES = ['要件定義', '基本設計', '詳細設計', '実装', '単体テスト', '結合テスト', '運用保守']
+SENTENCES = [
+    'このプロジェクトでは既存システムのリプレイスを担当しました。',
+    'パフォーマンスの改善のため、クエリの見直しとインデックスの追加を行いました。',
+    'チームでコードレビューの仕組みを整え、品質の向上に取り組みました。',
+    'CI/CD のパイプラインを構築し、デプロイの時間を短縮しました。',
+    '負荷試験の結果をもとにキャッシュの設計を見直しました。',
+    '非同期処理を導入して外部APIの待ち時間を削減しました。',
+    '監視とアラートを整備し、障害の検知を早めました。',
+    'ドキュメントを整備して新しいメンバーのオンボーディングを支援しました。',
+]
+CODE_BLOCK = '```python\ndef handler(request):\n    return Response({"status": "ok"})\n```'
+
+TIMESTAMP = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+# --workers で fork したプロセスが使うコマンドのインスタンス
+_generator = None
+
+
+def _create_batch(indexes):
+    _generator.create_batch(indexes)
+    return len(indexes)
+
+
+def parse_distribution(value):
+    """'最小:最大[:最頻値]' を三角分布のパラメータにする（'5' は常に5）"""
+    try:
+        parts = [float(part) for part in value.split(':')]
+    except ValueError:
+        raise CommandError(f'分布の指定が不正です: {value}（例: 3:40:12）')
+    if len(parts) == 1:
+        parts = parts * 3
+    elif len(parts) == 2:
+        parts.append((parts[0] + parts[1]) / 2)
+    low, high, mode = parts[:3]
+    if not low <= mode <= high or low < 0:
+        raise CommandError(f'分布の指定が不正です: {value}（最小 <= 最頻値 <= 最大 にしてください）')
+    return low, high, mode
+
+
+class Command(BaseCommand):
+    help = (
+        'スケールテスト用に、スキル・プロジェクト・職歴・リポジトリ・Qiita記事を持つポートフォリオを一括登録する。'
+        '件数は「最小:最大:最頻値」の三角分布で指定し、同じシードと番号からは同じデータができる'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='作成するポートフォリオ（ユーザー）の数')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='synthetic-', help='ユーザー名・portfolio_slug の接頭辞')
+        parser.add_argument('--start', type=int, default=0, help='連番の開始番号（追加で作成する場合に指定する）')
+        parser.add_argument('--batch-size', type=int, default=500, help='1回のトランザクションで作成するユーザー数')
+        parser.add_argument('--workers', type=int, default=1, help='並行して作成するプロセス数（PostgreSQL のみ）')
+        parser.add_argument('--password', default='synthetic-password', help='全ユーザー共通のパスワード')
+        parser.add_argument('--delete', action='store_true', help='作成の前に接頭辞が一致するユーザーを削除する')
+        parser.add_argument('--categories', type=parse_distribution, default='1:5:3', help='スキルカテゴリ数の分布')
+        parser.add_argument('--skills', type=parse_distribution, default='3:40:10', help='スキル数の分布')
+        parser.add_argument('--projects', type=parse_distribution, default='0:20:4', help='プロジェクト数の分布')
+        parser.add_argument('--technologies', type=parse_distribution, default='1:8:3',
+                            help='プロジェクトごとの使用技術（スキルとのM2M）の数の分布')
+        parser.add_argument('--work-experiences', type=parse_distribution, default='0:8:2', help='職歴数の分布')
+        parser.add_argument('--repositories', type=parse_distribution, default='0:40:4', help='GitHubリポジトリ数の分布')
+        parser.add_argument('--articles', type=parse_distribution, default='0:20:0', help='Qiita記事数の分布')
+        parser.add_argument('--article-chars', type=parse_distribution, default='500:20000:2000',
+                            help='Qiita記事の本文（Markdown）の文字数の分布')
+
+    def handle(self, *args, **options):
+        self.options = options
+        prefix = options['prefix']
+        if options['delete']:
+            deleted = User.objects.filter(username__startswith=prefix).delete()[1].get('auth.User', 0)
+            self.stdout.write(f'{deleted}件のユーザーを削除しました')
+
+        self.password = make_password(options['password'])
+        self.skill_pool = self.build_skill_pool()
+        self.paragraph_pool = self.build_paragraph_pool()
+        start, end = options['start'], options['start'] + options['count']
+        if User.objects.filter(username__range=(self.username(start), self.username(end - 1))).exists():
+            raise CommandError(
+                f'{self.username(start)}〜{self.username(end - 1)} のユーザーが既にあります。--start か --delete を指定してください'
+            )
+
+        batches = [range(batch_start, min(end, batch_start + options['batch_size']))
+                   for batch_start in range(start, end, options['batch_size'])]
+        started = time.perf_counter()
+        done = 0
+        for created in self.run_batches(batches, options['workers']):
+            done += created
+            self.stdout.write(f'{done}/{options["count"]}件（{done / (time.perf_counter() - started):.0f}件/秒）')
+        self.stdout.write(self.style.SUCCESS(f'{options["count"]}件のポートフォリオを作成しました'))
+
+    def run_batches(self, batches, workers):
+        """バッチを作成し、作成した件数を順に返す（workers > 1 の場合は fork したプロセスで並行して作成する）"""
+        if workers == 1:
+            for indexes in batches:
+                self.create_batch(indexes)
+                yield len(indexes)
+            return
+        if connection.vendor == 'sqlite':
+            raise CommandError('SQLite は書き込みを並行できないため、--workers は 1 のみ指定できます')
+
+        global _generator
+        _generator = self
+        # 子プロセスが親の接続を共有しないよう、fork の前に閉じておく
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+            for future in as_completed([executor.submit(_create_batch, indexes) for indexes in batches]):
+                yield future.result()
+
+    def username(self, index):
+        return f"{self.options['prefix']}{index:07d}"
+
+    def build_skill_pool(self):
+        """カテゴリ名 → (スキル名, アイコンID) のリスト"""
+        pool = {name: [] for name in CATEGORY_NAMES.values()}
+        for icon in icon_list():
+            pool[CATEGORY_NAMES[icon['category']]].append((icon['name'], icon['id']))
+        pool['その他'] = [(name, None) for name in OTHER_SKILLS]
+        return pool
+
+    def count(self, rng, key, maximum=None):
+        low, high, mode = self.options[key]
+        value = round(rng.triangular(low, high, mode))
+        return min(value, maximum) if maximum is not None else value
+
+    def insert_m2m(self, descriptor, rows):
+        quote_name = connection.ops.quote_name
+        field = descriptor.field
+        sql = 'INSERT INTO {} ({}, {}) VALUES (%s, %s)'.format(
+            quote_name(field.remote_field.through._meta.db_table),
+            quote_name(field.m2m_column_name()), quote_name(field.m2m_reverse_name())
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+    def build_paragraph_pool(self, size=256):
+        """記事本文に使う (Markdown, HTML) の段落（見出し・文章・コードブロック）をあらかじめ作っておく"""
+        rng = random.Random(f"{self.options['seed']}:paragraphs")
+        pool = []
+        for _ in range(size):
+            kind = rng.random()
+            if kind < 0.15:
+                heading = rng.choice(SENTENCES)[:12]
+                pool.append((f'## {heading}', f'<h2>{heading}</h2>'))
+            elif kind < 0.25:
+                pool.append((CODE_BLOCK, f'<pre><code>{CODE_BLOCK[10:-4]}</code></pre>'))
+            else:
+                paragraph = ''.join(rng.choices(SENTENCES, k=rng.randint(2, 6)))
+                pool.append((paragraph, f'<p>{paragraph}</p>'))
+        return pool
+
+    def paragraphs(self, rng, chars):
+        """段落を並べた、おおよそ chars 文字の Markdown とその HTML"""
+        average = sum(len(markdown) + 2 for markdown, html in self.paragraph_pool) / len(self.paragraph_pool)
+        chosen = rng.choices(self.paragraph_pool, k=max(1, round(chars / average)))
+        return '\n\n'.join(markdown for markdown, html in chosen), '\n'.join(html for markdown, html in chosen)
+
+    def build_portfolio(self, index, objects):
+        """1人分のオブジェクトを作り objects（モデルごとのリスト）に追加する（保存はしない）"""
+        rng = random.Random(f"{self.options['seed']}:{index}")
+        username = self.username(index)
+        user = User(username=username, password=self.password, email=f'{username}@example.com')
+        profile = UserProfile(
+            user=user, portfolio_slug=username, display_name=f'ユーザー{index}', title=rng.choice(TITLES),
+            bio=''.join(rng.choices(SENTENCES, k=3)), specialty=rng.choice(TITLES), location=rng.choice(LOCATIONS),
+            github_username=username, qiita_username=username,
+        )
+        objects[User].append(user)
+        objects[UserProfile].append(profile)
+
+        category_names = rng.sample(list(self.skill_pool), self.count(rng, 'categories', len(self.skill_pool)) or 1)
+        categories = [SkillCategory(user=user, name=name, order=order) for order, name in enumerate(category_names)]
+        objects[SkillCategory].extend(categories)
+        candidates = [(category, skill) for category in categories for skill in self.skill_pool[category.name]]
+        skills = [
+            Skill(
+                user=profile, category=category, name=name, icon_id=icon_id, level=rng.randint(1, 5),
+                experience_years=Decimal(rng.randint(0, 150)) / 10, order=order, is_highlighted=rng.random() < 0.2,
+            )
+            for order, (category, (name, icon_id)) in enumerate(
+                rng.sample(candidates, min(len(candidates), self.count(rng, 'skills')))
+            )
+        ]
+        objects[Skill].extend(skills)
+
+        for order in range(self.count(rng, 'projects')):
+            project = Project(
+                user=profile, title=f'プロジェクト{order + 1}', description=''.join(rng.choices(SENTENCES, k=4)),
+                github_url=f'https://github.com/{username}/project-{order}', is_featured=rng.random() < 0.3, order=order,
+                start_date=date(2018, 1, 1) + timedelta(days=rng.randint(0, 2000)),
+            )
+            objects[Project].append(project)
+            for skill in rng.sample(skills, min(len(skills), self.count(rng, 'technologies'))):
+                objects[Project.technologies_used].append((project, skill))
+
+        start_date = date(2010, 4, 1) + timedelta(days=rng.randint(0, 1500))
+        for number in range(self.count(rng, 'work_experiences')):
+            end_date = start_date + timedelta(days=rng.randint(180, 1200))
+            used = rng.sample(skills, min(len(skills), rng.randint(1, 6)))
+            experience = WorkExperience(
+                user=profile, company=rng.choice(COMPANIES), position=rng.choice(TITLES),
+                project_name=f'案件{number + 1}', start_date=start_date, end_date=end_date,
+                description=''.join(rng.choices(SENTENCES, k=5)), team_size=rng.randint(2, 30),
+                role_description=rng.choice(SENTENCES),
+                details={'業界': rng.choice(['金融', '小売', '医療', '製造', '教育']), '規模': f'{rng.randint(3, 50)}人月'},
+                os_used=rng.sample(OS_NAMES, rng.randint(1, 2)),
+                languages_used=[skill.name for skill in used if skill.category.name == '言語'],
+                db_used=[skill.name for skill in used if skill.category.name == 'データベース'],
+                frameworks_used=[skill.name for skill in used if skill.category.name == 'フレームワーク'],
+                process_roles=rng.sample(PROCESS_ROLES, rng.randint(1, 4)),
+                process_details={role: rng.choice(SENTENCES) for role in rng.sample(PROCESS_ROLES, 2)},
+            )
+            objects[WorkExperience].append(experience)
+            for skill in used:
+                objects[WorkExperience.skills_used].append((experience, skill))
+            start_date = end_date + timedelta(days=rng.randint(1, 90))
+
+        languages = [skill.name for skill in skills if skill.category.name == '言語'] or ['Python']
+        for number in range(self.count(rng, 'repositories')):
+            pushed_at = TIMESTAMP - timedelta(days=rng.randint(0, 1500))
+            objects[GitHubRepository].append(GitHubRepository(
+                user=profile, name=f'repo-{number}', full_name=f'{username}/repo-{number}',
+                html_url=f'https://github.com/{username}/repo-{number}', description=rng.choice(SENTENCES),
+                language=rng.choice(languages), stargazers_count=min(int(rng.paretovariate(1.5)) - 1, 100000),
+                forks_count=rng.randint(0, 5), watchers_count=rng.randint(0, 10),
+                created_at=pushed_at - timedelta(days=rng.randint(0, 1000)), updated_at=pushed_at, pushed_at=pushed_at,
+                featured=rng.random() < 0.2, topics=rng.sample(languages, min(len(languages), 2)),
+                is_fork=rng.random() < 0.15,
+            ))
+
+        for number in range(self.count(rng, 'articles')):
+            created_at = TIMESTAMP - timedelta(days=rng.randint(0, 1500))
+            article = QiitaArticle(
+                user=profile, article_id=f'{index:08x}{number:012x}', title=f'{rng.choice(languages)}の{rng.choice(SENTENCES)[:20]}',
+                url=f'https://qiita.com/{username}/items/{number}', likes_count=min(int(rng.paretovariate(1.2)) - 1, 100000),
+                stocks_count=rng.randint(0, 50), comments_count=rng.randint(0, 5),
+                created_at=created_at, updated_at=created_at, tags=rng.sample(languages, min(len(languages), 3)),
+                is_featured=rng.random() < 0.2,
+            )
+            body_md, body_html = self.paragraphs(rng, self.count(rng, 'article_chars'))
+            objects[QiitaArticle].append(article)
+            objects[QiitaArticleBody].append(QiitaArticleBody(article=article, body_md=body_md, body_html=body_html))
+
+    @transaction.atomic
+    def create_batch(self, indexes):
+        # 依存関係の順に一括登録する（bulk_create 後の主キーが後続の外部キーに使われる）
+        models = [User, UserProfile, SkillCategory, Skill, Project, WorkExperience, GitHubRepository, QiitaArticle, QiitaArticleBody]
+        m2m_fields = [Project.technologies_used, WorkExperience.skills_used]
+        objects = {key: [] for key in models + m2m_fields}
+        for index in indexes:
+            self.build_portfolio(index, objects)
+        for model in models:
+            model.objects.bulk_create(objects[model], batch_size=1000)
+        # 件数の最も多い中間テーブルは、モデルのインスタンスを作らずに (主キー, 主キー) の組をまとめて登録する
+        for descriptor in m2m_fields:
+            self.insert_m2m(descriptor, [(owner.id, skill.id) for owner, skill in objects[descriptor]])
+
+        # シグナルを通らないため、集計値・検索ドキュメント・スキルのインデックスをまとめて作る
+        # （検索ドキュメントとスキルのインデックスは読み込み直さずに作成したオブジェクトから作る）
+        refresh_portfolio_stats([profile.id for profile in objects[UserProfile]])
+        for kind, model in [('profile', UserProfile), ('project', Project),
+                            ('work_experience', WorkExperience), ('qiita_article', QiitaArticle)]:
+            index_instances(kind, objects[model])
+        index_skills(objects[Skill])
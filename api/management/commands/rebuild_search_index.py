@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api.search import INDEXED_MODELS, index_objects
+
+
+class Command(BaseCommand):
+    help = '全文検索用の検索ドキュメントを再作成する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', action='append', dest='kinds', choices=sorted(INDEXED_MODELS),
+                            help='対象の種類（複数指定可、省略時は全種類）')
+        parser.add_argument('--batch-size', type=int, default=500, help='1回の更新で処理する件数')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for kind in options['kinds'] or INDEXED_MODELS:
+            model = INDEXED_MODELS[kind]
+            total = 0
+            last_id = 0
+            while True:
+                ids = list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+                if not ids:
+                    break
+                total += index_objects(kind, ids)
+                last_id = ids[-1]
+            self.stdout.write(f'{kind}: {total}件')
+        self.stdout.write(self.style.SUCCESS('検索ドキュメントを再作成しました'))
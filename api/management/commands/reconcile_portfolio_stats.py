@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.models import UserProfile
+from api.stats import refresh_portfolio_stats
+
+
+class Command(BaseCommand):
+    help = 'ポートフォリオ集計値(PortfolioStats)を実データから再計算して差分更新のずれを修正する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slug', action='append', dest='slugs', help='対象のportfolio_slug（複数指定可、省略時は全件）')
+        parser.add_argument('--batch-size', type=int, default=1000, help='1回の集計で処理するプロフィール数')
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.order_by('id')
+        if options['slugs']:
+            profiles = profiles.filter(portfolio_slug__in=options['slugs'])
+
+        batch_size = options['batch_size']
+        total = 0
+        last_id = 0
+        while True:
+            # キーセットで走査して大きなOFFSETを避ける
+            ids = list(profiles.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            total += refresh_portfolio_stats(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'{total}件のプロフィールの集計値を再計算しました'))
@@ -0,0 +1,143 @@
+"""
+Prometheus 形式のメトリクス（/metrics）
+
+gunicorn で起動する場合は gunicorn.conf.py が PROMETHEUS_MULTIPROC_DIR を設定し、prometheus_client の
+マルチプロセスモードで各ワーカーが値をファイル（mmap）に書き込む。/metrics はすべてのワーカーの値を合算して返す。
+環境変数がない場合（runserver・テスト）はプロセス内の値を返す。
+"""
+import asyncio
+import os
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+from .timing import current_timing
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'リクエストの処理時間（秒）', ['route', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUESTS = Counter('http_requests', 'ステータスコードごとのリクエスト数', ['route', 'method', 'status'])
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', '1リクエストのDBクエリ数（REQUEST_TIMING_SAMPLE_RATE で計測したリクエストのみ）', ['route'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+CACHE_LOOKUPS = Counter('cache_lookups', 'キャッシュの参照回数（result は hit か miss）', ['cache', 'result'])
+SYNC_DURATION = Histogram(
+    'sync_duration_seconds', 'GitHub・Qiita同期の処理時間（秒）', ['provider', 'outcome'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+UPSTREAM_REQUESTS = Counter('upstream_requests', '外部APIの呼び出し数（status は接続できなかった場合 error）', ['provider', 'status'])
+UPSTREAM_LATENCY = Histogram(
+    'upstream_request_duration_seconds', '外部APIの呼び出しの所要時間（秒）', ['provider'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+UPSTREAM_RATE_LIMIT_REMAINING = Gauge(
+    'upstream_rate_limit_remaining', '外部APIのレート制限の残り回数（最後に受け取ったレスポンスの値）', ['provider'],
+    multiprocess_mode='mostrecent',
+)
+
+# 連携先ごとのレート制限の残り回数のヘッダー
+RATE_LIMIT_HEADERS = {'github': 'X-RateLimit-Remaining', 'qiita': 'Rate-Remaining'}
+
+# ラベルの種類が増えすぎないよう、それ以外のメソッドは other にまとめる
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_upstream_response(provider, status_code, headers, seconds):
+    """外部APIの呼び出し1回分を記録する（status_code が None の場合は接続できなかったものとして数える）"""
+    UPSTREAM_REQUESTS.labels(provider, 'error' if status_code is None else str(status_code)).inc()
+    UPSTREAM_LATENCY.labels(provider).observe(seconds)
+    remaining = headers.get(RATE_LIMIT_HEADERS.get(provider, '')) if headers is not None else None
+    if remaining is not None and remaining.isdigit():
+        UPSTREAM_RATE_LIMIT_REMAINING.labels(provider).set(int(remaining))
+
+
+def _sync_outcome(response):
+    if response is None:
+        return 'error'
+    if response.status_code == 429:
+        return 'rejected'
+    return 'success' if response.status_code < 400 else 'failed'
+
+
+def track_sync(provider):
+    """同期処理の所要時間を結果（success・failed・rejected・error）ごとに記録するデコレータ（非同期ビューにも使える）"""
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(*args, **kwargs):
+                started, response = time.perf_counter(), None
+                try:
+                    response = await view(*args, **kwargs)
+                    return response
+                finally:
+                    SYNC_DURATION.labels(provider, _sync_outcome(response)).observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            started, response = time.perf_counter(), None
+            try:
+                response = view(*args, **kwargs)
+                return response
+            finally:
+                SYNC_DURATION.labels(provider, _sync_outcome(response)).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """URL名ごとのリクエストの処理時間・ステータスコード・DBクエリ数を記録するミドルウェア（METRICS_ENABLED の場合のみ）"""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = (match.url_name or match.view_name) if match else 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+        REQUEST_LATENCY.labels(route, method).observe(elapsed)
+        REQUESTS.labels(route, method, str(response.status_code)).inc()
+        timing = current_timing()
+        if timing is not None:
+            REQUEST_DB_QUERIES.labels(route).observe(timing.db_queries)
+        return response
+
+
+def metrics_view(request):
+    """
+    Prometheus のテキスト形式でメトリクスを返す（METRICS_TOKEN の Bearer トークンを要求する）
+
+    METRICS_TOKEN が空の場合は DEBUG のときだけ認証なしで返し、それ以外は 404 にする。
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
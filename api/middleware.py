@@ -0,0 +1,69 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from .routers import enable_replica_reads, reset_replica_reads
+
+REPLICA_PIN_COOKIE = 'replica_pin'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    公開エンドポイントへの読み込みリクエストをリードレプリカへ振り分けるミドルウェア
+
+    書き込みを行ったクライアントは REPLICA_PIN_SECONDS の間プライマリに固定し、
+    レプリカの遅延で自分の書き込みが見えなくなることを防ぐ（read-your-writes）。
+    クライアントの識別には Authorization ヘッダー（トークン）とCookieの両方を使う。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            token = getattr(request, '_replica_reads_token', None)
+            if token is not None:
+                reset_replica_reads(token)
+        if (getattr(settings, 'DATABASE_REPLICAS', [])
+                and request.method not in SAFE_METHODS and response.status_code < 400):
+            self._pin(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(settings, 'DATABASE_REPLICAS', []):
+            return None
+        if request.method not in SAFE_METHODS:
+            return None
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        if url_name in settings.REPLICA_READ_ROUTES and not self._is_pinned(request):
+            # ビューの実行とレスポンスの描画が終わるまで（__call__ で戻すまで）有効にする
+            request._replica_reads_token = enable_replica_reads()
+        return None
+
+    def _client_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        digest = hashlib.sha256(authorization.encode('utf-8')).hexdigest()
+        return f'replica-pin:{digest}'
+
+    def _is_pinned(self, request):
+        if request.COOKIES.get(REPLICA_PIN_COOKIE):
+            return True
+        key = self._client_key(request)
+        return bool(key and cache.get(key))
+
+    def _pin(self, request, response):
+        seconds = settings.REPLICA_PIN_SECONDS
+        key = self._client_key(request)
+        if key:
+            cache.set(key, True, seconds)
+        secure = request.is_secure()
+        response.set_cookie(
+            REPLICA_PIN_COOKIE, '1', max_age=seconds, httponly=True,
+            secure=secure, samesite='None' if secure else 'Lax'
+        )
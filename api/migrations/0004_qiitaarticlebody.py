@@ -0,0 +1,74 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:11
+
+import api.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def move_bodies_to_table(apps, schema_editor):
+    """記事テーブルの本文を本文テーブルへ移す"""
+    db_alias = schema_editor.connection.alias
+    QiitaArticle = apps.get_model('api', 'QiitaArticle')
+    QiitaArticleBody = apps.get_model('api', 'QiitaArticleBody')
+
+    articles = QiitaArticle.objects.using(db_alias).only('id', 'body_md', 'body_html')
+    batch = []
+    for article in articles.iterator(chunk_size=BATCH_SIZE):
+        batch.append(QiitaArticleBody(
+            article_id=article.id,
+            body_md=article.body_md,
+            body_html=article.body_html,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            QiitaArticleBody.objects.using(db_alias).bulk_create(batch)
+            batch = []
+    if batch:
+        QiitaArticleBody.objects.using(db_alias).bulk_create(batch)
+
+
+def move_bodies_back(apps, schema_editor):
+    """本文テーブルの内容を記事テーブルへ戻す"""
+    db_alias = schema_editor.connection.alias
+    QiitaArticle = apps.get_model('api', 'QiitaArticle')
+    QiitaArticleBody = apps.get_model('api', 'QiitaArticleBody')
+
+    batch = []
+    for body in QiitaArticleBody.objects.using(db_alias).iterator(chunk_size=BATCH_SIZE):
+        batch.append(QiitaArticle(id=body.article_id, body_md=body.body_md, body_html=body.body_html))
+        if len(batch) >= BATCH_SIZE:
+            QiitaArticle.objects.using(db_alias).bulk_update(batch, ['body_md', 'body_html'])
+            batch = []
+    if batch:
+        QiitaArticle.objects.using(db_alias).bulk_update(batch, ['body_md', 'body_html'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_remove_education_degree_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QiitaArticleBody',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='body', serialize=False, to='api.qiitaarticle')),
+                ('body_md', api.fields.CompressedTextField(blank=True, help_text='記事本文(Markdown)', null=True)),
+                ('body_html', api.fields.CompressedTextField(blank=True, help_text='記事本文(HTML)', null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Qiita Article Bodies',
+            },
+        ),
+        migrations.RunPython(move_bodies_to_table, move_bodies_back),
+        migrations.RemoveField(
+            model_name='qiitaarticle',
+            name='body_html',
+        ),
+        migrations.RemoveField(
+            model_name='qiitaarticle',
+            name='body_md',
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+from api.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY はトランザクション内で実行できない
+    atomic = False
+
+    dependencies = [
+        ('api', '0004_qiitaarticlebody'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='education',
+            index=models.Index(fields=['user', '-end_date', '-start_date'], name='education_user_order_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='githubrepository',
+            index=models.Index(fields=['user', '-featured', '-pushed_at'], name='ghrepo_user_featured_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='githubrepository',
+            index=models.Index(fields=['user', 'full_name'], name='ghrepo_user_full_name_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='githubrepository',
+            index=models.Index(condition=models.Q(('featured', True), ('is_private', False)), fields=['user', '-pushed_at'], name='ghrepo_public_featured_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='githubrepository',
+            index=models.Index(condition=models.Q(('is_private', False)), fields=['user', '-pushed_at'], name='ghrepo_public_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(fields=['user', '-is_featured', 'order', '-created_at'], name='project_user_order_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='qiitaarticle',
+            index=models.Index(fields=['user', '-is_featured', '-created_at'], name='qiita_user_featured_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='qiitaarticle',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['user', '-created_at'], name='qiita_featured_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='qiitaarticle',
+            index=models.Index(fields=['user', '-created_at'], name='qiita_user_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='skill',
+            index=models.Index(fields=['user', 'category', 'order', 'name'], name='skill_user_category_order_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='skillcategory',
+            index=models.Index(fields=['user', 'order', 'created_at'], name='skillcat_user_order_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='workexperience',
+            index=models.Index(fields=['user', '-current', '-end_date', '-start_date'], name='workexp_user_order_idx'),
+        ),
+    ]
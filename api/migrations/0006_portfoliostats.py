@@ -0,0 +1,76 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def create_portfolio_stats(apps, schema_editor):
+    """既存プロフィールの集計値を計算して作成する"""
+    db_alias = schema_editor.connection.alias
+    UserProfile = apps.get_model('api', 'UserProfile')
+    PortfolioStats = apps.get_model('api', 'PortfolioStats')
+    GitHubRepository = apps.get_model('api', 'GitHubRepository')
+    QiitaArticle = apps.get_model('api', 'QiitaArticle')
+    Project = apps.get_model('api', 'Project')
+    Skill = apps.get_model('api', 'Skill')
+
+    profile_ids = list(UserProfile.objects.using(db_alias).order_by('id').values_list('id', flat=True))
+    for start in range(0, len(profile_ids), BATCH_SIZE):
+        ids = profile_ids[start:start + BATCH_SIZE]
+        stats = {profile_id: PortfolioStats(profile_id=profile_id) for profile_id in ids}
+
+        for row in (GitHubRepository.objects.using(db_alias).filter(user_id__in=ids)
+                    .values('user_id').annotate(count=models.Count('id'), stars=models.Sum('stargazers_count'))
+                    .order_by()):
+            stats[row['user_id']].repository_count = row['count']
+            stats[row['user_id']].stargazers_total = row['stars'] or 0
+        for row in (QiitaArticle.objects.using(db_alias).filter(user_id__in=ids)
+                    .values('user_id').annotate(count=models.Count('id'), likes=models.Sum('likes_count'))
+                    .order_by()):
+            stats[row['user_id']].article_count = row['count']
+            stats[row['user_id']].likes_total = row['likes'] or 0
+        for row in (Project.objects.using(db_alias).filter(user_id__in=ids)
+                    .values('user_id').annotate(count=models.Count('id')).order_by()):
+            stats[row['user_id']].project_count = row['count']
+        for row in (Skill.objects.using(db_alias).filter(user_id__in=ids)
+                    .values('user_id', 'level').annotate(count=models.Count('id')).order_by()):
+            stats[row['user_id']].skill_count += row['count']
+            if 1 <= row['level'] <= 5:
+                setattr(stats[row['user_id']], f"skill_level_{row['level']}_count", row['count'])
+
+        PortfolioStats.objects.using(db_alias).bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioStats',
+            fields=[
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='api.userprofile')),
+                ('repository_count', models.PositiveIntegerField(default=0, help_text='GitHubリポジトリ数')),
+                ('stargazers_total', models.PositiveIntegerField(default=0, help_text='GitHubスター数の合計')),
+                ('article_count', models.PositiveIntegerField(default=0, help_text='Qiita記事数')),
+                ('likes_total', models.PositiveIntegerField(default=0, help_text='Qiitaいいね数の合計')),
+                ('project_count', models.PositiveIntegerField(default=0, help_text='プロジェクト数')),
+                ('skill_count', models.PositiveIntegerField(default=0, help_text='スキル数')),
+                ('skill_level_1_count', models.PositiveIntegerField(default=0, help_text='初級のスキル数')),
+                ('skill_level_2_count', models.PositiveIntegerField(default=0, help_text='中級のスキル数')),
+                ('skill_level_3_count', models.PositiveIntegerField(default=0, help_text='上級のスキル数')),
+                ('skill_level_4_count', models.PositiveIntegerField(default=0, help_text='エキスパートのスキル数')),
+                ('skill_level_5_count', models.PositiveIntegerField(default=0, help_text='マスターのスキル数')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Portfolio Stats',
+            },
+        ),
+        migrations.RunPython(create_portfolio_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:17
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+from api.operations import AddIndexConcurrently
+
+
+# SQLite（ローカル開発・テスト用）ではFTS5の外部コンテンツテーブルとトリガーで索引を維持する
+SQLITE_FTS_SQL = [
+    """CREATE VIRTUAL TABLE api_searchdocument_fts USING fts5(
+        title, content, content='api_searchdocument', content_rowid='id'
+    )""",
+    """CREATE TRIGGER api_searchdocument_fts_ai AFTER INSERT ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER api_searchdocument_fts_ad AFTER DELETE ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(api_searchdocument_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER api_searchdocument_fts_au AFTER UPDATE ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(api_searchdocument_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO api_searchdocument_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+]
+
+SQLITE_FTS_DROP_SQL = [
+    'DROP TRIGGER IF EXISTS api_searchdocument_fts_au',
+    'DROP TRIGGER IF EXISTS api_searchdocument_fts_ad',
+    'DROP TRIGGER IF EXISTS api_searchdocument_fts_ai',
+    'DROP TABLE IF EXISTS api_searchdocument_fts',
+]
+
+
+def create_sqlite_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQLITE_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_sqlite_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQLITE_FTS_DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY はトランザクション内で実行できない
+    atomic = False
+
+    dependencies = [
+        ('api', '0006_portfoliostats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('profile', 'プロフィール'), ('project', 'プロジェクト'), ('work_experience', '職歴'), ('qiita_article', 'Qiita記事')], max_length=20)),
+                ('object_id', models.BigIntegerField(help_text='検索対象オブジェクトのID')),
+                ('title', models.CharField(max_length=255)),
+                ('content', models.TextField(blank=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='api.userprofile')),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        AddIndexConcurrently(
+            model_name='searchdocument',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='searchdoc_vector_gin'),
+        ),
+        migrations.RunPython(create_sqlite_fts, drop_sqlite_fts),
+    ]
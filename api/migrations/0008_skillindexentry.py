@@ -0,0 +1,56 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:19
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def build_skill_index(apps, schema_editor):
+    """既存スキルの転置インデックスを作成する"""
+    db_alias = schema_editor.connection.alias
+    Skill = apps.get_model('api', 'Skill')
+    SkillIndexEntry = apps.get_model('api', 'SkillIndexEntry')
+
+    batch = []
+    skills = Skill.objects.using(db_alias).only('id', 'name', 'user_id', 'level', 'experience_years')
+    for skill in skills.iterator(chunk_size=BATCH_SIZE):
+        key = re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', skill.name or '').casefold()).strip()
+        batch.append(SkillIndexEntry(
+            skill_id=skill.id, skill_key=key[:100], profile_id=skill.user_id,
+            level=skill.level, experience_years=skill.experience_years,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            SkillIndexEntry.objects.using(db_alias).bulk_create(batch)
+            batch = []
+    if batch:
+        SkillIndexEntry.objects.using(db_alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillIndexEntry',
+            fields=[
+                ('skill', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='index_entry', serialize=False, to='api.skill')),
+                ('skill_key', models.CharField(help_text='正規化（NFKC・小文字化）したスキル名', max_length=100)),
+                ('level', models.PositiveSmallIntegerField()),
+                ('experience_years', models.DecimalField(decimal_places=1, default=0, max_digits=3)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.userprofile')),
+            ],
+            options={
+                'verbose_name_plural': 'Skill Index Entries',
+                'indexes': [models.Index(fields=['skill_key', 'profile', 'level', 'experience_years'], name='skillindex_posting_idx')],
+            },
+        ),
+        migrations.RunPython(build_skill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-18 23:40
+
+import uuid
+
+from django.conf import settings
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    """プロフィールのない既存ユーザーにプロフィールと集計行を作成する"""
+    db_alias = schema_editor.connection.alias
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserProfile = apps.get_model('api', 'UserProfile')
+    PortfolioStats = apps.get_model('api', 'PortfolioStats')
+
+    users = User.objects.using(db_alias).filter(profile__isnull=True).order_by('id')
+    used_slugs = set()
+    profiles = []
+    for user in users.iterator():
+        slug = uuid.uuid4().hex[:8]
+        while slug in used_slugs or UserProfile.objects.using(db_alias).filter(portfolio_slug=slug).exists():
+            slug = uuid.uuid4().hex[:8]
+        used_slugs.add(slug)
+        display_name = f'{user.first_name} {user.last_name}'.strip() or user.username
+        profiles.append(UserProfile(user_id=user.id, display_name=display_name, title='', portfolio_slug=slug))
+
+    created = UserProfile.objects.using(db_alias).bulk_create(profiles, batch_size=1000)
+    # bulk_create ではシグナルが発行されないため集計行もここで作成する
+    PortfolioStats.objects.using(db_alias).bulk_create(
+        [PortfolioStats(profile_id=profile.id) for profile in created],
+        batch_size=1000, ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_skillindexentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_backfill_user_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='縮小版画像のパス（形式 → 幅 → パス、api/images.py で作成）'),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='icon_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='縮小版画像のパス（形式 → 幅 → パス、api/images.py で作成）'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='profile_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='縮小版画像のパス（形式 → 幅 → パス、api/images.py で作成）'),
+        ),
+    ]
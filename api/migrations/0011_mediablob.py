@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(help_text='ストレージ上のパス', max_length=255, primary_key=True, serialize=False)),
+                ('ref_count', models.IntegerField(default=0, help_text='参照している画像・ファイル項目の数')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('ref_count', 0)), fields=['updated_at'], name='mediablob_unreferenced_idx')],
+            },
+        ),
+    ]
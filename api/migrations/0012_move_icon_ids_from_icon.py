@@ -0,0 +1,40 @@
+# Generated by Django 5.0.2 on 2026-10-18 23:40
+
+from django.db import migrations
+from django.db.models import Q
+
+
+def move_icon_ids(apps, schema_editor):
+    """
+    set_icon が icon（画像ファイル）に書き込んでいたアイコンIDを icon_id に移す
+
+    アップロードされた画像は skill_icons/ などのディレクトリ付きのパスのため、'/' を含まない値をアイコンIDとみなす。
+    """
+    db_alias = schema_editor.connection.alias
+    Skill = apps.get_model('api', 'Skill')
+    skills = (
+        Skill.objects.using(db_alias)
+        .exclude(Q(icon__isnull=True) | Q(icon='') | Q(icon__contains='/'))
+        .only('id', 'icon', 'icon_id')
+    )
+    batch = []
+    for skill in skills.iterator(chunk_size=1000):
+        if not skill.icon_id:
+            skill.icon_id = skill.icon.name
+        skill.icon = ''
+        batch.append(skill)
+        if len(batch) >= 1000:
+            Skill.objects.using(db_alias).bulk_update(batch, ['icon', 'icon_id'])
+            batch = []
+    Skill.objects.using(db_alias).bulk_update(batch, ['icon', 'icon_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_mediablob'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_icon_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+from collections import Counter
+
+from django.db import migrations
+from django.utils import timezone
+
+
+BATCH_SIZE = 1000
+
+# api/blobs.py の MEDIA_FIELDS・VARIANT_FIELDS と同じ（モデル名 → ファイル項目、縮小版の項目）
+MEDIA_FIELDS = {
+    'UserProfile': (['profile_image', 'resume'], ['profile_image_variants']),
+    'Project': (['thumbnail'], ['thumbnail_variants']),
+    'Skill': (['icon'], ['icon_variants']),
+}
+
+
+def backfill_media_refs(apps, schema_editor):
+    """
+    MediaBlob の作成前にアップロードされたファイルの参照数を数えて登録する
+
+    0011 で作成した MediaBlob は空のため、既存のファイルは参照数0のまま削除・差し替えで負になってしまう。
+    0012 でアイコンIDを icon から移した後に数える。
+    """
+    db_alias = schema_editor.connection.alias
+    MediaBlob = apps.get_model('api', 'MediaBlob')
+
+    counts = Counter()
+    for model_name, (field_names, variant_fields) in MEDIA_FIELDS.items():
+        model = apps.get_model('api', model_name)
+        rows = model.objects.using(db_alias).values_list(*field_names, *variant_fields)
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            counts.update(name for name in row[:len(field_names)] if name)
+            for variants in row[len(field_names):]:
+                counts.update(
+                    name
+                    for image_format, paths in (variants or {}).items() if image_format != 'source'
+                    for name in paths.values()
+                )
+
+    existing = dict(MediaBlob.objects.using(db_alias).values_list('name', 'ref_count'))
+    now = timezone.now()
+    MediaBlob.objects.using(db_alias).bulk_create(
+        [MediaBlob(name=name, ref_count=count) for name, count in counts.items() if name not in existing],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+    MediaBlob.objects.using(db_alias).bulk_update(
+        [
+            MediaBlob(name=name, ref_count=counts.get(name, 0), updated_at=now)
+            for name, ref_count in existing.items() if counts.get(name, 0) != ref_count
+        ],
+        ['ref_count', 'updated_at'], batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_move_icon_ids_from_icon'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_media_refs, migrations.RunPython.noop),
+    ]
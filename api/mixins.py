@@ -0,0 +1,266 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from .models import UserProfile, Skill
+from .search import KIND_BY_MODEL, index_objects
+from .serializers import OwnedPrimaryKeyListField
+from .signals import COUNTED_MODELS
+from .skill_index import reindex_skill_ids
+from .stats import refresh_portfolio_stats
+
+
+def get_request_profile(request):
+    """
+    リクエストした利用者のプロフィールを返す（未認証・プロフィールなしの場合は None）
+
+    1リクエストにつき1回だけ読み込み、元の HttpRequest に保存して使い回す。
+    """
+    http_request = getattr(request, '_request', request)
+    if not hasattr(http_request, '_cached_profile'):
+        user = request.user
+        profile = None
+        if user.is_authenticated:
+            profile = UserProfile.objects.filter(user_id=user.id).first()
+            if profile is not None:
+                # profile.user で利用者を再度読み込まないようにする
+                profile.user = user
+        http_request._cached_profile = profile
+    return http_request._cached_profile
+
+
+class RequestProfileMixin:
+    """
+    認証後に request.profile へ利用者のプロフィールを設定するViewSet用のMixin
+
+    プロフィールはユーザー登録時に作成されるため、ここでは作成しない。
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        request.profile = get_request_profile(request)
+
+    def get_profile(self):
+        """利用者のプロフィールを返す。存在しない場合は404"""
+        profile = get_request_profile(self.request)
+        if profile is None:
+            raise NotFound('ユーザープロフィールが見つかりません。')
+        return profile
+
+    def get_owned_queryset(self, queryset):
+        """スタッフは全件、それ以外は自分のプロフィールに属する行だけに絞り込む"""
+        if self.request.user.is_staff:
+            return queryset
+        profile = get_request_profile(self.request)
+        if profile is None:
+            return queryset.none()
+        return queryset.filter(user_id=profile.id)
+
+
+class _PrefetchedObjects:
+    """関連フィールドの queryset の代わりに、まとめて読み込んだオブジェクトから get(pk=...) する"""
+
+    def __init__(self, model, objects):
+        self.model = model
+        self.objects = objects
+
+    def get(self, pk):
+        try:
+            key = self.model._meta.pk.to_python(pk)
+        except DjangoValidationError:
+            raise ValueError(pk)
+        obj = self.objects.get(key)
+        if obj is None:
+            raise self.model.DoesNotExist
+        return obj
+
+    def order_by(self):
+        return self
+
+    def in_bulk(self, pks):
+        return {pk: self.objects[pk] for pk in pks if pk in self.objects}
+
+
+class BulkEditMixin:
+    """
+    一覧をまとめて作成・更新する bulk アクションを追加するViewSet用のMixin（RequestProfileMixin と併用する）
+
+    POST {prefix}/bulk/ に項目のリストを送ると、全件をバリデーションしてから
+    1トランザクションで bulk_create（id なし）・bulk_update（id あり）する。
+    1件でもエラーがあれば何も保存せず、リストと同じ順序のエラーを返す。
+    bulk_create / bulk_update ではシグナルが発行されないため、集計値・検索索引はまとめて更新する。
+    ファイル項目（画像など）は JSON では送れないため、個別のエンドポイントで更新する。
+    """
+    bulk_max_items = 500
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': '項目のリストを送信してください。'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.bulk_max_items:
+            return Response(
+                {'error': f'一度に送信できる項目は{self.bulk_max_items}件までです。'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        profile = self.get_profile()
+        model = self.get_queryset().model
+        ids = [item['id'] for item in items if isinstance(item, dict) and isinstance(item.get('id'), int)]
+        instances = model.objects.filter(user_id=profile.id).in_bulk(ids)
+
+        # 1. 全件をバリデーションする（関連オブジェクトはフィールドごとに1回で読み込む）
+        related_objects = self._prefetch_related_values(items)
+        serializers_ = []
+        errors = []
+        for item in items:
+            if not isinstance(item, dict):
+                errors.append({'non_field_errors': ['オブジェクトを指定してください。']})
+                serializers_.append(None)
+                continue
+            instance = None
+            if item.get('id') is not None:
+                instance = instances.get(item['id'])
+                if instance is None:
+                    errors.append({'id': ['対象が見つかりません。']})
+                    serializers_.append(None)
+                    continue
+            serializer = self.get_serializer(instance, data=item, partial=instance is not None)
+            for name, relation in self._related_fields(serializer):
+                if name in related_objects:
+                    relation.queryset = related_objects[name]
+            errors.append({} if serializer.is_valid() else serializer.errors)
+            serializers_.append(serializer)
+        if any(errors):
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 2. 1トランザクションでまとめて保存する
+        m2m_fields = {field.name: field for field in model._meta.many_to_many}
+        file_fields = {field.name for field in model._meta.concrete_fields if isinstance(field, models.FileField)}
+        auto_now_fields = [field.name for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)]
+        to_create, to_update, update_fields, m2m_values = [], [], set(auto_now_fields), []
+        for serializer in serializers_:
+            data = dict(serializer.validated_data)
+            relations = {name: data.pop(name) for name in list(data) if name in m2m_fields}
+            for name in file_fields:
+                data.pop(name, None)
+            if serializer.instance is None:
+                obj = model(user=profile, **data)
+                to_create.append(obj)
+            else:
+                obj = serializer.instance
+                for name, value in data.items():
+                    setattr(obj, name, value)
+                update_fields.update(data)
+                to_update.append(obj)
+            m2m_values.append((obj, relations))
+
+        try:
+            with transaction.atomic():
+                now = timezone.now()
+                for obj in to_update:
+                    for name in auto_now_fields:
+                        setattr(obj, name, now)
+                model.objects.bulk_create(to_create)
+                if to_update and update_fields:
+                    model.objects.bulk_update(to_update, sorted(update_fields))
+                self._bulk_set_m2m(m2m_fields, m2m_values)
+        except IntegrityError:
+            return Response(
+                {'error': '重複する項目があるため保存できませんでした。'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        object_ids = [obj.id for obj, relations in m2m_values]
+        self.after_bulk_write(profile, model, object_ids)
+
+        # 3. 保存結果を1回の読み込み（と関連のprefetch）で返す
+        saved = self.get_queryset().filter(user_id=profile.id).in_bulk(object_ids)
+        data = self.get_serializer([saved[object_id] for object_id in object_ids], many=True).data
+        return Response({'results': data})
+
+    def _related_fields(self, serializer):
+        """書き込み可能な主キー指定の関連フィールドを (フィールド名, 主キーを解決するフィールド) で返す"""
+        for name, field in serializer.fields.items():
+            if field.read_only:
+                continue
+            relation = getattr(field, 'child_relation', field)
+            if isinstance(relation, (serializers.PrimaryKeyRelatedField, OwnedPrimaryKeyListField)):
+                yield name, relation
+
+    def _prefetch_related_values(self, items):
+        """関連フィールドに指定された主キーをまとめて集め、フィールドごとに1回のクエリで読み込む"""
+        related_objects = {}
+        for name, relation in self._related_fields(self.get_serializer()):
+            pks = set()
+            for item in items:
+                value = item.get(name) if isinstance(item, dict) else None
+                values = value if isinstance(value, list) else [value]
+                pks.update(pk for pk in values if isinstance(pk, (int, str)) and not isinstance(pk, bool))
+            queryset = relation.get_queryset()
+            try:
+                objects = queryset.in_bulk(pks) if pks else {}
+            except (TypeError, ValueError, DjangoValidationError):
+                # 型の誤りは個別のバリデーションでエラーにする
+                continue
+            related_objects[name] = _PrefetchedObjects(queryset.model, objects)
+        return related_objects
+
+    def _bulk_set_m2m(self, m2m_fields, m2m_values):
+        """多対多の関連を、中間テーブルの削除と bulk_create でまとめて置き換える"""
+        for name, field in m2m_fields.items():
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            changed = [(obj, relations[name]) for obj, relations in m2m_values if name in relations]
+            if not changed:
+                continue
+            through.objects.filter(**{f'{source}_id__in': [obj.id for obj, values in changed]}).delete()
+            through.objects.bulk_create([
+                through(**{f'{source}_id': obj.id, f'{target}_id': related.pk})
+                for obj, values in changed
+                for related in values
+            ], ignore_conflicts=True)
+
+    def after_bulk_write(self, profile, model, object_ids):
+        """シグナルの代わりに集計値・検索索引・タレント検索の索引を更新する"""
+        if model in COUNTED_MODELS:
+            refresh_portfolio_stats([profile.id])
+        if model in KIND_BY_MODEL:
+            index_objects(KIND_BY_MODEL[model], object_ids)
+        if model is Skill:
+            reindex_skill_ids(object_ids)
+
+
+class ReorderMixin:
+    """
+    order フィールドを1回のUPDATEで並べ替える reorder アクションを追加するViewSet用のMixin
+
+    POST {prefix}/reorder/ {"ids": [3, 1, 2]} で、リストの順に order を 0, 1, 2 ... に書き換える。
+    """
+
+    @action(detail=False, methods=['post'])
+    def reorder(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if (not isinstance(ids, list) or not ids
+                or not all(isinstance(object_id, int) for object_id in ids) or len(set(ids)) != len(ids)):
+            return Response({'error': 'ids に重複のないIDのリストを指定してください。'}, status=status.HTTP_400_BAD_REQUEST)
+
+        profile = self.get_profile()
+        model = self.get_queryset().model
+        with transaction.atomic():
+            updated = model.objects.filter(user_id=profile.id, id__in=ids).update(
+                order=Case(
+                    *[When(id=object_id, then=Value(position)) for position, object_id in enumerate(ids)],
+                    output_field=models.PositiveIntegerField()
+                )
+            )
+            if updated != len(ids):
+                transaction.set_rollback(True)
+                return Response({'error': '対象が見つからないIDが含まれています。'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'ids': ids})
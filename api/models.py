@@ -1,9 +1,13 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 import uuid
 import os
 from django.utils import timezone
 
+from .fields import CompressedTextField
+
 def profile_image_path(instance, filename):
     """カスタムファイルパスを生成する"""
     ext = filename.split('.')[-1]
@@ -31,6 +35,7 @@ class UserProfile(models.Model):
     """ユーザープロフィールモデル"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     profile_image = models.ImageField(upload_to=profile_image_path, blank=True, null=True)
+    profile_image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="縮小版画像のパス（形式 → 幅 → パス、api/images.py で作成）")
     display_name = models.CharField(max_length=100)
     title = models.CharField(max_length=100, help_text="例: フルスタックエンジニア") 
     bio = models.TextField(blank=True, help_text="自己紹介/自己PR") 
@@ -60,6 +65,28 @@ class UserProfile(models.Model):
             self.portfolio_slug = generate_unique_portfolio_id()
         super(UserProfile, self).save(*args, **kwargs)
 
+class PortfolioStats(models.Model):
+    """ポートフォリオの集計値（ダッシュボード・公開カード用に差分で更新する非正規化テーブル）"""
+    profile = models.OneToOneField(UserProfile, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    repository_count = models.PositiveIntegerField(default=0, help_text="GitHubリポジトリ数")
+    stargazers_total = models.PositiveIntegerField(default=0, help_text="GitHubスター数の合計")
+    article_count = models.PositiveIntegerField(default=0, help_text="Qiita記事数")
+    likes_total = models.PositiveIntegerField(default=0, help_text="Qiitaいいね数の合計")
+    project_count = models.PositiveIntegerField(default=0, help_text="プロジェクト数")
+    skill_count = models.PositiveIntegerField(default=0, help_text="スキル数")
+    skill_level_1_count = models.PositiveIntegerField(default=0, help_text="初級のスキル数")
+    skill_level_2_count = models.PositiveIntegerField(default=0, help_text="中級のスキル数")
+    skill_level_3_count = models.PositiveIntegerField(default=0, help_text="上級のスキル数")
+    skill_level_4_count = models.PositiveIntegerField(default=0, help_text="エキスパートのスキル数")
+    skill_level_5_count = models.PositiveIntegerField(default=0, help_text="マスターのスキル数")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Portfolio Stats"
+
+    def __str__(self):
+        return f"{self.profile_id}の集計"
+
 class SkillCategory(models.Model):
     """スキルカテゴリモデル（言語、フレームワーク、インフラなど）"""
     name = models.CharField(max_length=100)
@@ -72,6 +99,9 @@ class SkillCategory(models.Model):
     class Meta:
         ordering = ['order', 'created_at']
         unique_together = ['name', 'user']  # ユーザーごとにカテゴリ名を一意にする
+        indexes = [
+            models.Index(fields=['user', 'order', 'created_at'], name='skillcat_user_order_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -92,6 +122,7 @@ class Skill(models.Model):
     level = models.IntegerField(choices=LEVEL_CHOICES, default=1)
     experience_years = models.DecimalField(max_digits=3, decimal_places=1, default=0)
     icon = models.ImageField(upload_to=skill_icon_path, blank=True, null=True)
+    icon_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="縮小版画像のパス（形式 → 幅 → パス、api/images.py で作成）")
     icon_id = models.CharField(max_length=100, blank=True, null=True)
     description = models.TextField(blank=True)
     order = models.PositiveIntegerField(default=0)
@@ -100,10 +131,34 @@ class Skill(models.Model):
     class Meta:
         ordering = ['category', 'order', 'name']
         unique_together = ['user', 'name']
+        indexes = [
+            models.Index(fields=['user', 'category', 'order', 'name'], name='skill_user_category_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.get_level_display()})"
 
+class SkillIndexEntry(models.Model):
+    """スキル検索用の転置インデックス（正規化したスキル名 → プロフィール、レベル、経験年数）"""
+    skill = models.OneToOneField(Skill, on_delete=models.CASCADE, primary_key=True, related_name='index_entry')
+    skill_key = models.CharField(max_length=100, help_text="正規化（NFKC・小文字化）したスキル名")
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='+')
+    level = models.PositiveSmallIntegerField()
+    experience_years = models.DecimalField(max_digits=3, decimal_places=1, default=0)
+
+    class Meta:
+        verbose_name_plural = "Skill Index Entries"
+        indexes = [
+            # スキル名ごとのポスティングリストをプロフィールID順にインデックスのみで取得する
+            models.Index(
+                fields=['skill_key', 'profile', 'level', 'experience_years'],
+                name='skillindex_posting_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.skill_key} -> {self.profile_id}"
+
 class ProcessExperience(models.Model):
     """担当工程の経験を記録するモデル"""
     PROCESS_CHOICES = [
@@ -135,6 +190,7 @@ class Project(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     thumbnail = models.ImageField(upload_to='project_thumbnails/', blank=True, null=True)
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="縮小版画像のパス（形式 → 幅 → パス、api/images.py で作成）")
     project_url = models.URLField(blank=True, help_text="プロジェクトのURL")
     github_url = models.URLField(blank=True, help_text="GitHubリポジトリのURL")
     technologies_used = models.ManyToManyField(Skill, related_name='projects')
@@ -147,6 +203,9 @@ class Project(models.Model):
     
     class Meta:
         ordering = ['-is_featured', 'order', '-created_at']
+        indexes = [
+            models.Index(fields=['user', '-is_featured', 'order', '-created_at'], name='project_user_order_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -163,6 +222,9 @@ class Education(models.Model):
     class Meta:
         ordering = ['-end_date', '-start_date']
         verbose_name_plural = "Education"
+        indexes = [
+            models.Index(fields=['user', '-end_date', '-start_date'], name='education_user_order_idx'),
+        ]
     
     def __str__(self):
         return self.institution
@@ -195,6 +257,9 @@ class WorkExperience(models.Model):
     
     class Meta:
         ordering = ['-current', '-end_date', '-start_date']
+        indexes = [
+            models.Index(fields=['user', '-current', '-end_date', '-start_date'], name='workexp_user_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.position} at {self.company or 'プロジェクト'}"
@@ -223,6 +288,22 @@ class GitHubRepository(models.Model):
     class Meta:
         verbose_name_plural = "GitHub Repositories"
         ordering = ['-featured', '-pushed_at']
+        indexes = [
+            # 所有者のリポジトリ一覧（デフォルトの並び順）
+            models.Index(fields=['user', '-featured', '-pushed_at'], name='ghrepo_user_featured_idx'),
+            # 同期時の full_name による更新・削除
+            models.Index(fields=['user', 'full_name'], name='ghrepo_user_full_name_idx'),
+            # 公開プロフィール: 特集中の公開リポジトリ
+            models.Index(
+                fields=['user', '-pushed_at'], name='ghrepo_public_featured_idx',
+                condition=models.Q(is_private=False, featured=True)
+            ),
+            # 公開プロフィール: 特集がない場合の最新の公開リポジトリ
+            models.Index(
+                fields=['user', '-pushed_at'], name='ghrepo_public_recent_idx',
+                condition=models.Q(is_private=False)
+            ),
+        ]
     
     def __str__(self):
         return self.name
@@ -256,14 +337,104 @@ class QiitaArticle(models.Model):
     created_at = models.DateTimeField(help_text="記事作成日")
     updated_at = models.DateTimeField(help_text="記事更新日")
     tags = models.JSONField(default=list, blank=True, null=True, help_text="記事のタグ")
-    body_md = models.TextField(blank=True, null=True, help_text="記事本文(Markdown)")
-    body_html = models.TextField(blank=True, null=True, help_text="記事本文(HTML)")
     is_featured = models.BooleanField(default=False, help_text="ポートフォリオで特集するかどうか")
     
     class Meta:
         verbose_name_plural = "Qiita Articles"
         ordering = ['-is_featured', '-created_at']
         unique_together = ['user', 'article_id']
+        indexes = [
+            # 所有者の記事一覧（デフォルトの並び順）
+            models.Index(fields=['user', '-is_featured', '-created_at'], name='qiita_user_featured_idx'),
+            # 公開プロフィール: 特集記事
+            models.Index(
+                fields=['user', '-created_at'], name='qiita_featured_recent_idx',
+                condition=models.Q(is_featured=True)
+            ),
+            # 公開プロフィール: 特集がない場合の最新記事
+            models.Index(fields=['user', '-created_at'], name='qiita_user_recent_idx'),
+        ]
     
     def __str__(self):
         return self.title
+
+    def _get_body(self):
+        try:
+            return self.body
+        except QiitaArticleBody.DoesNotExist:
+            return None
+
+    @property
+    def body_md(self):
+        """記事本文(Markdown)。本文テーブルから透過的に取得する"""
+        body = self._get_body()
+        return body.body_md if body else None
+
+    @property
+    def body_html(self):
+        """記事本文(HTML)。本文テーブルから透過的に取得する"""
+        body = self._get_body()
+        return body.body_html if body else None
+
+    def set_body(self, body_md, body_html):
+        """記事本文を保存（存在しなければ作成）する"""
+        body, created = QiitaArticleBody.objects.update_or_create(
+            article=self,
+            defaults={'body_md': body_md, 'body_html': body_html}
+        )
+        self.body = body
+        return body
+
+class QiitaArticleBody(models.Model):
+    """Qiita記事の本文（一覧・集計で読み込まないよう記事テーブルから分離）"""
+    article = models.OneToOneField(QiitaArticle, on_delete=models.CASCADE, primary_key=True, related_name='body')
+    body_md = CompressedTextField(blank=True, null=True, help_text="記事本文(Markdown)")
+    body_html = CompressedTextField(blank=True, null=True, help_text="記事本文(HTML)")
+
+    class Meta:
+        verbose_name_plural = "Qiita Article Bodies"
+
+    def __str__(self):
+        return f"{self.article_id}の本文"
+
+class SearchDocument(models.Model):
+    """全文検索用ドキュメント（プロフィール・プロジェクト・職歴・Qiita記事を1つの索引にまとめる）"""
+    KIND_CHOICES = [
+        ('profile', 'プロフィール'),
+        ('project', 'プロジェクト'),
+        ('work_experience', '職歴'),
+        ('qiita_article', 'Qiita記事'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField(help_text="検索対象オブジェクトのID")
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='search_documents')
+    title = models.CharField(max_length=255)
+    content = models.TextField(blank=True)
+    # PostgreSQLのみ使用（SQLiteではFTS5の仮想テーブルを使用する）
+    search_vector = SearchVectorField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['kind', 'object_id']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='searchdoc_vector_gin'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
+
+class MediaBlob(models.Model):
+    """アップロードファイル（api/storage.py で内容のハッシュから命名）と、それを参照している行の数"""
+    name = models.CharField(max_length=255, primary_key=True, help_text="ストレージ上のパス")
+    ref_count = models.IntegerField(default=0, help_text="参照している画像・ファイル項目の数")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # gc_media: 参照されなくなったファイルの検索
+            models.Index(fields=['updated_at'], name='mediablob_unreferenced_idx', condition=models.Q(ref_count=0)),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
@@ -0,0 +1,33 @@
+from django.contrib.postgres.indexes import PostgresIndex
+from django.contrib.postgres.operations import AddIndexConcurrently as PostgresAddIndexConcurrently
+
+
+class AddIndexConcurrently(PostgresAddIndexConcurrently):
+    """
+    PostgreSQLでは CREATE INDEX CONCURRENTLY でテーブルをロックせずにインデックスを作成し、
+    それ以外のDB(ローカル開発・テスト用のSQLiteなど)では通常の CREATE INDEX で作成するマイグレーション操作
+
+    GINなどPostgreSQL専用のインデックスはPostgreSQL以外では作成しない。
+    使用するマイグレーションは atomic = False にすること。
+    """
+
+    def _is_postgresql(self, schema_editor):
+        return schema_editor.connection.vendor == 'postgresql'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if self._is_postgresql(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        if isinstance(self.index, PostgresIndex):
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if self._is_postgresql(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        if isinstance(self.index, PostgresIndex):
+            return
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index)
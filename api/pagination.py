@@ -0,0 +1,224 @@
+import base64
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    キーセット（カーソル）方式のページネーション
+
+    モデルのデフォルトの並び順（Meta.ordering）に主キーを加えた並びで
+    「前ページ最後の行より後ろ」を WHERE 条件で取得するため、OFFSET や COUNT(*) を使わず
+    深いページでも一定のコストで取得できる。NULL は PostgreSQL の既定と同じく最大値として扱う。
+    外部キーによる並び順は Django と同じく関連先の並び順に展開し、外部キーの値を加えて順序を固定する。
+
+    クエリパラメータ:
+        cursor: レスポンスの next / previous に含まれるカーソル
+        page_size: 1ページの件数（max_page_size が上限）
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 100
+    max_page_size = 500
+    invalid_cursor_message = '不正なカーソルです。'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.fields = self.get_ordering_fields(queryset)
+        values, reverse = self.decode_cursor(request)
+        self.has_cursor = values is not None
+        self.reverse = reverse
+
+        queryset = queryset.order_by(*self._order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.has_cursor
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering_fields(self, queryset):
+        """並び順を (参照パス, 降順か, NULL許可か, フィールド) のリストにする。末尾には必ず主キーを含める"""
+        model = queryset.model
+        ordering = list(queryset.query.order_by or model._meta.ordering)
+        fields = []
+        try:
+            for item in ordering:
+                if not isinstance(item, str):
+                    # 式による並び替えはキーセットに使えないため主キー順にする
+                    raise FieldDoesNotExist(item)
+                fields += self._expand_ordering(model, '', item.lstrip('-'), item.startswith('-'), False, {model})
+        except FieldDoesNotExist:
+            fields = []
+        pk = model._meta.pk
+        if not any(path == pk.attname for path, descending, nullable, field in fields):
+            # 並び順が同じ行の順序を固定するため主キーを加える
+            fields.append((pk.attname, False, False, pk))
+        return fields
+
+    def _expand_ordering(self, model, prefix, name, descending, nullable, seen):
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        nullable = nullable or field.null
+        related = field.related_model if field.many_to_one or field.one_to_one else None
+        if related is None or not related._meta.ordering or related in seen:
+            return [(prefix + field.attname, descending, nullable, field)]
+        # 外部キーは Django と同じく関連先の並び順で並べ、関連先が同じ順位の場合のために外部キーの値を加える
+        fields = []
+        for item in related._meta.ordering:
+            if not isinstance(item, str):
+                raise FieldDoesNotExist(item)
+            fields += self._expand_ordering(
+                related, f'{prefix}{field.name}__', item.lstrip('-'),
+                descending != item.startswith('-'), nullable, seen | {related}
+            )
+        fields.append((prefix + field.attname, descending, nullable, field))
+        return fields
+
+    def _order_by(self, reverse):
+        order_by = []
+        for name, descending, nullable, field in self.fields:
+            descending = descending != reverse
+            if descending:
+                order_by.append(F(name).desc(nulls_first=True) if nullable else F(name).desc())
+            else:
+                order_by.append(F(name).asc(nulls_last=True) if nullable else F(name).asc())
+        return order_by
+
+    def _beyond(self, name, descending, nullable, value):
+        """並び順でvalueより後ろに来る条件（NULLは最大値として扱う）。該当なしの場合はNone"""
+        if descending:
+            if value is None:
+                return Q(**{f'{name}__isnull': False})
+            return Q(**{f'{name}__lt': value})
+        if value is None:
+            return None
+        condition = Q(**{f'{name}__gt': value})
+        if nullable:
+            condition |= Q(**{f'{name}__isnull': True})
+        return condition
+
+    def _equal(self, name, value):
+        if value is None:
+            return Q(**{f'{name}__isnull': True})
+        return Q(**{name: value})
+
+    def _after(self, values, reverse):
+        """カーソルの行より後ろの行を表す条件（辞書式順序）"""
+        conditions = []
+        for index, (name, descending, nullable, field) in enumerate(self.fields):
+            condition = self._beyond(name, descending != reverse, nullable, values[index])
+            if condition is None:
+                continue
+            for (previous_name, _, _, _), previous_value in zip(self.fields[:index], values[:index]):
+                condition &= self._equal(previous_name, previous_value)
+            conditions.append(condition)
+        if not conditions:
+            return Q(pk__in=[])
+        combined = conditions[0]
+        for condition in conditions[1:]:
+            combined |= condition
+        return combined
+
+    def encode_cursor(self, row, reverse):
+        values = [_encode_value(_row_value(row, path)) for path, descending, nullable, field in self.fields]
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        """カーソルを (並び順の値のリスト, 逆方向か) に戻す。カーソルがなければ (None, False)"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            raw_values = payload['v']
+            reverse = bool(payload.get('r', False))
+            if len(raw_values) != len(self.fields):
+                raise ValueError('field count mismatch')
+            values = [
+                None if value is None else field.to_python(value)
+                for (path, descending, nullable, field), value in zip(self.fields, raw_values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.encode_cursor(self.page[-1], reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.encode_cursor(self.page[0], reverse=True))
+
+    def _link(self, cursor):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+
+def _row_value(row, path):
+    """'category__order' のような参照パスの値を行から取り出す（途中が NULL の場合は None）"""
+    *relations, name = path.split('__')
+    for relation in relations:
+        row = getattr(row, relation)
+        if row is None:
+            return None
+    return getattr(row, name)
+
+
+def _encode_value(value):
+    # 日時はマイクロ秒まで残す（DjangoJSONEncoder はミリ秒に切り捨てるため、同じミリ秒内の行を取りこぼす）
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
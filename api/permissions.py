@@ -1,28 +1,31 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import permissions
 
+from .mixins import get_request_profile
+from .models import UserProfile
+
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """
     オブジェクトの所有者のみが編集可能な権限クラス
+
+    関連オブジェクトを読み込まず、外部キーのIDだけで所有者を判定する。
     """
     def has_object_permission(self, request, view, obj):
         # 読み取り権限は全てのリクエストに許可
         if request.method in permissions.SAFE_METHODS:
             return True
-            
-        # ユーザープロフィールの場合
-        if hasattr(obj, 'user'):
-            # obj.userがUserProfileインスタンスの場合
-            if hasattr(obj.user, 'user'):
-                return obj.user.user == request.user
-            # obj.userがUserインスタンスの場合
-            return obj.user == request.user
-            
-        # ユーザープロフィールに関連するモデルの場合
-        if hasattr(obj, 'profile'):
-            return obj.profile.user == request.user
-            
-        # 直接user_idを持つモデルの場合
-        if hasattr(obj, 'user_id'):
-            return obj.user_id == request.user.id
-            
-        return False 
\ No newline at end of file
+
+        for name in ('user', 'profile'):
+            try:
+                field = obj._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            owner_id = getattr(obj, field.attname)
+            # UserProfileを参照するモデル（スキル、プロジェクトなど）
+            if field.related_model is UserProfile:
+                profile = get_request_profile(request)
+                return profile is not None and owner_id == profile.id
+            # Userを直接参照するモデル（UserProfile、SkillCategoryなど）
+            return owner_id == request.user.id
+
+        return False
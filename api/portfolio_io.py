@@ -0,0 +1,333 @@
+"""
+ポートフォリオ全体のエクスポート・インポート（NDJSON: 1行1レコード）
+
+1行目はヘッダー {"type": "meta", "version": 1, ...}、以降は {"type": 種類, "data": {...}} の行が
+依存関係の順（カテゴリ → スキル → プロジェクト ...）に並ぶ。data の id はエクスポート元のIDで、
+インポート時に新しいIDへ振り替える。アクセストークンなどの認証情報はエクスポートしない。
+"""
+import json
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .blobs import MEDIA_FIELDS, VARIANT_FIELDS, adjust_media_refs, referenced_names
+from .models import (
+    SkillCategory, Skill, Project, Education, WorkExperience, ProcessExperience,
+    GitHubRepository, GitHubCommitStats, QiitaArticle, QiitaArticleBody
+)
+from .search import KIND_BY_MODEL, index_objects, search_batch
+from .skill_index import reindex_skill_ids
+from .storage import is_relative_storage_path
+from .stats import refresh_portfolio_stats, stats_batch
+
+FORMAT_VERSION = 1
+CHUNK_SIZE = 500
+
+# エクスポート・インポートしないプロフィールの項目（認証情報・所有者・URL）
+PROFILE_EXCLUDED_FIELDS = {
+    'id', 'user', 'portfolio_slug', 'github_access_token', 'qiita_access_token',
+    'github_client_id', 'github_client_secret', 'created_at', 'updated_at',
+}
+
+# 種類ごとのモデルと、多対多の関連（data のキー → モデルの多対多フィールド名）
+SECTIONS = [
+    ('skill_category', SkillCategory, {}),
+    ('skill', Skill, {}),
+    ('project', Project, {'technologies': 'technologies_used'}),
+    ('education', Education, {}),
+    ('work_experience', WorkExperience, {'skills_used': 'skills_used'}),
+    ('process_experience', ProcessExperience, {}),
+    ('github_repository', GitHubRepository, {}),
+    ('github_commit_stats', GitHubCommitStats, {}),
+    ('qiita_article', QiitaArticle, {}),
+]
+MODEL_BY_TYPE = {record_type: model for record_type, model, m2m in SECTIONS}
+M2M_BY_TYPE = {record_type: m2m for record_type, model, m2m in SECTIONS}
+
+# 他の種類を参照する外部キー（フィールド名 → 参照先の種類）
+REFERENCES = {
+    Skill: {'category': 'skill_category'},
+}
+
+
+class PortfolioImportError(ValueError):
+    """インポートデータが不正な場合の例外（line はエラーのあった行番号）"""
+
+    def __init__(self, message, line=None):
+        super().__init__(message)
+        self.line = line
+
+
+def _dump_fields(obj, excluded=()):
+    data = {}
+    for field in obj._meta.concrete_fields:
+        if field.name in excluded or field.name == 'user':
+            continue
+        value = field.value_from_object(obj)
+        if isinstance(field, models.FileField):
+            value = value.name or None
+        data[field.name] = value
+    return data
+
+
+def _line(record_type, data=None, **extra):
+    record = {'type': record_type, **extra}
+    if data is not None:
+        record['data'] = data
+    return json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _owned_queryset(model, profile):
+    if model is SkillCategory:
+        return model.objects.filter(user_id=profile.user_id)
+    return model.objects.filter(user_id=profile.id)
+
+
+def export_portfolio(profile):
+    """
+    プロフィールと所有データを NDJSON の行として順に返すジェネレーター
+
+    各テーブルは iterator() で CHUNK_SIZE 件ずつ読み込むため、データ量に関わらずメモリ使用量は一定。
+    """
+    yield _line('meta', version=FORMAT_VERSION, exported_at=timezone.now())
+    yield _line('profile', _dump_fields(profile, PROFILE_EXCLUDED_FIELDS))
+
+    for record_type, model, m2m in SECTIONS:
+        queryset = _owned_queryset(model, profile).order_by('pk')
+        for name in m2m.values():
+            # iterator() でもチャンクごとに関連をまとめて読み込む
+            queryset = queryset.prefetch_related(Prefetch(name, queryset=Skill.objects.only('id')))
+        if model is QiitaArticle:
+            queryset = queryset.select_related('body')
+        for obj in queryset.iterator(chunk_size=CHUNK_SIZE):
+            data = _dump_fields(obj)
+            for key, name in m2m.items():
+                data[key] = [related.pk for related in getattr(obj, name).all()]
+            if model is QiitaArticle:
+                data['body_md'] = obj.body_md
+                data['body_html'] = obj.body_html
+            yield _line(record_type, data)
+
+
+class PortfolioImporter:
+    """
+    export_portfolio() の出力を読み込み、既存の所有データを置き換える
+
+    種類ごとに CHUNK_SIZE 件ずつ bulk_create し、エクスポート元のIDから新しいIDへの対応を保持して
+    外部キー・多対多の参照を振り替える。全体を1トランザクションで行い、エラー時は何も変更しない。
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.id_maps = {record_type: {} for record_type in MODEL_BY_TYPE}
+        self.pending = []
+        self.pending_type = None
+        self.seen_types = []
+        self.counts = {}
+
+    def run(self, lines):
+        with transaction.atomic():
+            with stats_batch(), search_batch():
+                self._delete_existing()
+                self._read(lines)
+                self._flush()
+            self._refresh_derived_data()
+        return self.counts
+
+    def _delete_existing(self):
+        # 削除時のシグナル（集計値・検索索引）は stats_batch / search_batch でまとめて反映される
+        for record_type, model, m2m in reversed(SECTIONS):
+            _owned_queryset(model, self.profile).delete()
+
+    def _read(self, lines):
+        header_seen = False
+        for number, raw in enumerate(lines, start=1):
+            if isinstance(raw, bytes):
+                raw = raw.decode('utf-8')
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+                record_type = record['type']
+            except (ValueError, KeyError, TypeError):
+                raise PortfolioImportError('JSONの形式が不正です。', number)
+
+            if not header_seen:
+                if record_type != 'meta' or record.get('version') != FORMAT_VERSION:
+                    raise PortfolioImportError(f'1行目は version {FORMAT_VERSION} のヘッダーである必要があります。', number)
+                header_seen = True
+                continue
+
+            data = record.get('data')
+            if not isinstance(data, dict):
+                raise PortfolioImportError('data がありません。', number)
+            if record_type == 'profile':
+                self._update_profile(data, number)
+            elif record_type in MODEL_BY_TYPE:
+                self._add(record_type, data, number)
+            else:
+                raise PortfolioImportError(f'不明な種類です: {record_type}', number)
+
+        if not header_seen:
+            raise PortfolioImportError('データがありません。')
+
+    def _update_profile(self, data, number):
+        profile = self.profile
+        update_fields = []
+        for field in profile._meta.concrete_fields:
+            if field.name in PROFILE_EXCLUDED_FIELDS or field.name not in data:
+                continue
+            setattr(profile, field.attname, self._to_python(field, data[field.name], number))
+            update_fields.append(field.attname)
+        # 登録直後のプロフィールは肩書きなどが空のまま保存されているため、空でない項目だけを検証する
+        self._validate(profile, number, fields=[
+            name for name in update_fields if getattr(profile, name) not in (None, '', [], {})
+        ])
+        profile.save(update_fields=update_fields + ['updated_at'])
+
+    def _add(self, record_type, data, number):
+        if record_type != self.pending_type:
+            self._flush()
+            if record_type in self.seen_types:
+                raise PortfolioImportError(f'{record_type} の行が連続していません。', number)
+            self.seen_types.append(record_type)
+            self.pending_type = record_type
+
+        model = MODEL_BY_TYPE[record_type]
+        references = REFERENCES.get(model, {})
+        obj = model()
+        for field in model._meta.concrete_fields:
+            if field.primary_key or field.name == 'user' or field.name not in data:
+                continue
+            value = data[field.name]
+            if field.name in references:
+                value = self._remap(references[field.name], value, number)
+            else:
+                value = self._to_python(field, value, number)
+            setattr(obj, field.attname, value)
+        obj.user_id = self.profile.user_id if model is SkillCategory else self.profile.id
+        self._validate(obj, number)
+
+        relations = {}
+        for key, name in M2M_BY_TYPE[record_type].items():
+            values = data.get(key) or []
+            if not isinstance(values, list):
+                raise PortfolioImportError(f'{key} はIDのリストである必要があります。', number)
+            relations[name] = [self._remap('skill', value, number) for value in values]
+        body = (data.get('body_md'), data.get('body_html')) if model is QiitaArticle else None
+
+        self.pending.append((data.get('id'), obj, relations, body))
+        if len(self.pending) >= CHUNK_SIZE:
+            self._flush()
+
+    def _to_python(self, field, value, number):
+        if value is None:
+            return None
+        if isinstance(field, models.FileField):
+            # ファイル本体は移行しないため、同じストレージに保存済みのファイルのパスだけを受け付ける
+            # （内容のハッシュによる命名の前にエクスポートした upload_to のパスも、存在すれば受け付ける）
+            self._check_file_names(field, [value], number)
+            return value
+        try:
+            value = field.to_python(value)
+        except ValidationError as e:
+            raise PortfolioImportError(f'{field.name}: {"; ".join(e.messages)}', number)
+        if field.name in VARIANT_FIELDS.get(field.model, ()):
+            self._check_file_names(field, self._variant_names(field, value, number), number)
+        return value
+
+    def _variant_names(self, field, variants, number):
+        """縮小版の辞書（形式 → 幅 → パス、'source' → 元画像のパス）に含まれるパスを返す"""
+        if not isinstance(variants, dict):
+            raise PortfolioImportError(f'{field.name}: 縮小版の形式が不正です。', number)
+        names = []
+        for image_format, paths in variants.items():
+            if image_format == 'source':
+                names.extend([paths] if paths is not None else [])
+            elif isinstance(paths, dict):
+                names.extend(paths.values())
+            else:
+                raise PortfolioImportError(f'{field.name}: 縮小版の形式が不正です。', number)
+        return names
+
+    def _check_file_names(self, field, names, number):
+        storage = field.storage if isinstance(field, models.FileField) else default_storage
+        for name in names:
+            if not is_relative_storage_path(name) or not storage.exists(name):
+                raise PortfolioImportError(f'{field.name}: 保存されていないファイルのパスです: {name}', number)
+
+    def _remap(self, record_type, old_id, number):
+        try:
+            return self.id_maps[record_type][old_id]
+        except (KeyError, TypeError):
+            raise PortfolioImportError(f'{record_type} のID {old_id} が見つかりません。', number)
+
+    def _validate(self, obj, number, fields=None):
+        excluded = [
+            field.name for field in obj._meta.concrete_fields
+            if isinstance(field, (models.ForeignKey, models.FileField))
+            or (fields is not None and field.attname not in fields)
+        ]
+        try:
+            obj.clean_fields(exclude=excluded)
+        except ValidationError as e:
+            messages = '; '.join(f'{name}: {", ".join(errors)}' for name, errors in e.message_dict.items())
+            raise PortfolioImportError(messages, number)
+
+    def _flush(self):
+        if not self.pending:
+            return
+        record_type, pending = self.pending_type, self.pending
+        self.pending = []
+        model = MODEL_BY_TYPE[record_type]
+        try:
+            model.objects.bulk_create([obj for old_id, obj, relations, body in pending])
+        except IntegrityError as e:
+            raise PortfolioImportError(f'{record_type} に重複したデータがあります: {e}')
+
+        id_map = self.id_maps[record_type]
+        for old_id, obj, relations, body in pending:
+            if old_id is not None:
+                id_map[old_id] = obj.pk
+
+        for name in M2M_BY_TYPE[record_type].values():
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+            through.objects.bulk_create([
+                through(**{f'{source}_id': obj.pk, f'{target}_id': related_id})
+                for old_id, obj, relations, body in pending
+                for related_id in relations[name]
+            ], ignore_conflicts=True)
+
+        if model in MEDIA_FIELDS:
+            # bulk_create ではシグナルが発行されないため、取り込んだファイルのパスの参照数をまとめて増やす
+            adjust_media_refs(sum((referenced_names(obj) for old_id, obj, relations, body in pending), Counter()))
+
+        if model is QiitaArticle:
+            QiitaArticleBody.objects.bulk_create([
+                QiitaArticleBody(article_id=obj.pk, body_md=body[0], body_html=body[1])
+                for old_id, obj, relations, body in pending
+                if body[0] is not None or body[1] is not None
+            ])
+        self.counts[record_type] = self.counts.get(record_type, 0) + len(pending)
+
+    def _refresh_derived_data(self):
+        """bulk_create ではシグナルが発行されないため、集計値・検索索引をまとめて作り直す"""
+        refresh_portfolio_stats([self.profile.id])
+        index_objects('profile', [self.profile.id])
+        for record_type, model in MODEL_BY_TYPE.items():
+            new_ids = list(self.id_maps[record_type].values())
+            if model in KIND_BY_MODEL:
+                index_objects(KIND_BY_MODEL[model], new_ids)
+        reindex_skill_ids(self.id_maps['skill'].values())
+
+
+def import_portfolio(profile, lines):
+    """NDJSON の行を読み込んでプロフィールの所有データを置き換え、種類ごとの件数を返す"""
+    return PortfolioImporter(profile).run(lines)
@@ -0,0 +1,53 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# 現在のリクエストでレプリカからの読み込みを許可するかどうか
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def enable_replica_reads():
+    """以降の読み込みクエリをレプリカへ振り分ける。戻り値は reset_replica_reads() に渡す"""
+    return _replica_reads.set(True)
+
+
+def reset_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """ブロック内の読み込みクエリをレプリカへ振り分ける"""
+    token = enable_replica_reads()
+    try:
+        yield
+    finally:
+        reset_replica_reads(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    書き込みは常にプライマリ(default)へ、許可されたリクエストの読み込みのみレプリカへ振り分けるルーター
+
+    レプリカへの振り分けは ReplicaRoutingMiddleware が公開エンドポイントの
+    安全なメソッド(GET/HEAD/OPTIONS)に対してのみ有効にする。
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if replicas and _replica_reads.get():
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # レプリカはプライマリの複製なので、どのDBから読んだオブジェクト同士でも関連付けてよい
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # マイグレーションはプライマリにのみ適用する（レプリカには複製される）
+        return db == 'default'
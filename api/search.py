@@ -0,0 +1,238 @@
+"""
+全文検索（PostgreSQL: tsvector + GINインデックス / SQLite: FTS5）
+"""
+import base64
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from .models import SearchDocument, UserProfile, Project, WorkExperience, QiitaArticle
+
+SEARCH_CONFIG = 'simple'
+
+# 検索ドキュメントを作る対象モデル
+INDEXED_MODELS = {
+    'profile': UserProfile,
+    'project': Project,
+    'work_experience': WorkExperience,
+    'qiita_article': QiitaArticle,
+}
+KIND_BY_MODEL = {model: kind for kind, model in INDEXED_MODELS.items()}
+
+# search_batch() 内で溜めている再索引対象（None の場合は即時反映）
+_pending_documents = ContextVar('pending_search_documents', default=None)
+
+
+# 職歴の「役職 + 会社名」のように元の列より長くなる場合があるため、タイトルは列の長さで切り詰める
+TITLE_MAX_LENGTH = SearchDocument._meta.get_field('title').max_length
+
+
+def _join(*values):
+    return '\n'.join(value for value in values if value)
+
+
+def _title(*values):
+    return _join(*values)[:TITLE_MAX_LENGTH]
+
+
+def build_document(instance):
+    """モデルインスタンスから検索ドキュメントの内容を作る"""
+    if isinstance(instance, UserProfile):
+        return SearchDocument(
+            kind='profile', object_id=instance.id, profile_id=instance.id,
+            title=_title(instance.display_name),
+            content=_join(instance.title, instance.specialty, instance.bio),
+        )
+    if isinstance(instance, Project):
+        return SearchDocument(
+            kind='project', object_id=instance.id, profile_id=instance.user_id,
+            title=_title(instance.title),
+            content=instance.description,
+        )
+    if isinstance(instance, WorkExperience):
+        return SearchDocument(
+            kind='work_experience', object_id=instance.id, profile_id=instance.user_id,
+            title=_title(instance.position, instance.company),
+            content=_join(instance.project_name, instance.description, instance.role_description),
+        )
+    if isinstance(instance, QiitaArticle):
+        return SearchDocument(
+            kind='qiita_article', object_id=instance.id, profile_id=instance.user_id,
+            title=_title(instance.title),
+            content=_join(' '.join(instance.tags or []), instance.body_md),
+        )
+    raise TypeError(f'{type(instance).__name__} は検索対象ではありません')
+
+
+def _source_queryset(kind):
+    queryset = INDEXED_MODELS[kind].objects.all()
+    if kind == 'qiita_article':
+        queryset = queryset.select_related('body')
+    return queryset
+
+
+def index_instances(kind, instances):
+    """読み込み済み（作成直後など）のオブジェクトから検索ドキュメントをまとめて作成・更新する"""
+    documents = [build_document(instance) for instance in instances]
+    if documents:
+        SearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['profile', 'title', 'content', 'updated_at'],
+        )
+        if connection.vendor == 'postgresql':
+            SearchDocument.objects.filter(kind=kind, object_id__in=[document.object_id for document in documents]).update(
+                search_vector=(
+                    SearchVector('title', weight='A', config=SEARCH_CONFIG)
+                    + SearchVector('content', weight='B', config=SEARCH_CONFIG)
+                )
+            )
+    return documents
+
+
+def index_objects(kind, object_ids):
+    """指定オブジェクトの検索ドキュメントをまとめて作成・更新する"""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return 0
+    documents = index_instances(kind, _source_queryset(kind).filter(id__in=object_ids))
+    # 元データが削除済みのものは索引からも削除する
+    found_ids = {document.object_id for document in documents}
+    missing_ids = [object_id for object_id in object_ids if object_id not in found_ids]
+    if missing_ids:
+        SearchDocument.objects.filter(kind=kind, object_id__in=missing_ids).delete()
+    return len(documents)
+
+
+def schedule_index(instance):
+    """保存されたオブジェクトを索引に反映する（search_batch() 内では終了時にまとめて反映）"""
+    kind = KIND_BY_MODEL[type(instance)]
+    pending = _pending_documents.get()
+    if pending is not None:
+        pending[kind].add(instance.id)
+        return
+    index_objects(kind, [instance.id])
+
+
+def remove_from_index(instance):
+    """削除されたオブジェクトを索引から除く（search_batch() 内では終了時に元データがないものとしてまとめて削除）"""
+    kind = KIND_BY_MODEL[type(instance)]
+    pending = _pending_documents.get()
+    if pending is not None:
+        pending[kind].add(instance.id)
+        return
+    SearchDocument.objects.filter(kind=kind, object_id=instance.id).delete()
+
+
+@contextmanager
+def search_batch():
+    """ブロック内で保存されたオブジェクトの索引更新を、終了時に種類ごとにまとめて行う"""
+    if _pending_documents.get() is not None:
+        yield
+        return
+    pending = defaultdict(set)
+    token = _pending_documents.set(pending)
+    try:
+        yield
+    finally:
+        _pending_documents.reset(token)
+    for kind, object_ids in pending.items():
+        index_objects(kind, object_ids)
+
+
+def encode_cursor(rank, document_id):
+    payload = json.dumps([rank, document_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """カーソル文字列を (rank, id) に戻す。不正な場合は ValueError"""
+    try:
+        rank, document_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(rank), int(document_id)
+    except (TypeError, ValueError, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError('不正なカーソルです') from e
+
+
+def _fts5_query(text):
+    """利用者の入力をFTS5のクエリ構文として安全な形（各語句をフレーズとしてAND）に変換する"""
+    terms = ['"{}"'.format(term.replace('"', '""')) for term in text.split()]
+    return ' '.join(terms)
+
+
+def _search_postgresql(text, kinds, after, limit):
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+    # ts_rank は real（float4）を返すため、カーソルの値（float8）と比較できるよう double precision にそろえる
+    queryset = (SearchDocument.objects
+                .annotate(rank=Cast(SearchRank(F('search_vector'), query), FloatField()))
+                .filter(search_vector=query))
+    if kinds:
+        queryset = queryset.filter(kind__in=kinds)
+    if after:
+        rank, document_id = after
+        queryset = queryset.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=document_id))
+    rows = queryset.order_by('-rank', '-id').values_list('id', 'rank')[:limit]
+    return list(rows)
+
+
+def _search_sqlite(text, kinds, after, limit):
+    match = _fts5_query(text)
+    if not match:
+        return []
+    # bm25は値が小さいほど関連度が高いため符号を反転する（タイトルを本文より重視）
+    sql = [
+        'SELECT id, score FROM (',
+        '  SELECT d.id AS id, d.kind AS kind, -bm25(api_searchdocument_fts, 10.0, 1.0) AS score',
+        '  FROM api_searchdocument_fts JOIN api_searchdocument d ON d.id = api_searchdocument_fts.rowid',
+        '  WHERE api_searchdocument_fts MATCH %s',
+        ') WHERE 1 = 1',
+    ]
+    params = [match]
+    if kinds:
+        sql.append('AND kind IN ({})'.format(', '.join(['%s'] * len(kinds))))
+        params.extend(kinds)
+    if after:
+        rank, document_id = after
+        sql.append('AND (score < %s OR (score = %s AND id < %s))')
+        params.extend([rank, rank, document_id])
+    sql.append('ORDER BY score DESC, id DESC LIMIT %s')
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute('\n'.join(sql), params)
+        return cursor.fetchall()
+
+
+def search_documents(text, kinds=None, cursor=None, limit=20):
+    """
+    全文検索を行い、関連度順の (ドキュメントのリスト, 次ページのカーソル) を返す
+
+    ページングは (rank, id) のキーセットで行うため、深いページでもOFFSETによる劣化がない。
+    """
+    after = decode_cursor(cursor) if cursor else None
+    if connection.vendor == 'postgresql':
+        rows = _search_postgresql(text, kinds, after, limit + 1)
+    else:
+        rows = _search_sqlite(text, kinds, after, limit + 1)
+
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    documents = SearchDocument.objects.select_related('profile').in_bulk([document_id for document_id, rank in rows])
+    results = []
+    for document_id, rank in rows:
+        document = documents.get(document_id)
+        if document is not None:
+            document.rank = rank
+            results.append(document)
+
+    next_cursor = None
+    if has_next and rows:
+        last_id, last_rank = rows[-1]
+        next_cursor = encode_cursor(last_rank, last_id)
+    return results, next_cursor
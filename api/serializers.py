@@ -1,7 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile, SkillCategory, Skill, Project, Education, WorkExperience, ProcessExperience, GitHubRepository, GitHubCommitStats, QiitaArticle
+from .icons import icon_url, resolve_icon_id
+from .uploads import BoundedImageField, PdfFileField
+from .models import UserProfile, PortfolioStats, SearchDocument, SkillCategory, Skill, Project, Education, WorkExperience, ProcessExperience, GitHubRepository, GitHubCommitStats, QiitaArticle
 from datetime import datetime
+from django.core.files.storage import default_storage
+from django.db.models import QuerySet
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,15 +18,63 @@ class SkillCategorySerializer(serializers.ModelSerializer):
         model = SkillCategory
         fields = ['id', 'name', 'order']
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """縮小版画像（api/images.py）を形式ごとの srcset 文字列（"URL 320w, URL 640w"）で返すフィールド"""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        srcset = {}
+        for image_format, paths in (value or {}).items():
+            if image_format == 'source':
+                continue
+            entries = []
+            for width, name in sorted(paths.items(), key=lambda item: int(item[0])):
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                entries.append(f'{url} {width}w')
+            srcset[image_format] = ', '.join(entries)
+        return srcset
+
 class SkillSerializer(serializers.ModelSerializer):
     """スキルシリアライザー"""
     category_name = serializers.CharField(source='category.name', read_only=True)
+    icon = BoundedImageField(max_size_setting='SKILL_ICON_UPLOAD_MAX_SIZE', required=False, allow_null=True)
+    icon_srcset = ImageVariantsField(source='icon_variants')
+    icon_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Skill
-        fields = ['id', 'name', 'category', 'category_name', 'level', 'experience_years', 'icon', 'icon_id', 'description', 'order', 'is_highlighted']
+        fields = ['id', 'name', 'category', 'category_name', 'level', 'experience_years', 'icon', 'icon_srcset', 'icon_id', 'icon_url', 'description', 'order', 'is_highlighted']
         read_only_fields = ['id']
 
+    def get_icon_url(self, obj):
+        """カタログのアイコンを優先し、なければアップロードされたアイコンのURLを返す"""
+        url = icon_url(obj.icon_id)
+        if url is None and obj.icon:
+            url = obj.icon.url
+            request = self.context.get('request')
+            if request is not None:
+                url = request.build_absolute_uri(url)
+        return url
+
+    def validate_icon_id(self, value):
+        # カタログにあるIDは正規のIDにそろえる。カタログにないID（移行前の独自のアイコン名など）は
+        # そのまま保存し、icon_url はアップロードされたアイコン（なければ None）になる
+        if not value:
+            return value
+        return resolve_icon_id(value) or value
+
+class ProcessExperienceListSerializer(serializers.ListSerializer):
+    """担当工程経験の一括更新用（同じ工程の重複指定をまとめてチェックする）"""
+
+    def validate(self, attrs):
+        process_types = [item['process_type'] for item in attrs]
+        duplicates = sorted({value for value in process_types if process_types.count(value) > 1})
+        if duplicates:
+            raise serializers.ValidationError(f'同じ工程が複数指定されています: {", ".join(duplicates)}')
+        return attrs
+
 class ProcessExperienceSerializer(serializers.ModelSerializer):
     process_type_display = serializers.ReadOnlyField(source='get_process_type_display')
     
@@ -30,16 +82,69 @@ class ProcessExperienceSerializer(serializers.ModelSerializer):
         model = ProcessExperience
         fields = ['id', 'process_type', 'process_type_display', 'experience_count', 'description']
         read_only_fields = ['id']
+        list_serializer_class = ProcessExperienceListSerializer
+
+class OwnedPrimaryKeyListField(serializers.Field):
+    """
+    IDのリストを、リクエストした利用者（更新時は対象の所有者）の行だけから1回のクエリで解決する書き込み用フィールド
+
+    PrimaryKeyRelatedField(many=True) はIDごとに全利用者の行を検索するが、
+    このフィールドは filter(pk__in=..., user=...) の1回で読み込み、見つからないIDをまとめて報告する。
+    """
+    default_error_messages = {
+        'not_a_list': 'IDのリストを指定してください。',
+        'incorrect_type': 'IDは整数で指定してください。',
+        'does_not_exist': '存在しないIDが含まれています: {pk_list}',
+    }
+
+    def __init__(self, queryset, owner_field='user', **kwargs):
+        self.queryset = queryset
+        self.owner_field = owner_field
+        super().__init__(**kwargs)
+
+    def get_owner_id(self):
+        instance = getattr(self.parent, 'instance', None)
+        if instance is not None and not isinstance(instance, (list, QuerySet)):
+            return instance.user_id
+        request = self.context.get('request')
+        profile = getattr(request, 'profile', None)
+        return profile.id if profile is not None else None
+
+    def get_queryset(self):
+        queryset = self.queryset
+        if isinstance(queryset, QuerySet):
+            queryset = queryset.filter(**{f'{self.owner_field}_id': self.get_owner_id()})
+        return queryset
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list')
+        pks = []
+        for value in data:
+            if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdigit():
+                self.fail('incorrect_type')
+            pks.append(int(value))
+        # 並び順（カテゴリとの JOIN）は不要なので外す
+        objects = self.get_queryset().order_by().in_bulk(pks) if pks else {}
+        missing = [pk for pk in dict.fromkeys(pks) if pk not in objects]
+        if missing:
+            self.fail('does_not_exist', pk_list=', '.join(str(pk) for pk in missing))
+        return [objects[pk] for pk in dict.fromkeys(pks)]
+
+    def to_representation(self, value):
+        return [obj.pk for obj in value.all()]
 
 class ProjectSerializer(serializers.ModelSerializer):
     technologies = SkillSerializer(source='technologies_used', many=True, read_only=True)
-    technologies_ids = serializers.PrimaryKeyRelatedField(
-        source='technologies_used', queryset=Skill.objects.all(), many=True, write_only=True, required=False
+    thumbnail = BoundedImageField(required=False, allow_null=True)
+    thumbnail_srcset = ImageVariantsField(source='thumbnail_variants')
+    technologies_ids = OwnedPrimaryKeyListField(
+        source='technologies_used', queryset=Skill.objects.all(), write_only=True, required=False
     )
     
     class Meta:
         model = Project
-        fields = ['id', 'title', 'description', 'thumbnail', 'project_url', 'github_url', 
+        fields = ['id', 'title', 'description', 'thumbnail', 'thumbnail_srcset', 'project_url', 'github_url', 
                   'technologies', 'technologies_ids', 'start_date', 'end_date', 
                   'is_featured', 'order', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
@@ -98,8 +203,8 @@ class EducationSerializer(serializers.ModelSerializer):
 
 class WorkExperienceSerializer(serializers.ModelSerializer):
     skills_used_details = SkillSerializer(source='skills_used', many=True, read_only=True)
-    skills_used_ids = serializers.PrimaryKeyRelatedField(
-        source='skills_used', queryset=Skill.objects.all(), many=True, write_only=True, required=False
+    skills_used_ids = OwnedPrimaryKeyListField(
+        source='skills_used', queryset=Skill.objects.all(), write_only=True, required=False
     )
     
     class Meta:
@@ -151,18 +256,63 @@ class GitHubCommitStatsSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'last_updated']
 
-class QiitaArticleSerializer(serializers.ModelSerializer):
+class QiitaArticleSummarySerializer(serializers.ModelSerializer):
+    """一覧・プロフィール用のQiita記事シリアライザー（本文を含めないため本文テーブルを読み込まない）"""
     class Meta:
         model = QiitaArticle
         fields = [
-            'id', 'article_id', 'title', 'url', 'likes_count', 'stocks_count', 
-            'comments_count', 'created_at', 'updated_at', 'tags', 
-            'body_md', 'body_html', 'is_featured'
+            'id', 'article_id', 'title', 'url', 'likes_count', 'stocks_count',
+            'comments_count', 'created_at', 'updated_at', 'tags', 'is_featured'
         ]
         read_only_fields = ['id']
 
+class QiitaArticleSerializer(QiitaArticleSummarySerializer):
+    # 本文は別テーブル(QiitaArticleBody)に保存されている
+    body_md = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    body_html = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    class Meta(QiitaArticleSummarySerializer.Meta):
+        fields = QiitaArticleSummarySerializer.Meta.fields + ['body_md', 'body_html']
+
+    def create(self, validated_data):
+        body_md = validated_data.pop('body_md', None)
+        body_html = validated_data.pop('body_html', None)
+        article = super().create(validated_data)
+        article.set_body(body_md, body_html)
+        return article
+
+    def update(self, instance, validated_data):
+        has_body = 'body_md' in validated_data or 'body_html' in validated_data
+        body_md = validated_data.pop('body_md', instance.body_md)
+        body_html = validated_data.pop('body_html', instance.body_html)
+        instance = super().update(instance, validated_data)
+        if has_body:
+            instance.set_body(body_md, body_html)
+        return instance
+
+class PortfolioStatsSerializer(serializers.ModelSerializer):
+    """ポートフォリオ集計値シリアライザー"""
+    skills_by_level = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PortfolioStats
+        fields = [
+            'repository_count', 'stargazers_total', 'article_count', 'likes_total',
+            'project_count', 'skill_count', 'skills_by_level', 'updated_at'
+        ]
+        read_only_fields = fields
+
+    def get_skills_by_level(self, obj):
+        return {
+            str(level): getattr(obj, f'skill_level_{level}_count')
+            for level, label in Skill.LEVEL_CHOICES
+        }
+
 class UserProfileSerializer(serializers.ModelSerializer):
     user_details = UserSerializer(source='user', read_only=True)
+    profile_image = BoundedImageField(required=False, allow_null=True)
+    profile_image_srcset = ImageVariantsField(source='profile_image_variants')
+    resume = PdfFileField(required=False, allow_null=True)
     skills = SkillSerializer(many=True, read_only=True)
     projects = ProjectSerializer(many=True, read_only=True)
     education = EducationSerializer(many=True, read_only=True)
@@ -170,11 +320,11 @@ class UserProfileSerializer(serializers.ModelSerializer):
     process_experiences = ProcessExperienceSerializer(many=True, read_only=True)
     github_repositories = GitHubRepositorySerializer(many=True, read_only=True)
     github_stats = GitHubCommitStatsSerializer(read_only=True)
-    qiita_articles = QiitaArticleSerializer(many=True, read_only=True)
+    qiita_articles = QiitaArticleSummarySerializer(many=True, read_only=True)
     
     class Meta:
         model = UserProfile
-        fields = ['id', 'user', 'user_details', 'profile_image', 'display_name', 'title', 
+        fields = ['id', 'user', 'user_details', 'profile_image', 'profile_image_srcset', 'display_name', 'title', 
                   'bio', 'specialty', 'location', 'email_public', 'github_username', 
                   'github_access_token', 'github_client_id', 'github_client_secret',
                   'qiita_username', 'qiita_access_token', 'twitter_username', 'linkedin_url', 'website_url', 
@@ -190,6 +340,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
 class UserProfilePublicSerializer(serializers.ModelSerializer):
     """公開用プロフィールシリアライザー（パブリックに表示する情報のみ）"""
+    profile_image_srcset = ImageVariantsField(source='profile_image_variants')
     skills = serializers.SerializerMethodField()
     projects = ProjectSerializer(many=True, read_only=True)
     education = EducationSerializer(many=True, read_only=True)
@@ -198,14 +349,15 @@ class UserProfilePublicSerializer(serializers.ModelSerializer):
     github_repositories = serializers.SerializerMethodField()
     github_stats = GitHubCommitStatsSerializer(read_only=True)
     qiita_articles = serializers.SerializerMethodField()
+    stats = PortfolioStatsSerializer(read_only=True)
     
     class Meta:
         model = UserProfile
-        fields = ['display_name', 'profile_image', 'title', 'bio', 'specialty', 
+        fields = ['display_name', 'profile_image', 'profile_image_srcset', 'title', 'bio', 'specialty', 
                   'location', 'email_public', 'github_username', 'qiita_username', 
                   'twitter_username', 'linkedin_url', 'website_url', 'resume', 
                   'skills', 'projects', 'education', 'work_experiences', 'process_experiences',
-                  'github_repositories', 'github_stats', 'qiita_articles']
+                  'github_repositories', 'github_stats', 'qiita_articles', 'stats']
     
     def get_skills(self, obj):
         """スキルをカテゴリ別にグループ化"""
@@ -240,6 +392,21 @@ class UserProfilePublicSerializer(serializers.ModelSerializer):
         
         # 特集記事がない場合は、最新の5件を返す
         if not articles.exists():
-            articles = obj.qiita_articles.all().order_by('-created_at')[:5]
+            articles = obj.qiita_articles.order_by('-created_at')[:5]
             
-        return QiitaArticleSerializer(articles, many=True).data 
\ No newline at end of file
+        return QiitaArticleSummarySerializer(articles, many=True).data 
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    """全文検索結果シリアライザー"""
+    portfolio_slug = serializers.CharField(source='profile.portfolio_slug', read_only=True)
+    display_name = serializers.CharField(source='profile.display_name', read_only=True)
+    snippet = serializers.SerializerMethodField()
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = SearchDocument
+        fields = ['kind', 'object_id', 'title', 'snippet', 'rank', 'portfolio_slug', 'display_name']
+        read_only_fields = fields
+
+    def get_snippet(self, obj):
+        return obj.content[:200]
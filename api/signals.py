@@ -0,0 +1,196 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .models import (
+    UserProfile, PortfolioStats, Skill, Project, GitHubRepository,
+    QiitaArticle, QiitaArticleBody
+)
+from .authentication import CACHED_USER_FIELDS, invalidate_tokens
+from .blobs import MEDIA_FIELDS, adjust_media_refs, referenced_names
+from .images import IMAGE_VARIANT_FIELDS, schedule_image_variants
+from .search import INDEXED_MODELS, schedule_index, remove_from_index
+from .skill_index import index_skills
+from .stats import counter_deltas, apply_deltas
+
+# 集計値に影響するモデルと、差分計算のために保存前の値を覚えておくフィールド
+COUNTED_MODELS = {
+    Skill: ['user_id', 'level'],
+    Project: ['user_id'],
+    GitHubRepository: ['user_id', 'stargazers_count'],
+    QiitaArticle: ['user_id', 'likes_count'],
+}
+
+
+def _snapshot(instance):
+    fields = COUNTED_MODELS[type(instance)]
+    instance._stats_snapshot = {field: instance.__dict__.get(field) for field in fields}
+
+
+def _merge(*deltas_list):
+    merged = {}
+    for deltas in deltas_list:
+        for field, value in deltas.items():
+            merged[field] = merged.get(field, 0) + value
+    return merged
+
+
+@receiver(post_save, sender=User)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    """ユーザー登録時にプロフィールを作成する（プロフィールの作成はここだけで行う）"""
+    if created and not raw:
+        UserProfile.objects.get_or_create(
+            user=instance,
+            defaults={'display_name': instance.get_full_name() or instance.username, 'title': ''}
+        )
+
+
+@receiver(post_save, sender=UserProfile)
+def create_portfolio_stats(sender, instance, created, raw=False, **kwargs):
+    """プロフィール作成時に集計行を作成する"""
+    if created and not raw:
+        PortfolioStats.objects.get_or_create(profile=instance)
+
+
+def track_counted_instance(sender, instance, **kwargs):
+    """DBから読み込んだ時点の値を保存しておく"""
+    _snapshot(instance)
+
+
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    """保存時に集計値を差分更新する"""
+    if raw:
+        return
+    if created:
+        apply_deltas(instance.user_id, counter_deltas(instance, 1))
+    else:
+        previous = sender(**instance._stats_snapshot)
+        if previous.user_id == instance.user_id:
+            apply_deltas(instance.user_id, _merge(
+                counter_deltas(instance, 1), counter_deltas(previous, -1)
+            ))
+        else:
+            apply_deltas(previous.user_id, counter_deltas(previous, -1))
+            apply_deltas(instance.user_id, counter_deltas(instance, 1))
+    _snapshot(instance)
+
+
+def update_counters_on_delete(sender, instance, **kwargs):
+    """削除時に集計値から差し引く"""
+    apply_deltas(instance.user_id, counter_deltas(instance, -1))
+
+
+for model in COUNTED_MODELS:
+    post_init.connect(track_counted_instance, sender=model, dispatch_uid=f'stats_init_{model.__name__}')
+    post_save.connect(update_counters_on_save, sender=model, dispatch_uid=f'stats_save_{model.__name__}')
+    post_delete.connect(update_counters_on_delete, sender=model, dispatch_uid=f'stats_delete_{model.__name__}')
+
+
+def update_search_index_on_save(sender, instance, raw=False, **kwargs):
+    """検索対象の保存時に検索ドキュメントを更新する"""
+    if not raw:
+        schedule_index(instance)
+
+
+def update_search_index_on_delete(sender, instance, **kwargs):
+    remove_from_index(instance)
+
+
+@receiver(post_save, sender=QiitaArticleBody)
+def update_article_search_index(sender, instance, raw=False, **kwargs):
+    """記事本文の保存時に記事の検索ドキュメントを更新する"""
+    if not raw:
+        schedule_index(instance.article)
+
+
+for model in INDEXED_MODELS.values():
+    post_save.connect(update_search_index_on_save, sender=model, dispatch_uid=f'search_save_{model.__name__}')
+    post_delete.connect(update_search_index_on_delete, sender=model, dispatch_uid=f'search_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=Skill)
+def update_skill_index(sender, instance, raw=False, **kwargs):
+    """スキルの保存時にタレント検索用の転置インデックスを更新する（削除はCASCADEで反映される）"""
+    if not raw:
+        index_skills([instance])
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """トークンの削除（再発行は削除と作成）時に認証キャッシュを削除する"""
+    keys = [instance.key]
+    transaction.on_commit(lambda: invalidate_tokens(keys))
+
+
+# 変更された場合に認証キャッシュを破棄するユーザーのフィールド
+TOKEN_CACHE_USER_FIELDS = CACHED_USER_FIELDS + ('password',)
+
+
+def _user_snapshot(instance):
+    return {field: instance.__dict__.get(field) for field in TOKEN_CACHE_USER_FIELDS}
+
+
+@receiver(post_init, sender=User)
+def track_user_fields(sender, instance, **kwargs):
+    """DBから読み込んだ時点の認証に関わる値を保存しておく"""
+    instance._auth_snapshot = _user_snapshot(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, raw=False, **kwargs):
+    """
+    無効化・パスワード・ユーザー名・権限などキャッシュに関わる値が変わった場合だけ、キャッシュ済みのユーザー情報を破棄する
+
+    ログイン時の last_login の更新などではトークンを読み込まない。
+    """
+    if created or raw:
+        return
+    current = _user_snapshot(instance)
+    changed = current != getattr(instance, '_auth_snapshot', None)
+    instance._auth_snapshot = current
+    if not changed:
+        return
+    keys = list(Token.objects.filter(user=instance).values_list('key', flat=True))
+    if keys:
+        transaction.on_commit(lambda: invalidate_tokens(keys))
+
+
+def update_image_variants_on_save(sender, instance, raw=False, **kwargs):
+    """画像が変更された場合、コミット後に縮小版を作成する"""
+    if not raw:
+        schedule_image_variants(instance)
+
+
+for model in IMAGE_VARIANT_FIELDS:
+    post_save.connect(update_image_variants_on_save, sender=model, dispatch_uid=f'images_save_{model.__name__}')
+
+
+def track_media_references(sender, instance, **kwargs):
+    """DBから読み込んだ時点で参照しているファイルを保存しておく"""
+    instance._media_snapshot = referenced_names(instance)
+
+
+def update_media_refs_on_save(sender, instance, created, raw=False, **kwargs):
+    """ファイルの差し替え・縮小版の変更に合わせて参照数を増減する"""
+    if raw:
+        return
+    current = referenced_names(instance)
+    deltas = current.copy()
+    if not created:
+        deltas.subtract(getattr(instance, '_media_snapshot', {}))
+    adjust_media_refs(deltas)
+    instance._media_snapshot = current
+
+
+def update_media_refs_on_delete(sender, instance, **kwargs):
+    """削除時に参照数を減らす（ファイルは gc_media で削除する）"""
+    deltas = referenced_names(instance)
+    adjust_media_refs({name: -count for name, count in deltas.items()})
+
+
+for model in MEDIA_FIELDS:
+    post_init.connect(track_media_references, sender=model, dispatch_uid=f'media_init_{model.__name__}')
+    post_save.connect(update_media_refs_on_save, sender=model, dispatch_uid=f'media_save_{model.__name__}')
+    post_delete.connect(update_media_refs_on_delete, sender=model, dispatch_uid=f'media_delete_{model.__name__}')
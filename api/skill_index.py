@@ -0,0 +1,93 @@
+"""
+スキルの転置インデックス（タレント検索用）
+
+スキル名は利用者ごとの自由入力のため、NFKC正規化・小文字化したキーで
+「スキル → プロフィールIDの昇順リスト（ポスティングリスト）」を引けるようにし、
+複数スキルの条件はポスティングリストの積集合をDB上で求める。
+"""
+import re
+import unicodedata
+from decimal import Decimal
+
+from .models import Skill, SkillIndexEntry
+
+
+def normalize_skill_name(name):
+    """スキル名を検索キーに正規化する（全角/半角・大文字/小文字・空白の揺れを吸収）"""
+    key = unicodedata.normalize('NFKC', name or '').casefold()
+    return re.sub(r'\s+', ' ', key).strip()
+
+
+def _entry_for(skill):
+    return SkillIndexEntry(
+        skill_id=skill.id,
+        skill_key=normalize_skill_name(skill.name)[:100],
+        profile_id=skill.user_id,
+        level=skill.level,
+        experience_years=skill.experience_years,
+    )
+
+
+def index_skills(skills):
+    """スキルのインデックスをまとめて作成・更新する"""
+    entries = [_entry_for(skill) for skill in skills]
+    if entries:
+        SkillIndexEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['skill'],
+            update_fields=['skill_key', 'profile', 'level', 'experience_years'],
+        )
+    return len(entries)
+
+
+def reindex_skill_ids(skill_ids):
+    """スキルIDを指定してインデックスを作り直す（一括登録・更新後に使用する）"""
+    return index_skills(Skill.objects.filter(id__in=list(skill_ids)).only('id', 'name', 'user_id', 'level', 'experience_years'))
+
+
+def posting_list(skill_key, min_level=None, min_years=None, after=None):
+    """条件を満たすプロフィールIDのクエリセット（評価はしない）"""
+    queryset = SkillIndexEntry.objects.filter(skill_key=skill_key)
+    if after is not None:
+        queryset = queryset.filter(profile_id__gt=after)
+    if min_level is not None:
+        queryset = queryset.filter(level__gte=min_level)
+    if min_years is not None:
+        queryset = queryset.filter(experience_years__gte=min_years)
+    return queryset.values_list('profile_id', flat=True)
+
+
+def parse_criterion(value):
+    """
+    'スキル名[:最低レベル[:最低経験年数]]' 形式の条件を (キー, レベル, 年数) に変換する
+
+    例: 'Python:4' / 'Django::3' / 'React:3:2.5'
+    """
+    parts = value.split(':')
+    key = normalize_skill_name(parts[0])
+    if not key:
+        raise ValueError('スキル名を指定してください')
+    try:
+        min_level = int(parts[1]) if len(parts) > 1 and parts[1] else None
+        min_years = Decimal(parts[2]) if len(parts) > 2 and parts[2] else None
+    except (ValueError, ArithmeticError) as e:
+        raise ValueError(f'条件の形式が正しくありません: {value}') from e
+    return key, min_level, min_years
+
+
+def find_profiles(criteria, after=None, limit=20):
+    """
+    全ての条件を満たすプロフィールIDを昇順で返す
+
+    最初の条件のポスティングリストをプロフィールID順にたどり、残りの条件は IN のサブクエリで絞り込む。
+    1回のクエリで limit + 1 件だけを読み込むため、条件に一致する件数が多くても取得量は増えない。
+    ページングはプロフィールIDのキーセット（after より大きいID）で行う。
+    """
+    if not criteria:
+        return [], False
+    queryset = posting_list(*criteria[0], after=after)
+    for criterion in criteria[1:]:
+        queryset = queryset.filter(profile_id__in=posting_list(*criterion, after=after))
+    matched = list(queryset.order_by('profile_id').distinct()[:limit + 1])
+    return matched[:limit], len(matched) > limit
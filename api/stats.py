@@ -0,0 +1,122 @@
+"""
+ポートフォリオ集計値(PortfolioStats)の差分更新と再計算
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest
+
+from .models import UserProfile, PortfolioStats, Skill, Project, GitHubRepository, QiitaArticle
+
+SKILL_LEVELS = [level for level, label in Skill.LEVEL_CHOICES]
+
+COUNTER_FIELDS = [
+    'repository_count', 'stargazers_total', 'article_count', 'likes_total',
+    'project_count', 'skill_count',
+] + [f'skill_level_{level}_count' for level in SKILL_LEVELS]
+
+# stats_batch() 内で溜めている差分（None の場合は即時反映）
+_pending_deltas = ContextVar('pending_portfolio_stats_deltas', default=None)
+
+
+def counter_deltas(instance, sign):
+    """モデルインスタンス1件分の集計値への寄与を返す（sign=1で加算、-1で減算）"""
+    if isinstance(instance, Skill):
+        deltas = {'skill_count': sign}
+        if instance.level in SKILL_LEVELS:
+            deltas[f'skill_level_{instance.level}_count'] = sign
+        return deltas
+    if isinstance(instance, GitHubRepository):
+        return {'repository_count': sign, 'stargazers_total': sign * (instance.stargazers_count or 0)}
+    if isinstance(instance, QiitaArticle):
+        return {'article_count': sign, 'likes_total': sign * (instance.likes_count or 0)}
+    if isinstance(instance, Project):
+        return {'project_count': sign}
+    return {}
+
+
+def apply_deltas(profile_id, deltas):
+    """集計値にF()式で差分を加える（stats_batch() 内ではまとめて後で反映する）"""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas or profile_id is None:
+        return
+    pending = _pending_deltas.get()
+    if pending is not None:
+        for field, value in deltas.items():
+            pending[profile_id][field] += value
+        return
+    # 集計行がない場合（プロフィール削除中など）は何もしない。ずれは再計算コマンドで修正する
+    # ずれた状態で減算しても負の値（PositiveIntegerField の制約違反）にならないよう0で止める
+    PortfolioStats.objects.filter(profile_id=profile_id).update(
+        **{field: Greatest(F(field) + value, 0) for field, value in deltas.items()}
+    )
+
+
+@contextmanager
+def stats_batch():
+    """
+    ブロック内の差分をプロフィールごとに集約し、終了時に1回のUPDATEで反映する
+
+    同期処理のように大量の行を更新する場合に使用する。
+    """
+    if _pending_deltas.get() is not None:
+        # 既にバッチ中の場合は外側でまとめて反映する
+        yield
+        return
+    pending = defaultdict(lambda: defaultdict(int))
+    token = _pending_deltas.set(pending)
+    try:
+        yield
+    finally:
+        _pending_deltas.reset(token)
+    for profile_id, deltas in pending.items():
+        apply_deltas(profile_id, deltas)
+
+
+def compute_portfolio_stats(profile_ids):
+    """指定プロフィールの集計値を集約クエリで計算する"""
+    profile_ids = list(profile_ids)
+    stats = {profile_id: dict.fromkeys(COUNTER_FIELDS, 0) for profile_id in profile_ids}
+
+    rows = (GitHubRepository.objects.filter(user_id__in=profile_ids)
+            .values('user_id').annotate(count=Count('id'), stars=Sum('stargazers_count')).order_by())
+    for row in rows:
+        stats[row['user_id']]['repository_count'] = row['count']
+        stats[row['user_id']]['stargazers_total'] = row['stars'] or 0
+
+    rows = (QiitaArticle.objects.filter(user_id__in=profile_ids)
+            .values('user_id').annotate(count=Count('id'), likes=Sum('likes_count')).order_by())
+    for row in rows:
+        stats[row['user_id']]['article_count'] = row['count']
+        stats[row['user_id']]['likes_total'] = row['likes'] or 0
+
+    rows = (Project.objects.filter(user_id__in=profile_ids)
+            .values('user_id').annotate(count=Count('id')).order_by())
+    for row in rows:
+        stats[row['user_id']]['project_count'] = row['count']
+
+    rows = (Skill.objects.filter(user_id__in=profile_ids)
+            .values('user_id', 'level').annotate(count=Count('id')).order_by())
+    for row in rows:
+        stats[row['user_id']]['skill_count'] += row['count']
+        if row['level'] in SKILL_LEVELS:
+            stats[row['user_id']][f"skill_level_{row['level']}_count"] = row['count']
+
+    return stats
+
+
+def refresh_portfolio_stats(profile_ids):
+    """指定プロフィールの集計値を再計算して保存する（一括登録後や整合性チェック用）"""
+    profile_ids = list(UserProfile.objects.filter(id__in=list(profile_ids)).values_list('id', flat=True))
+    if not profile_ids:
+        return 0
+    stats = compute_portfolio_stats(profile_ids)
+    PortfolioStats.objects.bulk_create(
+        [PortfolioStats(profile_id=profile_id, **values) for profile_id, values in stats.items()],
+        update_conflicts=True,
+        unique_fields=['profile'],
+        update_fields=COUNTER_FIELDS + ['updated_at'],
+    )
+    return len(profile_ids)
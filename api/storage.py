@@ -0,0 +1,60 @@
+"""
+内容のハッシュでファイル名を決めるストレージ
+
+同じ内容のファイル（多くの利用者がアップロードする同じアイコンなど）は1つだけ保存し、
+どの行から参照されているかは MediaBlob の参照数で管理する（api/blobs.py）。
+参照されなくなったファイルは gc_media コマンドで削除する。
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+from .blobs import touch_blob
+
+BLOB_DIRECTORY = 'blobs'
+
+
+def is_relative_storage_path(name):
+    """
+    ストレージのルート以下を指す相対パスかどうか（blob_name() の形式と、それ以前の upload_to のパスの両方を含む）
+
+    絶対パス・'..' や '.' の要素・空の要素・バックスラッシュ・NUL を含むものは不可。
+    """
+    if not isinstance(name, str) or not name or '\\' in name or '\x00' in name:
+        return False
+    return all(part not in ('', '.', '..') for part in name.split('/'))
+
+
+def content_hash(content):
+    """ファイルの内容の SHA-256 をチャンク単位で計算する（メモリに全体を読み込まない）"""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    blobs/ab/cd/<sha256>.<拡張子> に保存する FileSystemStorage
+
+    upload_to で決めたファイル名は拡張子だけを使う。同じ内容のファイルが既にあれば書き込まない。
+    """
+
+    def blob_name(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        digest = content_hash(content)
+        return '/'.join([BLOB_DIRECTORY, digest[:2], digest[2:4], f'{digest}{extension}'])
+
+    def _save(self, name, content):
+        name = self.blob_name(name, content)
+        if self.exists(name):
+            # 再利用するファイルを gc_media の猶予期間に入れてから、削除されていないことを確認する
+            touch_blob(name)
+            if self.exists(name):
+                return name
+        return super()._save(name, content)
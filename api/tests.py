@@ -1,3 +1,1431 @@
-from django.test import TestCase
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import timedelta
+from importlib import import_module
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from PIL import Image
+from prometheus_client import REGISTRY
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.throttling import SimpleRateThrottle
+
+from . import async_views
+from .admin import EstimatedCountPaginator
+from .authentication import CachedTokenAuthentication, token_cache_key
+from .fake_upstream import FakeUpstreamServer
+from .search import search_batch
+from .serializers import ProjectSerializer
+from .skill_index import find_profiles
+from .throttling import AnonReadThrottle, AuthThrottle
+from .timing import parse_server_timing
+
+from .models import (
+    UserProfile, PortfolioStats, SkillCategory, Skill, Project, Education, WorkExperience,
+    GitHubRepository, QiitaArticle, QiitaArticleBody, MediaBlob, SearchDocument, SkillIndexEntry
+)
+
+
+class HotQueryIndexTests(TestCase):
+    """views.py / serializers.py の主要なクエリがインデックスを使うことを EXPLAIN で確認する"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='indexer', password='password123')
+        cls.profile, _ = UserProfile.objects.get_or_create(
+            user=cls.user, defaults={'display_name': 'indexer', 'title': ''}
+        )
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # 行数が少ないテーブルではシーケンシャルスキャンが選ばれるため無効化する
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def hot_queries(self):
+        """クエリ名 → (クエリ, 使われるべきインデックス名)"""
+        profile = self.profile
+        # スキルは関連先（カテゴリー）の並び順で並べるため、結合後の並び替えが残る（検証対象外）
+        return {
+            'skill-categories': (SkillCategory.objects.filter(user=self.user), {'skillcat_user_order_idx'}),
+            'projects': (Project.objects.filter(user=profile), {'project_user_order_idx'}),
+            'education': (Education.objects.filter(user=profile), {'education_user_order_idx'}),
+            'work-experiences': (WorkExperience.objects.filter(user=profile), {'workexp_user_order_idx'}),
+            'github-repositories': (GitHubRepository.objects.filter(user=profile), {'ghrepo_user_featured_idx'}),
+            # 同期時の get() / update_or_create() は並び順を外して検索する
+            'github-repositories-sync': (
+                GitHubRepository.objects.filter(user=profile, full_name='indexer/repo').order_by(),
+                {'ghrepo_user_full_name_idx'},
+            ),
+            'public-featured-repositories': (
+                profile.github_repositories.filter(is_private=False, featured=True),
+                {'ghrepo_user_featured_idx', 'ghrepo_public_featured_idx'},
+            ),
+            'public-recent-repositories': (
+                profile.github_repositories.filter(is_private=False).order_by('-pushed_at')[:5],
+                {'ghrepo_public_recent_idx'},
+            ),
+            'qiita-articles': (QiitaArticle.objects.filter(user=profile), {'qiita_user_featured_idx'}),
+            'public-featured-articles': (
+                profile.qiita_articles.filter(is_featured=True),
+                {'qiita_user_featured_idx', 'qiita_featured_recent_idx'},
+            ),
+            'public-recent-articles': (
+                profile.qiita_articles.order_by('-created_at')[:5], {'qiita_user_recent_idx'},
+            ),
+        }
+
+    def assertUsesIndex(self, queryset, index_names):
+        """追加したインデックスのいずれかで検索し、並び替えもインデックスで済むことを確認する"""
+        plan = queryset.explain()
+        if connection.vendor == 'postgresql':
+            self.assertNotIn(f'Seq Scan on {queryset.model._meta.db_table}', plan)
+            self.assertNotRegex(plan, r'(?m)^\s*(->\s*)?Sort\b', plan)
+        elif connection.vendor == 'sqlite':
+            self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+        else:
+            self.skipTest(f'{connection.vendor} の実行計画は検証対象外')
+        self.assertTrue(any(re.search(rf'\b{name}\b', plan) for name in index_names), plan)
+
+    def test_hot_queries_use_index_scan(self):
+        for name, (queryset, index_names) in self.hot_queries().items():
+            with self.subTest(query=name):
+                self.assertUsesIndex(queryset, index_names)
+
+
+@skipUnless(getattr(settings, 'DATABASE_REPLICAS', []), 'DATABASE_REPLICA_URLS でレプリカが設定されていない')
+class ReplicaRoutingTests(TransactionTestCase):
+    """公開エンドポイントの読み込みがレプリカへ、書き込み直後の読み込みがプライマリへ振り分けられることを確認する"""
+    databases = {'default', *getattr(settings, 'DATABASE_REPLICAS', [])}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='replica', password='password123')
+        self.profile, _ = UserProfile.objects.get_or_create(
+            user=self.user, defaults={'display_name': 'replica', 'title': ''}
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+
+    def get_public_profile(self, client):
+        """公開プロフィールを取得し、(レスポンス, プライマリのクエリ数, レプリカのクエリ数) を返す"""
+        with ExitStack() as stack:
+            primary = stack.enter_context(CaptureQueriesContext(connections['default']))
+            replicas = [
+                stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in settings.DATABASE_REPLICAS
+            ]
+            response = client.get(f'/api/profile/{self.profile.portfolio_slug}/', secure=True)
+        return response, len(primary), sum(len(replica) for replica in replicas)
+
+    def test_anonymous_public_read_uses_replica(self):
+        response, primary_queries, replica_queries = self.get_public_profile(self.client)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary_queries, 0)
+        self.assertGreater(replica_queries, 0)
+
+    def test_owner_endpoints_use_primary(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with CaptureQueriesContext(connections['default']) as primary:
+            response = self.client.get('/api/skills/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(primary), 0)
+
+    def test_token_lookup_uses_primary(self):
+        # 発行直後のトークンがレプリカに届いていなくても認証できるよう、公開エンドポイントでもトークンはプライマリから読む
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with CaptureQueriesContext(connections['default']) as primary, ExitStack() as stack:
+            replicas = [
+                stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in settings.DATABASE_REPLICAS
+            ]
+            response = self.client.get(f'/api/profile/{self.profile.portfolio_slug}/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue([q for q in primary.captured_queries if 'authtoken_token' in q['sql']])
+        self.assertFalse([
+            q for replica in replicas for q in replica.captured_queries if 'authtoken_token' in q['sql']
+        ])
+
+    def test_reads_are_pinned_to_primary_after_write(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = self.client.patch(
+            f'/api/profiles/{self.profile.id}/', {'title': 'updated'}, format='json', secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # Cookieを送らないクライアントでもトークンで固定される
+        self.client.cookies.clear()
+        response, primary_queries, replica_queries = self.get_public_profile(self.client)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'updated')
+        self.assertGreater(primary_queries, 0)
+        self.assertEqual(replica_queries, 0)
+
+
+class AdminChangelistTests(TestCase):
+    """管理画面の一覧の並び順と、推定件数を使うページネーションを確認する"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username='admin', password='password123')
+        profile = UserProfile.objects.get(user=cls.admin_user)
+        category = SkillCategory.objects.create(user=cls.admin_user, name='言語')
+        for i in range(3):
+            Skill.objects.create(user=profile, category=category, name=f'skill{i}', level=3)
+
+    def fake_postgresql(self, reltuples):
+        fake = mock.MagicMock(vendor='postgresql')
+        fake.cursor.return_value.__enter__.return_value.fetchone.return_value = (reltuples,)
+        return mock.patch('api.admin.connections', {'default': fake})
+
+    def test_unfiltered_count_uses_estimate(self):
+        with self.fake_postgresql(12345):
+            self.assertEqual(EstimatedCountPaginator(Skill.objects.all(), 100).count, 12345)
+
+    def test_filtered_or_unanalyzed_count_is_exact(self):
+        with self.fake_postgresql(12345):
+            self.assertEqual(EstimatedCountPaginator(Skill.objects.filter(level=3), 100).count, 3)
+        with self.fake_postgresql(-1):
+            self.assertEqual(EstimatedCountPaginator(Skill.objects.all(), 100).count, 3)
+        self.assertEqual(EstimatedCountPaginator(Skill.objects.all(), 100).count, 3)
+
+    @override_settings(STORAGES={
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_changelists_order_by_primary_key(self):
+        self.client.force_login(self.admin_user)
+        for path, table in [
+            ('/admin/api/skillcategory/', 'api_skillcategory'),
+            ('/admin/api/skill/', 'api_skill'),
+            ('/admin/api/education/', 'api_education'),
+        ]:
+            with self.subTest(path=path), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(path, secure=True).status_code, 200)
+                listing = [q['sql'] for q in queries.captured_queries if 'ORDER BY' in q['sql'] and f'FROM "{table}"' in q['sql']]
+                self.assertTrue(listing)
+                self.assertIn(f'ORDER BY "{table}"."id" DESC', listing[-1])
+
+
+class ThrottleTests(TestCase):
+    """トークンバケットの補充・超過時の Retry-After・同時リクエストでの上限と、同期処理の同時実行数の上限を確認する"""
+
+    def setUp(self):
+        cache.clear()
+        rates = SimpleRateThrottle.THROTTLE_RATES
+        saved = dict(rates)
+        self.addCleanup(lambda: (rates.clear(), rates.update(saved)))
+        rates.update({'auth': '2/min', 'anon': '5/min'})
+        self.request = APIRequestFactory().get('/api/search/', REMOTE_ADDR='10.0.0.1')
+        self.request.user = None
+
+    def test_refill_and_retry_after(self):
+        now = [1000.0]
+        throttle = AuthThrottle()
+        throttle.timer = lambda: now[0]
+        self.assertTrue(throttle.allow_request(self.request, None))
+        self.assertTrue(throttle.allow_request(self.request, None))
+        self.assertFalse(throttle.allow_request(self.request, None))
+        self.assertAlmostEqual(throttle.wait(), 30.0)
+        now[0] += 30
+        self.assertTrue(throttle.allow_request(self.request, None))
+        self.assertFalse(throttle.allow_request(self.request, None))
+
+    def test_view_returns_retry_after(self):
+        client = APIClient()
+        for _ in range(2):
+            client.post('/api/api-token-auth/', {'username': 'x', 'password': 'y'}, secure=True)
+        response = client.post('/api/api-token-auth/', {'username': 'x', 'password': 'y'}, secure=True)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_concurrent_requests_share_one_bucket(self):
+        barrier = threading.Barrier(20)
+
+        def attempt(_):
+            barrier.wait()
+            return AnonReadThrottle().allow_request(self.request, None)
+
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            allowed = sum(executor.map(attempt, range(20)))
+        self.assertEqual(allowed, 5)
+
+    def test_concurrent_sync_limit(self):
+        user = User.objects.create_user(username='syncer', password='password123')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with mock.patch('api.throttling._sync_slots', slots):
+            response = client.post('/api/qiita-articles/sync/', secure=True)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], str(settings.SYNC_RETRY_AFTER_SECONDS))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """トークン認証のキャッシュによって削減されるクエリ数と、キャッシュの無効化を確認する"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='cached', password='password123')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def count_authentication_queries(self, authentication_class, requests=20):
+        """同じトークンで requests 回認証したときのクエリ数を返す"""
+        factory = APIRequestFactory()
+        authenticator = authentication_class()
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(requests):
+                request = factory.get('/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+                user, token = authenticator.authenticate(request)
+                self.assertEqual(user.pk, self.user.pk)
+        return len(queries)
+
+    def test_benchmark_saves_one_query_per_request(self):
+        requests = 20
+        uncached = self.count_authentication_queries(TokenAuthentication, requests)
+        cached = self.count_authentication_queries(CachedTokenAuthentication, requests)
+        self.assertEqual(uncached, requests)
+        # 最初の1回だけDBから読み込む
+        self.assertEqual(cached, 1)
+
+    def test_api_request_skips_token_query_when_cached(self):
+        self.client.get('/api/skills/', secure=True)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/skills/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if 'authtoken_token' in q['sql']])
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.client.get('/api/skills/', secure=True).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get('/api/skills/', secure=True).status_code, 401)
+
+    def test_deleted_token_is_rejected(self):
+        self.assertEqual(self.client.get('/api/skills/', secure=True).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertEqual(self.client.get('/api/skills/', secure=True).status_code, 401)
+
+    def test_cache_stores_no_password_hash(self):
+        self.client.get('/api/skills/', secure=True)
+        values = cache.get(token_cache_key(self.token.key))
+        self.assertEqual(values['id'], self.user.pk)
+        self.assertNotIn('password', values)
+        self.assertNotIn(self.user.password, repr(values))
+
+    def test_password_change_invalidates_cache(self):
+        self.client.get('/api/skills/', secure=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('changed-password')
+            self.user.save()
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+
+    def test_unrelated_user_save_keeps_cache(self):
+        self.client.get('/api/skills/', secure=True)
+        user = User.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            user.last_login = timezone.now()
+            user.save(update_fields=['last_login'])
+        self.assertFalse([q for q in queries.captured_queries if 'authtoken_token' in q['sql']])
+        self.assertIsNotNone(cache.get(token_cache_key(self.token.key)))
+
+
+class RequestProfileTests(TestCase):
+    """利用者のプロフィールが登録時に作成され、1リクエストにつき1回だけ読み込まれることを確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='password123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_profile_is_created_with_user(self):
+        self.assertTrue(UserProfile.objects.filter(user=self.user).exists())
+
+    def test_owner_update_resolves_profile_once(self):
+        category = SkillCategory.objects.create(name='言語', user=self.user)
+        skill = Skill.objects.create(user=self.user.profile, category=category, name='Python', level=3)
+        self.client.get('/api/skills/', secure=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f'/api/skills/{skill.id}/', {'level': 4}, format='json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        profile_queries = [q for q in queries.captured_queries if 'FROM "api_userprofile"' in q['sql']]
+        self.assertEqual(len(profile_queries), 1)
+
+    def test_other_users_object_is_not_writable(self):
+        other = User.objects.create_user(username='other', password='password123')
+        category = SkillCategory.objects.create(name='言語', user=other)
+        skill = Skill.objects.create(user=other.profile, category=category, name='Go', level=2)
+        response = self.client.patch(f'/api/skills/{skill.id}/', {'level': 5}, format='json', secure=True)
+        self.assertEqual(response.status_code, 404)
+
+
+class PortfolioStatsTests(TestCase):
+    """集計値（PortfolioStats）が作成・更新・所有者の変更・削除で差分更新され、再計算でずれが直ることを確認する"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='counted').profile
+        self.other = User.objects.create_user(username='other').profile
+        self.category = SkillCategory.objects.create(name='言語', user=self.owner.user)
+
+    def stats(self, profile):
+        return PortfolioStats.objects.get(profile=profile)
+
+    def test_create_update_and_delete(self):
+        skill = Skill.objects.create(user=self.owner, category=self.category, name='Python', level=2)
+        now = timezone.now()
+        GitHubRepository.objects.create(
+            user=self.owner, name='repo', full_name='counted/repo', html_url='https://example.com',
+            stargazers_count=5, created_at=now, updated_at=now, pushed_at=now
+        )
+        stats = self.stats(self.owner)
+        self.assertEqual((stats.skill_count, stats.skill_level_2_count), (1, 1))
+        self.assertEqual((stats.repository_count, stats.stargazers_total), (1, 5))
+
+        # 読み込み直したインスタンス（post_init の値）からの差分で更新する
+        skill = Skill.objects.get(pk=skill.pk)
+        skill.level = 4
+        skill.save()
+        stats = self.stats(self.owner)
+        self.assertEqual((stats.skill_count, stats.skill_level_2_count, stats.skill_level_4_count), (1, 0, 1))
+
+        skill.delete()
+        stats = self.stats(self.owner)
+        self.assertEqual((stats.skill_count, stats.skill_level_4_count), (0, 0))
+
+    def test_moving_owner(self):
+        project = Project.objects.create(user=self.owner, title='移動', description='説明')
+        project = Project.objects.get(pk=project.pk)
+        project.user = self.other
+        project.save()
+        self.assertEqual(self.stats(self.owner).project_count, 0)
+        self.assertEqual(self.stats(self.other).project_count, 1)
+
+    def test_drifted_counter_does_not_go_negative(self):
+        project = Project.objects.create(user=self.owner, title='ずれ', description='説明')
+        PortfolioStats.objects.filter(profile=self.owner).update(project_count=0)
+        project.delete()
+        self.assertEqual(self.stats(self.owner).project_count, 0)
+
+    def test_reconcile_fixes_drift(self):
+        Project.objects.create(user=self.owner, title='再計算', description='説明')
+        PortfolioStats.objects.filter(profile=self.owner).update(project_count=7, skill_count=3)
+        call_command('reconcile_portfolio_stats', stdout=StringIO())
+        stats = self.stats(self.owner)
+        self.assertEqual((stats.project_count, stats.skill_count), (1, 0))
+
+
+class BulkEditTests(TestCase):
+    """bulk / reorder アクションのクエリ数が件数に依存しないことと、全件が1トランザクションで扱われることを確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='bulk', password='password123')
+        self.profile = self.user.profile
+        self.category = SkillCategory.objects.create(name='言語', user=self.user)
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def post_skills(self, count, offset=0):
+        items = [
+            {'name': f'skill-{offset + i}', 'category': self.category.id, 'level': i % 5 + 1}
+            for i in range(count)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/skills/bulk/', items, format='json', secure=True)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response, len(queries)
+
+    def test_bulk_create_query_count_is_independent_of_size(self):
+        # トークン認証のキャッシュを作っておく
+        self.client.get('/api/skills/', secure=True)
+        response, small = self.post_skills(2)
+        response, large = self.post_skills(40, offset=2)
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data['results']), 40)
+        self.assertEqual(PortfolioStats.objects.get(profile=self.profile).skill_count, 42)
+
+    def test_bulk_rejects_whole_payload_on_error(self):
+        skill = Skill.objects.create(user=self.profile, category=self.category, name='Python', level=3)
+        response = self.client.post('/api/skills/bulk/', [
+            {'id': skill.id, 'level': 5},
+            {'name': '', 'category': self.category.id, 'level': 1},
+        ], format='json', secure=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0], {})
+        self.assertIn('name', response.data['errors'][1])
+        skill.refresh_from_db()
+        self.assertEqual(skill.level, 3)
+
+    def test_reorder_uses_single_update(self):
+        response, _ = self.post_skills(5)
+        ids = [item['id'] for item in response.data['results']][::-1]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/skills/reorder/', {'ids': ids}, format='json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]), 1)
+        self.assertEqual(list(Skill.objects.filter(id__in=ids).order_by('order').values_list('id', flat=True)), ids)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class TalentSearchTests(TestCase):
+    """スキルの転置インデックスの更新（保存・削除・一括登録）と、タレント検索の積集合・ページングを確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.profiles = []
+        for i in range(5):
+            user = User.objects.create_user(username=f'talent{i}', password='password123')
+            category = SkillCategory.objects.create(name='言語', user=user)
+            Skill.objects.create(user=user.profile, category=category, name='Ｐｙｔｈｏｎ', level=i + 1)
+            if i % 2 == 0:
+                Skill.objects.create(user=user.profile, category=category, name='Django', level=3)
+            self.profiles.append(user.profile)
+
+    def ids(self, indexes):
+        return [self.profiles[i].id for i in indexes]
+
+    def test_save_and_delete_update_index(self):
+        skill = Skill.objects.get(user=self.profiles[0], name='Django')
+        self.assertEqual(skill.index_entry.skill_key, 'django')
+        python = Skill.objects.get(user=self.profiles[0], name='Ｐｙｔｈｏｎ')
+        self.assertEqual(python.index_entry.skill_key, 'python')
+        skill.name = 'Django REST  Framework'
+        skill.level = 5
+        skill.save()
+        skill.index_entry.refresh_from_db()
+        self.assertEqual((skill.index_entry.skill_key, skill.index_entry.level), ('django rest framework', 5))
+        skill.delete()
+        self.assertFalse(SkillIndexEntry.objects.filter(skill_id=skill.id).exists())
+
+    def test_bulk_create_indexes_skills(self):
+        user = self.profiles[1].user
+        token = Token.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        category = SkillCategory.objects.get(user=user)
+        response = client.post('/api/skills/bulk/', [
+            {'name': 'Rust', 'category': category.id, 'level': 4},
+        ], format='json', secure=True)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(find_profiles([('rust', None, None)]), ([self.profiles[1].id], False))
+
+    def test_intersection_with_levels(self):
+        self.assertEqual(find_profiles([('python', None, None), ('django', None, None)]), (self.ids([0, 2, 4]), False))
+        self.assertEqual(find_profiles([('django', None, None), ('python', 3, None)]), (self.ids([2, 4]), False))
+        self.assertEqual(find_profiles([('python', None, None), ('go', None, None)]), ([], False))
+
+    def test_pagination_reads_one_page_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            page, has_next = find_profiles([('python', None, None)], limit=2)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual((page, has_next), (self.ids([0, 1]), True))
+        self.assertEqual(find_profiles([('python', None, None)], after=page[-1], limit=2), (self.ids([2, 3]), True))
+        self.assertEqual(find_profiles([('python', None, None)], after=self.profiles[3].id, limit=2), (self.ids([4]), False))
+
+    def test_endpoint(self):
+        response = APIClient().get('/api/talent-search/', {'skill': ['python:2', 'DJANGO'], 'page_size': 1}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['display_name'] for r in response.data['results']], [self.profiles[2].display_name])
+        self.assertEqual(response.data['next'], self.profiles[2].id)
+        matched = {skill['name']: skill['level'] for skill in response.data['results'][0]['matched_skills']}
+        self.assertEqual(matched, {'Ｐｙｔｈｏｎ': 3, 'Django': 3})
+
+
+class QiitaArticleBodyTests(TestCase):
+    """記事本文の圧縮保存（マーカーによる判別・空の値）と、一覧・公開プロフィールが本文テーブルを読み込まないことを確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', password='password123')
+        self.article = QiitaArticle.objects.create(
+            user=self.user.profile, article_id='abc', title='記事', url='https://qiita.com/items/abc',
+            created_at=timezone.now(), updated_at=timezone.now(), is_featured=True,
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def stored_bytes(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT body_md, body_html FROM api_qiitaarticlebody WHERE article_id = %s', [self.article.id])
+            return [bytes(value) if value is not None else None for value in cursor.fetchone()]
+
+    def test_round_trip_with_markers(self):
+        long_text = '# 見出し\n' + '同じ段落の繰り返し。' * 200
+        self.article.set_body(long_text, 'a')
+        body_md, body_html = self.stored_bytes()
+        self.assertEqual(body_md[:1], b'z')
+        self.assertEqual(body_html, b'ra')
+        body = QiitaArticleBody.objects.get(article=self.article)
+        self.assertEqual((body.body_md, body.body_html), (long_text, 'a'))
+
+        with override_settings(TEXT_COMPRESSION_ENABLED=False):
+            self.article.set_body(long_text, None)
+        body_md, body_html = self.stored_bytes()
+        self.assertEqual(body_md, b'r' + long_text.encode('utf-8'))
+        self.assertIsNone(body_html)
+        self.assertEqual(QiitaArticleBody.objects.get(article=self.article).body_md, long_text)
+
+    def test_empty_values(self):
+        self.article.set_body('', None)
+        self.assertEqual(self.stored_bytes(), [b'r', None])
+        body = QiitaArticleBody.objects.get(article=self.article)
+        self.assertEqual((body.body_md, body.body_html), ('', None))
+        field = QiitaArticleBody._meta.get_field('body_md')
+        self.assertEqual(field.to_python(b''), '')
+        self.assertEqual(field.to_python(memoryview(b'r\xe6\x9c\xac')), '本')
+
+    def test_list_endpoints_skip_body_table(self):
+        self.article.set_body('# 本文', '<h1>本文</h1>')
+        self.user.profile.portfolio_slug = 'writer'
+        self.user.profile.save()
+        for path in ['/api/qiita-articles/', '/api/profiles/me/']:
+            with self.subTest(path=path), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(path, secure=True)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([q for q in queries.captured_queries if 'api_qiitaarticlebody' in q['sql']])
+        with override_settings(DATABASE_REPLICAS=[]), CaptureQueriesContext(connection) as queries:
+            response = APIClient().get('/api/profile/writer/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([article['title'] for article in response.data['qiita_articles']], ['記事'])
+        self.assertFalse([q for q in queries.captured_queries if 'api_qiitaarticlebody' in q['sql']])
+
+        response = self.client.get(f'/api/qiita-articles/{self.article.id}/', secure=True)
+        self.assertEqual(response.data['body_md'], '# 本文')
+
+
+class SearchTests(TestCase):
+    """全文検索（SQLite は FTS5）の検索・絞り込み・ページング・索引の更新を確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='search', password='password123')
+        self.profile = self.user.profile
+        self.client = APIClient()
+
+    def search(self, **params):
+        return self.client.get('/api/search/', params, secure=True)
+
+    def test_kind_filter_and_cursor_over_tied_ranks(self):
+        projects = [Project.objects.create(user=self.profile, title='検索', description='django 同じ内容') for _ in range(5)]
+        WorkExperience.objects.create(user=self.profile, position='エンジニア', start_date='2020-04-01', description='django')
+
+        response = self.search(q='django', kind='project', page_size=2)
+        self.assertEqual(response.status_code, 200)
+        object_ids, pages = [], 0
+        while True:
+            object_ids += [item['object_id'] for item in response.data['results']]
+            self.assertTrue(all(item['kind'] == 'project' for item in response.data['results']))
+            pages += 1
+            if not response.data['next']:
+                break
+            response = self.search(q='django', kind='project', page_size=2, cursor=response.data['next'])
+        self.assertEqual(sorted(object_ids), sorted(project.id for project in projects))
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(self.search(q='django').data['results']), 6)
+        self.assertEqual(self.search(q='django', cursor='invalid').status_code, 400)
+
+    def test_index_follows_save_and_delete(self):
+        project = Project.objects.create(user=self.profile, title='旧タイトル', description='kubernetes')
+        project.description = 'terraform'
+        project.save()
+        self.assertEqual(self.search(q='kubernetes').data['results'], [])
+        self.assertEqual([item['object_id'] for item in self.search(q='terraform').data['results']], [project.id])
+        project.delete()
+        self.assertFalse(SearchDocument.objects.filter(kind='project', object_id=project.id).exists())
+        self.assertEqual(self.search(q='terraform').data['results'], [])
+
+    def test_search_batch_indexes_on_exit(self):
+        with search_batch():
+            project = Project.objects.create(user=self.profile, title='まとめて', description='ansible')
+            self.assertFalse(SearchDocument.objects.filter(kind='project', object_id=project.id).exists())
+        self.assertEqual([item['object_id'] for item in self.search(q='ansible').data['results']], [project.id])
+
+    def test_long_work_experience_title_is_truncated(self):
+        experience = WorkExperience.objects.create(
+            user=self.profile, position='役' * 200, company='社' * 200, start_date='2020-04-01', description='説明'
+        )
+        document = SearchDocument.objects.get(kind='work_experience', object_id=experience.id)
+        self.assertEqual(len(document.title), SearchDocument._meta.get_field('title').max_length)
+
+
+class KeysetPaginationTests(TestCase):
+    """キーセット方式のページングが、並び順の値が同じ行やマイクロ秒だけ違う行を取りこぼさず重複もしないことを確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='pages', password='password123')
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url, secure=True)
+            self.assertEqual(response.status_code, 200)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+            self.assertLessEqual(len(ids), 100)
+        return ids
+
+    def test_rows_within_same_millisecond(self):
+        created_at = timezone.now().replace(microsecond=123000)
+        categories = [SkillCategory.objects.create(name=f'分類{index}', user=self.user) for index in range(5)]
+        for index, category in enumerate(categories):
+            SkillCategory.objects.filter(pk=category.pk).update(
+                order=0, created_at=created_at + timedelta(microseconds=(index * 7) % 5)
+            )
+        expected = list(SkillCategory.objects.filter(user=self.user).values_list('id', flat=True))
+        self.assertEqual(self.collect('/api/skill-categories/?page_size=2'), expected)
+
+    def test_bulk_created_rows(self):
+        items = [{'title': f'プロジェクト{index}', 'description': '説明'} for index in range(6)]
+        response = self.client.post('/api/projects/bulk/', items, format='json', secure=True)
+        self.assertEqual(response.status_code, 200, response.data)
+        ids = self.collect('/api/projects/?page_size=2')
+        self.assertEqual(sorted(ids), sorted(item['id'] for item in response.data['results']))
+
+    def test_foreign_key_ordering_follows_related_ordering(self):
+        later = SkillCategory.objects.create(name='後', user=self.user, order=2)
+        earlier = SkillCategory.objects.create(name='先', user=self.user, order=1)
+        for index in range(3):
+            Skill.objects.create(user=self.user.profile, category=later, name=f'後{index}', level=1)
+            Skill.objects.create(user=self.user.profile, category=earlier, name=f'先{index}', level=1)
+        expected = list(Skill.objects.filter(user=self.user.profile).values_list('id', flat=True))
+        self.assertEqual(self.collect('/api/skills/?page_size=2'), expected)
+        self.assertEqual(Skill.objects.get(pk=expected[0]).category, earlier)
+
+
+class ProcessExperienceBulkUpdateTests(TestCase):
+    """担当工程経験の一括更新が1回のUPSERTで行われ、不正な工程を拒否することを確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='process', password='password123')
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.url = '/api/process-experiences/bulk-update/'
+
+    def test_upsert_in_single_statement(self):
+        self.client.post(self.url, {'process_experiences': [
+            {'process_type': 'testing', 'experience_count': 1},
+        ]}, format='json', secure=True)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'process_experiences': [
+                {'process_type': 'requirements', 'experience_count': 3},
+                {'process_type': 'testing', 'experience_count': 5, 'description': '結合試験'},
+            ]}, format='json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        writes = [q for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 1)
+        counts = {item['process_type']: item['experience_count'] for item in response.data['process_experiences']}
+        self.assertEqual(counts, {'requirements': 3, 'testing': 5})
+
+    def test_invalid_process_type_is_rejected(self):
+        response = self.client.post(self.url, {'process_experiences': [
+            {'process_type': 'requirements', 'experience_count': 1},
+            {'process_type': 'unknown', 'experience_count': 1},
+        ]}, format='json', secure=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.user.profile.process_experiences.exists())
+
+
+class PortfolioExportImportTests(TestCase):
+    """エクスポートしたNDJSONを別のユーザーにインポートすると、IDが振り替えられて同じ内容になることを確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.source = User.objects.create_user(username='exporter', password='password123')
+        profile = self.source.profile
+        category = SkillCategory.objects.create(name='言語', user=self.source)
+        python = Skill.objects.create(user=profile, category=category, name='Python', level=4)
+        project = Project.objects.create(user=profile, title='ポートフォリオ', description='説明')
+        project.technologies_used.add(python)
+        work = WorkExperience.objects.create(
+            user=profile, position='エンジニア', start_date='2020-04-01', description='開発',
+            languages_used=['Python'], process_details={'testing': '結合試験'}
+        )
+        work.skills_used.add(python)
+        article = QiitaArticle.objects.create(
+            user=profile, article_id='abc', title='記事', url='https://qiita.com/items/abc',
+            created_at='2024-01-01T00:00:00Z', updated_at='2024-01-01T00:00:00Z'
+        )
+        article.set_body('# 本文', '<h1>本文</h1>')
+        self.target = User.objects.create_user(username='importer', password='password123')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user)[0].key}')
+        return client
+
+    def test_round_trip_remaps_ids(self):
+        response = self.client_for(self.source).get('/api/profiles/export/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        payload = b''.join(response.streaming_content)
+
+        response = self.client_for(self.target).post(
+            '/api/profiles/import/', payload, content_type='application/x-ndjson', secure=True
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['counts']['skill'], 1)
+
+        profile = self.target.profile
+        skill = Skill.objects.get(user=profile)
+        self.assertEqual(skill.category.user, self.target)
+        self.assertEqual(list(profile.projects.get().technologies_used.all()), [skill])
+        work = profile.work_experiences.get()
+        self.assertEqual(list(work.skills_used.all()), [skill])
+        self.assertEqual(work.process_details, {'testing': '結合試験'})
+        self.assertEqual(profile.qiita_articles.get().body_md, '# 本文')
+        self.assertEqual(PortfolioStats.objects.get(profile=profile).skill_count, 1)
+        # エクスポート元のデータはそのまま残る
+        self.assertEqual(Skill.objects.filter(user=self.source.profile).count(), 1)
+
+    def test_unknown_reference_rolls_back(self):
+        SkillCategory.objects.create(name='既存', user=self.target)
+        payload = '\n'.join([
+            '{"type": "meta", "version": 1}',
+            '{"type": "skill", "data": {"id": 1, "name": "Go", "category": 999, "level": 3}}',
+        ])
+        response = self.client_for(self.target).post(
+            '/api/profiles/import/', payload, content_type='application/x-ndjson', secure=True
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['line'], 2)
+        self.assertTrue(SkillCategory.objects.filter(user=self.target, name='既存').exists())
+
+    def import_skill(self, **fields):
+        payload = '\n'.join([
+            '{"type": "meta", "version": 1}',
+            '{"type": "skill_category", "data": {"id": 1, "name": "言語"}}',
+            json.dumps({'type': 'skill', 'data': {'id': 1, 'name': 'Go', 'category': 1, 'level': 3, **fields}}),
+        ])
+        return self.client_for(self.target).post(
+            '/api/profiles/import/', payload, content_type='application/x-ndjson', secure=True
+        )
+
+    def test_file_paths_must_be_stored_files(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            icon = Skill.objects.get(user=self.source.profile)
+            icon.icon = SimpleUploadedFile('go.svg', b'<svg xmlns="http://www.w3.org/2000/svg"/>')
+            icon.save()
+            stored = icon.icon.name
+            # 形式は正しいが保存されていないファイル
+            missing = 'blobs/00/00/' + '0' * 64 + '.svg'
+
+            for fields in [
+                {'icon': '../../settings.py'},
+                {'icon': missing},
+                {'icon': stored + '/../../x'},
+                {'icon_variants': {'webp': {'64': '../x.webp'}}},
+                {'icon_variants': {'source': missing}},
+            ]:
+                with self.subTest(fields=fields):
+                    response = self.import_skill(**fields)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.data['line'], 3)
+            self.assertFalse(Skill.objects.filter(user=self.target.profile).exists())
+
+            response = self.import_skill(icon=stored)
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertEqual(Skill.objects.get(user=self.target.profile).icon.name, stored)
+            self.assertEqual(MediaBlob.objects.get(name=stored).ref_count, 2)
+
+            # 内容のハッシュによる命名の前のエクスポート（upload_to のパス）も、ファイルがあれば取り込める
+            legacy = 'skill_icons/go.svg'
+            os.makedirs(os.path.join(media_root, 'skill_icons'))
+            with open(os.path.join(media_root, legacy), 'wb') as file:
+                file.write(b'<svg xmlns="http://www.w3.org/2000/svg"/>')
+            for name in ['skill_icons/../skill_icons/go.svg', '/' + legacy, 'skill_icons\\go.svg']:
+                with self.subTest(name=name):
+                    self.assertEqual(self.import_skill(icon=name).status_code, 400)
+            response = self.import_skill(icon=legacy)
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertEqual(Skill.objects.get(user=self.target.profile).icon.name, legacy)
+
+
+class OwnedSkillIdsTests(TestCase):
+    """technologies_ids が自分のスキルだけを1回のクエリで解決し、見つからないIDをまとめて返すことを確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='password123')
+        category = SkillCategory.objects.create(name='言語', user=self.user)
+        self.skills = [
+            Skill.objects.create(user=self.user.profile, category=category, name=f'skill-{i}', level=3)
+            for i in range(10)
+        ]
+        other = User.objects.create_user(username='other', password='password123')
+        other_category = SkillCategory.objects.create(name='言語', user=other)
+        self.foreign = Skill.objects.create(user=other.profile, category=other_category, name='Go', level=3)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def post_project(self, ids):
+        return self.client.post('/api/projects/', {
+            'title': 'ポートフォリオ', 'description': '説明', 'technologies_ids': ids
+        }, format='json', secure=True)
+
+    def test_skill_ids_are_resolved_in_one_query(self):
+        self.client.get('/api/projects/', secure=True)
+        ids = [skill.id for skill in self.skills]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_project(ids)
+        self.assertEqual(response.status_code, 201, response.data)
+        skill_selects = [
+            q for q in queries.captured_queries
+            if q['sql'].startswith('SELECT') and 'FROM "api_skill"' in q['sql'] and 'INNER JOIN' not in q['sql']
+        ]
+        self.assertEqual(len(skill_selects), 1)
+        self.assertEqual(sorted(Project.objects.get().technologies_used.values_list('id', flat=True)), ids)
+
+    def test_other_users_and_unknown_ids_are_reported_together(self):
+        response = self.post_project([self.skills[0].id, self.foreign.id, 99999])
+        self.assertEqual(response.status_code, 400)
+        message = str(response.data['technologies_ids'][0])
+        self.assertIn(str(self.foreign.id), message)
+        self.assertIn('99999', message)
+        self.assertFalse(Project.objects.exists())
+
+
+class ImageVariantTests(TestCase):
+    """アップロード画像の縮小版がコミット後に作成され、srcset として返されることを確認する"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_VARIANTS_ASYNC=False)
+        override.enable()
+        self.addCleanup(override.disable)
+        user = User.objects.create_user(username='images', password='password123')
+        self.profile = user.profile
+        self.category = SkillCategory.objects.create(name='言語', user=user)
+
+    def upload(self, size, mode='RGB'):
+        buffer = BytesIO()
+        Image.new(mode, size, 'red').save(buffer, 'PNG')
+        return SimpleUploadedFile('icon.png', buffer.getvalue(), content_type='image/png')
+
+    def test_variants_are_generated_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            project = Project.objects.create(
+                user=self.profile, title='ポートフォリオ', description='説明', thumbnail=self.upload((800, 400))
+            )
+        project.refresh_from_db()
+        variants = project.thumbnail_variants
+        self.assertEqual(variants['source'], project.thumbnail.name)
+        # 元画像より大きい幅は元画像の幅に揃える
+        self.assertEqual(sorted(variants['webp'], key=int), ['320', '640', '800'])
+        with Image.open(os.path.join(self.media_root, variants['jpeg']['320'])) as image:
+            self.assertEqual(image.size, (320, 160))
+        srcset = ProjectSerializer(project).data['thumbnail_srcset']
+        self.assertTrue(srcset['webp'].endswith('800w'))
+
+    def test_transparent_icon_falls_back_to_png(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            skill = Skill.objects.create(
+                user=self.profile, category=self.category, name='Python', icon=self.upload((64, 64), 'RGBA')
+            )
+        skill.refresh_from_db()
+        self.assertEqual(set(skill.icon_variants) - {'source'}, {'webp', 'png'})
+
+
+class MediaServingTests(TestCase):
+    """アップロードファイルの配信が ETag・304・Range に対応し、MEDIA_ROOT の外を返さないことを確認する"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(self.media_root, 'resumes'))
+        with open(os.path.join(self.media_root, 'resumes', 'resume.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4 0123456789')
+        self.url = '/media/resumes/resume.pdf'
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get(self.url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 0123456789')
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'], secure=True)
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_request(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=9-12', secure=True)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 9-12/19')
+        self.assertEqual(b''.join(response.streaming_content), b'0123')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-', secure=True)
+        self.assertEqual(response.status_code, 416)
+
+    def test_path_outside_media_root_is_not_found(self):
+        response = self.client.get('/media/%2e%2e/manage.py', secure=True)
+        self.assertEqual(response.status_code, 404)
+
+
+class ContentAddressedStorageTests(TestCase):
+    """同じ内容のアップロードが1つのファイルを共有し、参照されなくなったものだけ gc_media で削除されることを確認する"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.users = [User.objects.create_user(username=f'blob-{i}', password='password123') for i in range(2)]
+
+    def create_skill(self, user, content=b'<svg xmlns="http://www.w3.org/2000/svg"/>'):
+        category = SkillCategory.objects.create(name='言語', user=user)
+        return Skill.objects.create(
+            user=user.profile, category=category, name='Python',
+            icon=SimpleUploadedFile('python.svg', content, content_type='image/svg+xml')
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        first, second = [self.create_skill(user) for user in self.users]
+        self.assertEqual(first.icon.name, second.icon.name)
+        self.assertTrue(first.icon.name.startswith('blobs/'))
+        self.assertEqual(MediaBlob.objects.get(name=first.icon.name).ref_count, 2)
+
+        first.delete()
+        call_command('gc_media', grace_hours=0, stdout=StringIO())
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, second.icon.name)))
+
+        second.delete()
+        self.assertEqual(MediaBlob.objects.get(name=second.icon.name).ref_count, 0)
+        call_command('gc_media', grace_hours=0, stdout=StringIO())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, second.icon.name)))
+        self.assertFalse(MediaBlob.objects.filter(name=second.icon.name).exists())
+
+    def test_dedup_hit_extends_grace_period(self):
+        skill = self.create_skill(self.users[0])
+        name = skill.icon.name
+        skill.delete()
+        MediaBlob.objects.filter(name=name).update(updated_at=timezone.now() - timedelta(days=2))
+
+        # 同じ内容の保存でファイルを再利用すると、参照数が増える前でも gc_media の対象から外れる
+        self.assertEqual(default_storage.save('icon.svg', ContentFile(b'<svg xmlns="http://www.w3.org/2000/svg"/>')), name)
+        self.assertGreater(MediaBlob.objects.get(name=name).updated_at, timezone.now() - timedelta(hours=1))
+        call_command('gc_media', grace_hours=1, stdout=StringIO())
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+        self.assertTrue(MediaBlob.objects.filter(name=name).exists())
+
+    def test_migration_backfills_existing_files(self):
+        skill = self.create_skill(self.users[0])
+        MediaBlob.objects.all().delete()
+        MediaBlob.objects.create(name='blobs/00/00/' + '0' * 64 + '.png', ref_count=3)
+        migration = import_module('api.migrations.0013_backfill_media_refs')
+        migration.backfill_media_refs(django_apps, mock.Mock(connection=connection))
+        self.assertEqual(MediaBlob.objects.get(name=skill.icon.name).ref_count, 1)
+        self.assertEqual(MediaBlob.objects.get(name='blobs/00/00/' + '0' * 64 + '.png').ref_count, 0)
+
+    def test_recount_repairs_drift(self):
+        skill = self.create_skill(self.users[0])
+        MediaBlob.objects.filter(name=skill.icon.name).update(ref_count=0)
+        call_command('gc_media', recount=True, grace_hours=0, stdout=StringIO())
+        self.assertEqual(MediaBlob.objects.get(name=skill.icon.name).ref_count, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, skill.icon.name)))
+
+
+class UploadValidationTests(TestCase):
+    """アップロードのサイズ・画素数の上限、大きな画像の縮小、職務経歴書のPDFチェックを確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='uploader', password='password123')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        self.url = f'/api/profiles/{self.user.profile.id}/'
+
+    def image(self, size, image_format='PNG'):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'blue').save(buffer, image_format)
+        return SimpleUploadedFile(f'photo.{image_format.lower()}', buffer.getvalue())
+
+    def patch(self, **files):
+        return self.client.patch(self.url, files, format='multipart', secure=True)
+
+    @override_settings(IMAGE_MAX_PIXELS=1000 * 1000)
+    def test_too_many_pixels_is_rejected_before_decoding(self):
+        response = self.patch(profile_image=self.image((2000, 1000)))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('profile_image', response.data)
+
+    @override_settings(IMAGE_MAX_DIMENSION=500)
+    def test_oversize_image_is_downscaled(self):
+        response = self.patch(profile_image=self.image((1500, 600), 'JPEG'))
+        self.assertEqual(response.status_code, 200, response.data)
+        self.user.profile.refresh_from_db()
+        with Image.open(self.user.profile.profile_image.path) as image:
+            self.assertEqual(image.size, (500, 200))
+
+    @override_settings(UPLOAD_MAX_FILE_SIZE=1024)
+    def test_upload_is_stopped_over_the_limit(self):
+        response = self.patch(resume=SimpleUploadedFile('resume.pdf', b'%PDF-' + b'0' * 4096 + b'%%EOF'))
+        self.assertEqual(response.status_code, 413)
+
+    def test_resume_must_be_pdf(self):
+        response = self.patch(resume=SimpleUploadedFile('resume.pdf', b'<html></html>'))
+        self.assertEqual(response.status_code, 400)
+        response = self.patch(resume=SimpleUploadedFile('resume.pdf', b'%PDF-1.4\n...\n%%EOF\n'))
+        self.assertEqual(response.status_code, 200, response.data)
+
+
+class SkillIconCatalogTests(TestCase):
+    """アイコンIDがカタログの共有URLに解決され、カタログAPIがキャッシュ可能であることを確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='icons', password='password123')
+        category = SkillCategory.objects.create(name='言語', user=self.user)
+        self.skill = Skill.objects.create(user=self.user.profile, category=category, name='Python', level=3)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def test_set_icon_resolves_alias_to_catalog_url(self):
+        response = self.client.post(f'/api/skills/{self.skill.id}/set_icon/', {'icon_id': 'JS'}, format='json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['icon_id'], 'javascript')
+        self.assertTrue(response.data['icon_url'].endswith('javascript/javascript-original.svg'))
+        self.skill.refresh_from_db()
+        self.assertFalse(self.skill.icon)
+
+        response = self.client.post(f'/api/skills/{self.skill.id}/set_icon/', {'icon_id': 'unknown'}, format='json', secure=True)
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_icon_id_is_kept_on_update(self):
+        # 0012 で icon から移された独自のアイコン名は、カタログになくても更新を妨げない
+        Skill.objects.filter(id=self.skill.id).update(icon_id='my-custom-icon')
+        response = self.client.get(f'/api/skills/{self.skill.id}/', secure=True)
+        payload = {key: response.data[key] for key in ('name', 'category', 'level', 'icon_id')}
+        response = self.client.put(f'/api/skills/{self.skill.id}/', {**payload, 'level': 4}, format='json', secure=True)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['icon_id'], 'my-custom-icon')
+        self.assertIsNone(response.data['icon_url'])
+
+        response = self.client.patch(f'/api/skills/{self.skill.id}/', {'icon_id': 'Py'}, format='json', secure=True)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['icon_id'], 'python')
+
+    @override_settings(SKILL_ICON_UPLOAD_MAX_SIZE=100)
+    def test_icon_upload_limit_is_a_setting(self):
+        buffer = BytesIO()
+        Image.frombytes('RGB', (64, 64), os.urandom(64 * 64 * 3)).save(buffer, 'PNG')
+        response = self.client.patch(
+            f'/api/skills/{self.skill.id}/', {'icon': SimpleUploadedFile('icon.png', buffer.getvalue())},
+            format='multipart', secure=True
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('icon', response.data)
+
+    def test_catalog_is_cacheable(self):
+        response = self.client.get('/api/skill-icons/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertTrue(any(icon['id'] == 'python' for icon in response.data['icons']))
+        response = self.client.get('/api/skill-icons/', HTTP_IF_NONE_MATCH=response['ETag'], secure=True)
+        self.assertEqual(response.status_code, 304)
+
+
+class HtmlHandler(BaseHTTPRequestHandler):
+    """JSONでない応答（エラーページなど）を返す連携先"""
+
+    def do_GET(self):
+        body = b'<html><body>Service Unavailable</body></html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AsyncViewTests(TestCase):
+    """非同期版のビューが同期版と同じ結果を返すことを、擬似サーバー（api/fake_upstream.py）を使って確認する"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.upstream = FakeUpstreamServer(delay=0, repositories=3, articles=2).start()
+        cls.enterClassContext(override_settings(
+            GITHUB_API_BASE_URL=cls.upstream.url, QIITA_API_BASE_URL=cls.upstream.url + '/api/v2'
+        ))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.upstream.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='async', password='password123')
+        UserProfile.objects.filter(user=self.user).update(
+            portfolio_slug='async', github_username='octocat', qiita_username='qiitan', qiita_access_token='token'
+        )
+        self.token = Token.objects.create(user=self.user).key
+        self.factory = AsyncRequestFactory()
+
+    async def test_public_profile(self):
+        response = await async_views.public_profile(self.factory.get('/api/profile/async/'), slug='async')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['github_username'], 'octocat')
+        response = await async_views.public_profile(self.factory.get('/api/profile/none/'), slug='none')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_sync_requires_token(self):
+        response = await async_views.qiita_sync(self.factory.post('/api/qiita-articles/sync/'))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_github_and_qiita_sync(self):
+        headers = {'headers': {'Authorization': f'Token {self.token}'}}
+        response = await async_views.github_sync(self.factory.post('/api/github-repositories/sync/', **headers))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(json.loads(response.content)['repository_count'], 3)
+        repository = await GitHubRepository.objects.aget(full_name='octocat/repo-1')
+        self.assertEqual(repository.topics, ['benchmark', 'repo-1'])
+
+        response = await async_views.qiita_sync(self.factory.post('/api/qiita-articles/sync/', **headers))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(await QiitaArticle.objects.filter(user__user=self.user).acount(), 2)
+
+    async def test_upstream_failures_return_502(self):
+        headers = {'headers': {'Authorization': f'Token {self.token}'}}
+        html = ThreadingHTTPServer(('127.0.0.1', 0), HtmlHandler)
+        threading.Thread(target=html.serve_forever, daemon=True).start()
+        self.addCleanup(html.server_close)
+        self.addCleanup(html.shutdown)
+        host, port = html.server_address[:2]
+
+        # 接続できない連携先と、JSONでない応答を返す連携先
+        for base_url in ['http://127.0.0.1:1', f'http://{host}:{port}']:
+            with self.subTest(base_url=base_url), override_settings(QIITA_API_BASE_URL=base_url):
+                response = await async_views.qiita_sync(self.factory.post('/api/qiita-articles/sync/', **headers))
+                self.assertEqual(response.status_code, 502, response.content)
+                self.assertEqual(list(json.loads(response.content)), ['detail'])
+
+    async def test_errors_use_detail_shape(self):
+        await UserProfile.objects.filter(user=self.user).aupdate(github_username='')
+        headers = {'headers': {'Authorization': f'Token {self.token}'}}
+        response = await async_views.github_sync(self.factory.post('/api/github-repositories/sync/', **headers))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('detail', json.loads(response.content))
+
+    def test_sync_view_uses_same_upstream(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        response = client.post('/api/github-repositories/sync/', secure=True)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(GitHubRepository.objects.filter(user__user=self.user).count(), 3)
+        self.assertEqual(self.user.profile.github_stats.commit_count_total, 1234)
+
+
+class RequestTimingTests(TestCase):
+    """サンプリングしたリクエストに処理時間の内訳（Server-Timing）が付き、ログに出力されることを確認する"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.upstream = FakeUpstreamServer(delay=0, articles=2).start()
+        # 公開プロフィールのクエリもプライマリで数える
+        cls.enterClassContext(override_settings(QIITA_API_BASE_URL=cls.upstream.url, DATABASE_REPLICAS=[]))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.upstream.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='timing', password='password123')
+        UserProfile.objects.filter(user=self.user).update(
+            portfolio_slug='timing', qiita_username='qiitan', qiita_access_token='token'
+        )
+        self.client = APIClient()
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0, REQUEST_TIMING_LOG_SAMPLE_RATE=1.0)
+    def test_header_and_log_line(self):
+        with CaptureQueriesContext(connection) as queries, self.assertLogs('api.timing', 'INFO') as logs:
+            response = self.client.get('/api/profile/timing/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        timings = parse_server_timing(response['Server-Timing'])
+        self.assertEqual(timings['db']['desc'], f'{len(queries)} queries')
+        self.assertGreater(timings['total']['dur'], 0)
+        self.assertIn('serialize', timings)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'public-profile')
+        self.assertEqual(record['db_queries'], len(queries))
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0)
+    def test_upstream_calls(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        response = self.client.post('/api/qiita-articles/sync/', secure=True)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(parse_server_timing(response['Server-Timing'])['upstream']['desc'], '1 calls')
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_request(self):
+        response = self.client.get('/api/profile/timing/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+
+class MetricsTests(TestCase):
+    """/metrics がURL名ごとのリクエスト・同期処理・外部APIの呼び出し・キャッシュの参照を返すことを確認する"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.upstream = FakeUpstreamServer(delay=0, articles=2, rate_limit=1000).start()
+        cls.enterClassContext(override_settings(QIITA_API_BASE_URL=cls.upstream.url, DATABASE_REPLICAS=[]))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.upstream.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='metrics', password='password123')
+        UserProfile.objects.filter(user=self.user).update(
+            portfolio_slug='metrics', qiita_username='qiitan', qiita_access_token='token'
+        )
+        self.client = APIClient()
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_and_sync_metrics(self):
+        requests_before = self.sample('http_requests_total', route='public-profile', method='GET', status='200')
+        syncs_before = self.sample('sync_duration_seconds_count', provider='qiita', outcome='success')
+        upstream_before = self.sample('upstream_requests_total', provider='qiita', status='200')
+        misses_before = self.sample('cache_lookups_total', cache='auth_token', result='miss')
+        hits_before = self.sample('cache_lookups_total', cache='auth_token', result='hit')
+
+        self.client.get('/api/profile/metrics/', secure=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        self.client.post('/api/qiita-articles/sync/', secure=True)
+        self.client.get('/api/projects/', secure=True)
+
+        self.assertEqual(self.sample('http_requests_total', route='public-profile', method='GET', status='200'),
+                         requests_before + 1)
+        self.assertEqual(self.sample('sync_duration_seconds_count', provider='qiita', outcome='success'), syncs_before + 1)
+        self.assertEqual(self.sample('upstream_requests_total', provider='qiita', status='200'), upstream_before + 1)
+        self.assertLess(self.sample('upstream_rate_limit_remaining', provider='qiita'), 1000)
+        self.assertEqual(self.sample('cache_lookups_total', cache='auth_token', result='miss'), misses_before + 1)
+        self.assertEqual(self.sample('cache_lookups_total', cache='auth_token', result='hit'), hits_before + 1)
+
+        with override_settings(METRICS_TOKEN='secret'):
+            response = APIClient().get('/metrics', secure=True, headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('http_request_duration_seconds_bucket{le="0.005",method="GET",route="public-profile"}',
+                      response.content.decode())
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required(self):
+        self.assertEqual(self.client.get('/metrics', secure=True).status_code, 401)
+        response = self.client.get('/metrics', secure=True, headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_closed_without_token_outside_debug(self):
+        self.assertEqual(self.client.get('/metrics', secure=True).status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics', secure=True).status_code, 200)
+
+
+class BenchmarkCommandTests(TestCase):
+    """manage.py bench がプロセス内で操作を実行し、比較できる結果ファイルを書き出すことを確認する"""
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_writes_comparable_results(self):
+        output = os.path.join(self.directory, 'bench.json')
+        call_command('bench', '--requests', '12', '--warmup', '0', '--mix', 'public=1,dashboard=1,auth=1',
+                     '--output', output, stdout=StringIO())
+        with open(output, encoding='utf-8') as f:
+            results = json.load(f)
+        self.assertEqual(results['total']['errors'], 0)
+        self.assertEqual(results['meta']['target'], 'in-process')
+        self.assertGreater(results['endpoints']['projects-create']['queries_per_request'], 0)
+        self.assertEqual(Project.objects.filter(title='ベンチマーク').count(), 0)
+
+        stdout = StringIO()
+        call_command('bench', '--requests', '12', '--warmup', '0', '--mix', 'public=1,dashboard=1,auth=1',
+                     '--compare', output, stdout=stdout)
+        self.assertIn('latency_ms.p95', stdout.getvalue())
+
+
+class GeneratePortfoliosTests(TestCase):
+    """manage.py generate_portfolios が集計・検索索引を含めて再現可能なデータを作ることを確認する"""
+
+    def generate(self, *args):
+        call_command('generate_portfolios', '4', '--seed', '1', '--batch-size', '3', '--articles', '1:3:2',
+                     *args, stdout=StringIO())
+        profiles = UserProfile.objects.filter(user__username__startswith='synthetic-').order_by('user__username')
+        return [
+            (profile.user.username, profile.skills.count(), profile.projects.count(),
+             sorted(Project.objects.filter(user=profile).values_list('title', 'technologies_used__name')))
+            for profile in profiles
+        ]
+
+    def test_creates_consistent_and_reproducible_portfolios(self):
+        first = self.generate()
+        self.assertEqual(len(first), 4)
+        for profile in UserProfile.objects.filter(user__username__startswith='synthetic-'):
+            stats = PortfolioStats.objects.get(profile=profile)
+            self.assertEqual(stats.skill_count, profile.skills.count())
+            self.assertEqual(stats.project_count, profile.projects.count())
+            self.assertEqual(stats.article_count, profile.qiita_articles.count())
+            self.assertEqual(stats.repository_count, profile.github_repositories.count())
+            self.assertTrue(SearchDocument.objects.filter(kind='profile', object_id=profile.id).exists())
+            self.assertEqual(SkillIndexEntry.objects.filter(profile=profile).count(), profile.skills.count())
+
+        self.assertEqual(self.generate('--delete'), first)
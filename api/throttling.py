@@ -0,0 +1,168 @@
+"""
+リクエスト数の制限（キャッシュ上のトークンバケット）と同期処理の同時実行数の制限
+"""
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache as default_cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import SimpleRateThrottle
+
+
+# Redis 上で残りトークン数の計算と更新を1回の呼び出しで行うスクリプト
+# （KEYS[1]: バケット、ARGV: 容量・1秒あたりの補充数・現在時刻・保持秒数。戻り値は {許可したか, 消費前の残り数}）
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_per_second = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_per_second)
+local allowed = 0
+local remaining = tokens
+if tokens >= 1 then
+    allowed = 1
+    remaining = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(remaining), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return {allowed, tostring(tokens)}
+"""
+
+# Redis 以外のキャッシュ（プロセス内の LocMemCache）で読み書きをまとめて行うためのロック
+_bucket_lock = threading.Lock()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    DEFAULT_THROTTLE_RATES の 'N/期間' を、容量N・期間あたりN個補充のトークンバケットとして扱う
+
+    キャッシュにはバケットごとに (残りトークン数, 更新時刻) だけを保存するため、
+    DRF標準のリクエスト履歴を保存する方式と違い、レートが大きくても1回の読み書きで判定できる。
+    同じクライアントの同時リクエストが同じ残り数を読んで上限を超えないよう、Redis では
+    TOKEN_BUCKET_SCRIPT で読み書きを1回の呼び出しで行い、プロセス内のキャッシュではロックの中で行う。
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        # DRF の既定の cache は接続のプロキシのため、バックエンドの種類は実体で判定する
+        backend = caches[DEFAULT_CACHE_ALIAS] if self.cache is default_cache else self.cache
+        if isinstance(backend, RedisCache):
+            allowed, self.tokens = self._take_redis(backend)
+        else:
+            allowed, self.tokens = self._take_local()
+        return True if allowed else self.throttle_failure()
+
+    def _take_redis(self, backend):
+        key = backend.make_and_validate_key(self.key)
+        client = backend._cache.get_client(key, write=True)
+        allowed, tokens = client.eval(
+            TOKEN_BUCKET_SCRIPT, 1, key,
+            self.num_requests, self.num_requests / self.duration, self.now, self.duration,
+        )
+        return bool(allowed), float(tokens)
+
+    def _take_local(self):
+        refill_per_second = self.num_requests / self.duration
+        with _bucket_lock:
+            tokens, updated_at = self.cache.get(self.key, (self.num_requests, self.now))
+            tokens = min(self.num_requests, tokens + max(0.0, self.now - updated_at) * refill_per_second)
+            if tokens < 1:
+                return False, tokens
+            # 空のバケットは duration 秒で満タンに戻るため、それ以上保持する必要はない
+            self.cache.set(self.key, (tokens - 1, self.now), self.duration)
+        return True, tokens
+
+    def wait(self):
+        """次のトークンが補充されるまでの秒数（Retry-After ヘッダーに使われる）"""
+        refill_per_second = self.num_requests / self.duration
+        return max(0.0, (1 - self.tokens) / refill_per_second)
+
+    def ident_cache_key(self, ident):
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class AnonReadThrottle(TokenBucketThrottle):
+    """未認証の読み込み（公開プロフィール・検索）をIPアドレスごとに制限する"""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.ident_cache_key(self.get_ident(request))
+
+
+class AuthThrottle(TokenBucketThrottle):
+    """ユーザー登録・トークン発行をIPアドレスごとに制限する"""
+    scope = 'auth'
+
+    def get_cache_key(self, request, view):
+        return self.ident_cache_key(self.get_ident(request))
+
+
+class SyncThrottle(TokenBucketThrottle):
+    """GitHub・Qiitaの同期をユーザーごとに制限する"""
+    scope = 'sync'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return self.ident_cache_key(self.get_ident(request))
+        return self.ident_cache_key(request.user.pk)
+
+
+# プロセス内で同時に実行できる同期処理の数（外部APIの応答待ちでワーカーが埋まるのを防ぐ）
+_sync_slots = threading.BoundedSemaphore(settings.SYNC_MAX_CONCURRENT)
+
+
+def limit_concurrent_syncs(view_method):
+    """同時実行数の上限に達している場合は待たずに429を返すデコレータ"""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not _sync_slots.acquire(blocking=False):
+            return Response(
+                {'error': '同期処理が混み合っています。しばらくしてから再度お試しください。'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(settings.SYNC_RETRY_AFTER_SECONDS)}
+            )
+        try:
+            return view_method(self, request, *args, **kwargs)
+        finally:
+            _sync_slots.release()
+    return wrapper
+
+
+# 非同期版の同期処理（api/async_views.py）は外部APIの応答待ちでスレッドを占有しないため、
+# 同じイベントループ内で数える別の上限（ASYNC_SYNC_MAX_CONCURRENT）を使う
+_async_active_syncs = 0
+
+
+def async_limit_concurrent_syncs(view_func):
+    """limit_concurrent_syncs の非同期ビュー版"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        global _async_active_syncs
+        if _async_active_syncs >= settings.ASYNC_SYNC_MAX_CONCURRENT:
+            return JsonResponse(
+                {'detail': '同期処理が混み合っています。しばらくしてから再度お試しください。'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(settings.SYNC_RETRY_AFTER_SECONDS)},
+                json_dumps_params={'ensure_ascii': False}
+            )
+        _async_active_syncs += 1
+        try:
+            return await view_func(request, *args, **kwargs)
+        finally:
+            _async_active_syncs -= 1
+    return wrapper
@@ -0,0 +1,189 @@
+"""
+リクエストごとの処理時間の内訳（DBクエリ・シリアライズ・レンダリング・外部API）の計測
+
+RequestTimingMiddleware が REQUEST_TIMING_SAMPLE_RATE の割合のリクエストで計測を有効にし、
+内訳を Server-Timing ヘッダーと1行のJSONのログ（api.timing ロガー）に出力する。
+計測しないリクエストでは contextvar を読むだけで、DBクエリのラッパーも入れない。
+"""
+import json
+import logging
+import random
+import re
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+# 計測中のリクエストの RequestTiming（None の場合は計測しない）
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """1リクエスト分の計測値（秒）。シリアライズの時間には、その間に実行したDBクエリの時間を含めない"""
+    __slots__ = (
+        'started', 'total', 'db_queries', 'db', 'serialize', 'render', 'upstream_calls', 'upstream',
+    )
+
+    def __init__(self, started):
+        self.started = started
+        self.total = 0.0
+        self.db_queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.upstream_calls = 0
+        self.upstream = 0.0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.db_queries += 1
+
+    @property
+    def app(self):
+        """内訳に含まれない時間（ビュー・ミドルウェアの処理）"""
+        return max(0.0, self.total - self.db - self.serialize - self.render - self.upstream)
+
+    def header(self):
+        return ', '.join([
+            f'db;dur={self.db * 1000:.1f};desc="{self.db_queries} queries"',
+            f'serialize;dur={self.serialize * 1000:.1f}',
+            f'render;dur={self.render * 1000:.1f}',
+            f'upstream;dur={self.upstream * 1000:.1f};desc="{self.upstream_calls} calls"',
+            f'app;dur={self.app * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ])
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 1),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db * 1000, 1),
+            'serialize_ms': round(self.serialize * 1000, 1),
+            'render_ms': round(self.render * 1000, 1),
+            'upstream_calls': self.upstream_calls,
+            'upstream_ms': round(self.upstream * 1000, 1),
+            'app_ms': round(self.app * 1000, 1),
+        }
+
+
+def current_timing():
+    """計測中のリクエストの RequestTiming（計測していない場合は None）"""
+    return _current.get()
+
+
+def record_upstream(seconds):
+    """外部APIの呼び出し1回分の時間を計測中のリクエストに加える"""
+    timing = _current.get()
+    if timing is not None:
+        timing.upstream_calls += 1
+        timing.upstream += seconds
+
+
+def instrument_serializers():
+    """トップレベルのシリアライザの .data の評価にかかった時間を計測中のリクエストに加える（AppConfig.ready で呼ぶ）"""
+    data = BaseSerializer.data
+    if getattr(data.fget, 'timed', False):
+        return
+
+    def timed_data(serializer):
+        timing = _current.get()
+        if timing is None:
+            return data.fget(serializer)
+        started, db_before = time.perf_counter(), timing.db
+        try:
+            return data.fget(serializer)
+        finally:
+            timing.serialize += time.perf_counter() - started - (timing.db - db_before)
+
+    timed_data.timed = True
+    BaseSerializer.data = property(timed_data)
+
+
+_SERVER_TIMING_ENTRY = re.compile(r'\s*([^;,\s]+)((?:;[^,]*)?)')
+
+
+def parse_server_timing(value):
+    """Server-Timing ヘッダーを {名前: {'dur': ミリ秒, 'desc': 説明}} にする"""
+    entries = {}
+    for match in _SERVER_TIMING_ENTRY.finditer(value or ''):
+        entry = {}
+        for param in filter(None, match.group(2).split(';')):
+            key, _, raw = param.strip().partition('=')
+            raw = raw.strip('"')
+            entry[key] = float(raw) if key == 'dur' else raw
+        entries[match.group(1)] = entry
+    return entries
+
+
+class RequestTimingMiddleware:
+    """
+    サンプリングしたリクエストの処理時間の内訳を Server-Timing ヘッダーとログに出力するミドルウェア
+
+    他のミドルウェアのDBクエリも含めるため、MIDDLEWARE の先頭に置く。ログは計測したリクエストのうち
+    REQUEST_TIMING_LOG_SAMPLE_RATE の割合と、REQUEST_TIMING_SLOW_MS より遅いもの（計測していない場合も
+    合計時間のみ）を出力する。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            response = self.get_response(request)
+            elapsed = time.perf_counter() - started
+            if elapsed * 1000 >= settings.REQUEST_TIMING_SLOW_MS:
+                self._log(logging.WARNING, request, response, {'total_ms': round(elapsed * 1000, 1)})
+            return response
+
+        timing = RequestTiming(started)
+        token = _current.set(timing)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        timing.total = time.perf_counter() - started
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = timing.header()
+        if timing.total * 1000 >= settings.REQUEST_TIMING_SLOW_MS:
+            self._log(logging.WARNING, request, response, timing.as_dict())
+        elif random.random() < settings.REQUEST_TIMING_LOG_SAMPLE_RATE:
+            self._log(logging.INFO, request, response, timing.as_dict())
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF の Response はビューの後にレンダリングされるため、レンダリングの完了時に時間を加える
+        timing = _current.get()
+        if timing is not None:
+            started = time.perf_counter()
+
+            def add_render_time(rendered):
+                timing.render += time.perf_counter() - started
+
+            response.add_post_render_callback(add_render_time)
+        return response
+
+    def _log(self, level, request, response, values):
+        if not logger.isEnabledFor(level):
+            return
+        match = request.resolver_match
+        logger.log(level, json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'route': match.url_name if match else None,
+            'status': response.status_code,
+            **values,
+        }, ensure_ascii=False))
@@ -0,0 +1,138 @@
+"""
+アップロードファイルの受け付け（サイズ上限・画像の寸法チェック・縮小・PDFの検証）
+
+上限を超えるファイルは UploadSizeLimitHandler が受信中に打ち切り、FILE_UPLOAD_MAX_MEMORY_SIZE を
+超えるファイルは一時ファイルに書き出すため、大きなファイルをワーカーのメモリに保持しない。
+画像はヘッダーだけを読んで寸法を確認してから、必要な場合だけデコードする。
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image, ImageOps
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+PDF_TAIL_BYTES = 1024
+
+
+def _megabytes(size):
+    return f'{size / (1024 * 1024):g}MB'
+
+
+class FileTooLarge(RequestDataTooBig, APIException):
+    """DRF のビューでは413、それ以外（管理画面など）では Django の RequestDataTooBig として400になる"""
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'アップロードできるファイルのサイズを超えています。'
+    default_code = 'file_too_large'
+
+
+class UploadSizeLimitHandler(FileUploadHandler):
+    """受信したバイト数が UPLOAD_MAX_FILE_SIZE を超えた時点でアップロードを打ち切る（後続のハンドラーにはそのまま渡す）"""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        if self.content_length and self.content_length > settings.UPLOAD_MAX_FILE_SIZE:
+            raise FileTooLarge(self._detail())
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.UPLOAD_MAX_FILE_SIZE:
+            raise FileTooLarge(self._detail())
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def _detail(self):
+        return f'{self.field_name}: ファイルサイズは{_megabytes(settings.UPLOAD_MAX_FILE_SIZE)}以下にしてください。'
+
+
+class BoundedImageField(serializers.ImageField):
+    """
+    サイズ・画素数の上限を確認する画像フィールド
+
+    画素数はヘッダーだけを読んで確認し（デコード前に拒否する）、長辺が IMAGE_MAX_DIMENSION を超える画像は
+    IMAGE_DOWNSCALE_ON_UPLOAD が有効な場合に縮小して保存する。
+    """
+    default_error_messages = {
+        'too_large': 'ファイルサイズは{max_size}以下にしてください。',
+        'too_many_pixels': '画像が大きすぎます（{width}x{height}）。{max_pixels}画素以下にしてください。',
+    }
+
+    def __init__(self, max_size_setting='IMAGE_UPLOAD_MAX_SIZE', **kwargs):
+        # 上限は設定名で受け取り、検証のたびに読む（override_settings・環境ごとの設定を反映する）
+        self.max_size_setting = max_size_setting
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        # ファイルであること（名前・サイズ）の確認だけを先に行う
+        data = serializers.FileField.to_internal_value(self, data)
+        max_size = getattr(settings, self.max_size_setting)
+        if data.size > max_size:
+            self.fail('too_large', max_size=_megabytes(max_size))
+
+        try:
+            # Image.open はヘッダーだけを読み、画素データはデコードしない
+            with Image.open(data) as image:
+                width, height = image.size
+        except (OSError, ValueError, Image.DecompressionBombError):
+            self.fail('invalid_image')
+        finally:
+            data.seek(0)
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            self.fail('too_many_pixels', width=width, height=height, max_pixels=settings.IMAGE_MAX_PIXELS)
+
+        data = super().to_internal_value(data)
+        if settings.IMAGE_DOWNSCALE_ON_UPLOAD and max(width, height) > settings.IMAGE_MAX_DIMENSION:
+            data = downscale_image(data, settings.IMAGE_MAX_DIMENSION)
+        return data
+
+
+def downscale_image(file, max_dimension):
+    """長辺が max_dimension になるよう縮小した画像を、元と同じ形式のアップロードファイルとして返す"""
+    file.seek(0)
+    with Image.open(file) as image:
+        image_format = image.format
+        # JPEG はデコード時に縮小して、元の大きさでメモリに展開しない
+        image.draft(image.mode, (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, image_format, quality=90)
+    size = buffer.tell()
+    buffer.seek(0)
+    return InMemoryUploadedFile(
+        buffer, getattr(file, 'field_name', None), os.path.basename(file.name),
+        Image.MIME.get(image_format, file.content_type), size, None
+    )
+
+
+class PdfFileField(serializers.FileField):
+    """PDFとして最低限の形式（先頭の %PDF- と末尾の %%EOF）を確認するファイルフィールド"""
+    default_error_messages = {
+        'too_large': 'ファイルサイズは{max_size}以下にしてください。',
+        'not_pdf': 'PDFファイルをアップロードしてください。',
+    }
+
+    def to_internal_value(self, data):
+        data = super().to_internal_value(data)
+        if data.size > settings.RESUME_UPLOAD_MAX_SIZE:
+            self.fail('too_large', max_size=_megabytes(settings.RESUME_UPLOAD_MAX_SIZE))
+        if os.path.splitext(data.name)[1].lower() != '.pdf':
+            self.fail('not_pdf')
+
+        data.seek(0)
+        head = data.read(5)
+        data.seek(max(0, data.size - PDF_TAIL_BYTES))
+        tail = data.read(PDF_TAIL_BYTES)
+        data.seek(0)
+        if head != b'%PDF-' or b'%%EOF' not in tail:
+            self.fail('not_pdf')
+        return data
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
@@ -5,8 +6,8 @@ from .views import (
     UserProfileViewSet, SkillCategoryViewSet, SkillViewSet, 
     ProjectViewSet, EducationViewSet, WorkExperienceViewSet, 
     ProcessExperienceViewSet, GitHubRepositoryViewSet,
-    PublicProfileView, github_oauth_callback, CustomObtainAuthToken,
-    register_user, QiitaArticleViewSet
+    PublicProfileView, PublicProfileSummaryView, github_oauth_callback, CustomObtainAuthToken,
+    register_user, QiitaArticleViewSet, SearchView, TalentSearchView, SkillIconCatalogView
 )
 
 router = DefaultRouter()
@@ -23,8 +24,22 @@ router.register(r'qiita-articles', QiitaArticleViewSet, basename='qiita-articles
 urlpatterns = [
     path('', include(router.urls)),
     path('profile/<str:slug>/', PublicProfileView.as_view(), name='public-profile'),
+    path('profile/<str:slug>/summary/', PublicProfileSummaryView.as_view(), name='public-profile-summary'),
     path('api-token-auth/', CustomObtainAuthToken.as_view(), name='api_token_auth'),
     path('auth/', include('rest_framework.urls')),
     path('oauth/github/callback/', github_oauth_callback, name='github-oauth-callback'),
     path('register/', register_user, name='register'),
-] 
\ No newline at end of file
+    path('search/', SearchView.as_view(), name='search'),
+    path('talent-search/', TalentSearchView.as_view(), name='talent-search'),
+    path('skill-icons/', SkillIconCatalogView.as_view(), name='skill-icons'),
+]
+
+if settings.ASYNC_VIEWS:
+    from . import async_views
+
+    # 同じURL名で同期版より先に登録し、外部APIを待つ同期処理と公開プロフィールを非同期版に置き換える
+    urlpatterns = [
+        path('profile/<str:slug>/', async_views.public_profile, name='public-profile'),
+        path('github-repositories/sync/', async_views.github_sync, name='github-repositories-sync'),
+        path('qiita-articles/sync/', async_views.qiita_sync, name='qiita-articles-sync'),
+    ] + urlpatterns 
\ No newline at end of file
@@ -1,33 +1,45 @@
 from django.shortcuts import render
 from rest_framework import viewsets, permissions, status, generics
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, permission_classes, throttle_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
-from django.db.models import Prefetch
+from django.db import transaction
 import requests
 import json
-from datetime import datetime
 from django.conf import settings
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, StreamingHttpResponse
 from rest_framework.views import APIView
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 
-from .models import UserProfile, SkillCategory, Skill, Project, Education, WorkExperience, ProcessExperience, GitHubRepository, GitHubCommitStats, generate_unique_portfolio_id, QiitaArticle
+from .models import UserProfile, PortfolioStats, SearchDocument, SkillIndexEntry, SkillCategory, Skill, Project, Education, WorkExperience, ProcessExperience, GitHubRepository, GitHubCommitStats, QiitaArticle, QiitaArticleBody
 from .serializers import (
     UserSerializer, UserProfileSerializer, UserProfilePublicSerializer,
     SkillCategorySerializer, SkillSerializer, ProjectSerializer,
     EducationSerializer, WorkExperienceSerializer, ProcessExperienceSerializer,
-    GitHubRepositorySerializer, GitHubCommitStatsSerializer, QiitaArticleSerializer
+    GitHubRepositorySerializer, GitHubCommitStatsSerializer, QiitaArticleSerializer, QiitaArticleSummarySerializer,
+    PortfolioStatsSerializer, SearchResultSerializer
 )
+from .icons import catalog_version, icon_list, resolve_icon_id
+from .integrations import (
+    GITHUB_SEARCH_ACCEPT, GITHUB_TOPICS_ACCEPT, github_headers, github_url, qiita_url, upstream_request,
+    save_commit_stats, save_github_repositories, save_qiita_articles,
+)
+from .metrics import track_sync
+from .mixins import RequestProfileMixin, BulkEditMixin, ReorderMixin
 from .permissions import IsOwnerOrReadOnly
+from .portfolio_io import PortfolioImportError, export_portfolio, import_portfolio
+from .search import search_documents
+from .skill_index import parse_criterion, find_profiles
+from .throttling import AnonReadThrottle, AuthThrottle, SyncThrottle, limit_concurrent_syncs
 
 # ユーザー登録API
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthThrottle])
 def register_user(request):
     """
     新規ユーザー登録API
@@ -70,13 +82,7 @@ def register_user(request):
                 password=user_data['password']
             )
             
-            # プロフィール作成
-            UserProfile.objects.create(
-                user=user,
-                display_name=user.username,
-                title="",
-                portfolio_slug=generate_unique_portfolio_id()
-            )
+            # プロフィールはユーザー作成時に signals.py で作成される
             
             # トークン生成
             token, created = Token.objects.get_or_create(user=user)
@@ -98,7 +104,7 @@ def register_user(request):
                 }
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(RequestProfileMixin, viewsets.ModelViewSet):
     """
     ユーザープロフィールのViewSet
     """
@@ -107,36 +113,58 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
     
     def get_queryset(self):
+        queryset = UserProfile.objects.prefetch_related('qiita_articles')
         if self.request.user.is_staff:
-            return UserProfile.objects.all()
-        return UserProfile.objects.filter(user=self.request.user)
+            return queryset
+        return queryset.filter(user=self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
         
     @action(detail=False, methods=['get'])
     def me(self, request):
-        profile, created = UserProfile.objects.get_or_create(
-            user=request.user,
-            defaults={
-                'display_name': request.user.get_full_name() or request.user.username,
-                'portfolio_slug': generate_unique_portfolio_id()
-            }
-        )
-        serializer = self.get_serializer(profile)
+        serializer = self.get_serializer(self.get_profile())
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """ダッシュボード用の集計値を返す（集計行1行の読み込みのみ）"""
+        stats = get_object_or_404(PortfolioStats, profile__user=request.user)
+        return Response(PortfolioStatsSerializer(stats).data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """自分のポートフォリオ全体を NDJSON でストリーミングして返す"""
+        profile = self.get_profile()
+        response = StreamingHttpResponse(export_portfolio(profile), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="portfolio-{profile.portfolio_slug}.ndjson"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_data(self, request):
+        """export の出力（NDJSON）を1行ずつ読み込み、自分のポートフォリオを置き換える"""
+        profile = self.get_profile()
+        stream = request.stream
+        if stream is None:
+            return Response({'error': 'インポートするデータを送信してください。'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            counts = import_portfolio(profile, iter(stream.readline, b''))
+        except PortfolioImportError as e:
+            return Response({'error': str(e), 'line': e.line}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': 'インポートが完了しました。', 'counts': counts})
+
 class PublicProfileView(generics.RetrieveAPIView):
     """
     公開プロフィールビュー（認証不要）
     """
     serializer_class = UserProfilePublicSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [AnonReadThrottle]
     lookup_field = 'portfolio_slug'
     lookup_url_kwarg = 'slug'
     
     def get_queryset(self):
-        return UserProfile.objects.all().prefetch_related(
+        return UserProfile.objects.select_related('stats').prefetch_related(
             'skills__category',
             'projects__technologies_used',
             'education',
@@ -144,6 +172,144 @@ class PublicProfileView(generics.RetrieveAPIView):
             'process_experiences'
         )
 
+class PublicProfileSummaryView(generics.RetrieveAPIView):
+    """
+    公開プロフィールの集計値ビュー（認証不要、集計行1行の読み込みのみ）
+    """
+    serializer_class = PortfolioStatsSerializer
+    permission_classes = [AllowAny]
+    throttle_classes = [AnonReadThrottle]
+    lookup_field = 'profile__portfolio_slug'
+    lookup_url_kwarg = 'slug'
+    queryset = PortfolioStats.objects.all()
+
+class SearchView(APIView):
+    """
+    ポートフォリオ全文検索API（認証不要）
+
+    クエリパラメータ:
+        q: 検索語（必須）
+        kind: 絞り込む種類（profile / project / work_experience / qiita_article、複数指定可）
+        cursor: 前回のレスポンスの next
+        page_size: 1ページの件数（最大50）
+    """
+    permission_classes = [AllowAny]
+    throttle_classes = [AnonReadThrottle]
+    default_page_size = 20
+    max_page_size = 50
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        valid_kinds = {kind for kind, label in SearchDocument.KIND_CHOICES}
+        kinds = request.query_params.getlist('kind')
+        if any(kind not in valid_kinds for kind in kinds):
+            return Response({'error': f'kind must be one of {sorted(valid_kinds)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page_size = int(request.query_params.get('page_size', self.default_page_size))
+        except ValueError:
+            page_size = self.default_page_size
+        page_size = max(1, min(page_size, self.max_page_size))
+
+        try:
+            results, next_cursor = search_documents(
+                text, kinds=kinds, cursor=request.query_params.get('cursor'), limit=page_size
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'results': SearchResultSerializer(results, many=True).data,
+            'next': next_cursor,
+        })
+
+class SkillIconCatalogView(APIView):
+    """
+    スキルアイコンのカタログAPI（認証不要）
+
+    内容はデプロイ単位でしか変わらないため、カタログのバージョンを ETag にして
+    ブラウザ・CDNでキャッシュさせる（If-None-Match が一致すれば304）。
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    max_age = 24 * 60 * 60
+
+    def get(self, request):
+        etag = f'"{catalog_version()}"'
+        headers = {'ETag': etag, 'Cache-Control': f'public, max-age={self.max_age}'}
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response({'version': catalog_version(), 'icons': icon_list()}, headers=headers)
+
+class TalentSearchView(APIView):
+    """
+    スキル条件によるタレント検索API（認証不要）
+
+    クエリパラメータ:
+        skill: 'スキル名[:最低レベル[:最低経験年数]]'（複数指定でAND、例: skill=Python:4&skill=Django::3）
+        after: 前回のレスポンスの next（プロフィールID）
+        page_size: 1ページの件数（最大50）
+    """
+    permission_classes = [AllowAny]
+    throttle_classes = [AnonReadThrottle]
+    default_page_size = 20
+    max_page_size = 50
+    max_criteria = 10
+
+    def get(self, request):
+        values = request.query_params.getlist('skill')
+        if not values:
+            return Response({'error': 'skill is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(values) > self.max_criteria:
+            return Response({'error': f'skill can be specified up to {self.max_criteria} times'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            criteria = [parse_criterion(value) for value in values]
+            after = request.query_params.get('after')
+            after = int(after) if after else None
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page_size = int(request.query_params.get('page_size', self.default_page_size))
+        except ValueError:
+            page_size = self.default_page_size
+        page_size = max(1, min(page_size, self.max_page_size))
+
+        profile_ids, has_next = find_profiles(criteria, after=after, limit=page_size)
+
+        profiles = UserProfile.objects.only('id', 'display_name', 'title', 'portfolio_slug').in_bulk(profile_ids)
+        matched_skills = {}
+        entries = (SkillIndexEntry.objects
+                   .filter(profile_id__in=profile_ids, skill_key__in=[key for key, level, years in criteria])
+                   .values('profile_id', 'skill__name', 'level', 'experience_years'))
+        for entry in entries:
+            matched_skills.setdefault(entry['profile_id'], []).append({
+                'name': entry['skill__name'],
+                'level': entry['level'],
+                'experience_years': entry['experience_years'],
+            })
+
+        results = []
+        for profile_id in profile_ids:
+            profile = profiles.get(profile_id)
+            if profile is None:
+                continue
+            results.append({
+                'portfolio_slug': profile.portfolio_slug,
+                'display_name': profile.display_name,
+                'title': profile.title,
+                'matched_skills': matched_skills.get(profile_id, []),
+            })
+
+        return Response({
+            'results': results,
+            'next': profile_ids[-1] if has_next and profile_ids else None,
+        })
+
 class SkillCategoryViewSet(viewsets.ModelViewSet):
     """
     スキルカテゴリのViewSet
@@ -168,7 +334,7 @@ class SkillCategoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-class SkillViewSet(viewsets.ModelViewSet):
+class SkillViewSet(RequestProfileMixin, BulkEditMixin, ReorderMixin, viewsets.ModelViewSet):
     """
     スキルのViewSet
     """
@@ -176,24 +342,10 @@ class SkillViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_staff:
-            return Skill.objects.all()
-        try:
-            profile = UserProfile.objects.get(user=user)
-            return Skill.objects.filter(user=profile)
-        except UserProfile.DoesNotExist:
-            return Skill.objects.none()
+        return self.get_owned_queryset(Skill.objects.select_related('category'))
     
     def perform_create(self, serializer):
-        profile, created = UserProfile.objects.get_or_create(
-            user=self.request.user,
-            defaults={
-                'display_name': self.request.user.get_full_name() or self.request.user.username,
-                'portfolio_slug': generate_unique_portfolio_id()
-            }
-        )
-        serializer.save(user=profile)
+        serializer.save(user=self.get_profile())
 
     @action(detail=True, methods=['post'])
     def set_icon(self, request, pk=None):
@@ -204,16 +356,19 @@ class SkillViewSet(viewsets.ModelViewSet):
         icon_id = request.data.get('icon_id')
         if not icon_id:
             return Response({'error': 'icon_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        resolved = resolve_icon_id(icon_id)
+        if resolved is None:
+            return Response({'error': f'unknown icon_id: {icon_id}'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # アイコンIDをスキルに設定
-        skill.icon = icon_id
-        skill.save()
+        # アイコンIDをスキルに設定（画像はカタログの共有アイコンを使う）
+        skill.icon_id = resolved
+        skill.save(update_fields=['icon_id'])
         
         # 更新されたスキルを返す
         serializer = self.get_serializer(skill)
         return Response(serializer.data)
 
-class ProcessExperienceViewSet(viewsets.ModelViewSet):
+class ProcessExperienceViewSet(RequestProfileMixin, viewsets.ModelViewSet):
     """
     担当工程経験のViewSet
     """
@@ -221,24 +376,10 @@ class ProcessExperienceViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
     
     def get_queryset(self):
-        if self.request.user.is_staff:
-            return ProcessExperience.objects.all()
-        
-        try:
-            profile = UserProfile.objects.get(user=self.request.user)
-            return ProcessExperience.objects.filter(user=profile)
-        except UserProfile.DoesNotExist:
-            return ProcessExperience.objects.none()
+        return self.get_owned_queryset(ProcessExperience.objects.all())
     
     def perform_create(self, serializer):
-        profile, created = UserProfile.objects.get_or_create(
-            user=self.request.user,
-            defaults={
-                'display_name': self.request.user.get_full_name() or self.request.user.username,
-                'portfolio_slug': generate_unique_portfolio_id()
-            }
-        )
-        serializer.save(user=profile)
+        serializer.save(user=self.get_profile())
         
     @action(detail=False, methods=['post'], url_path='bulk-update')
     def bulk_update(self, request):
@@ -248,42 +389,27 @@ class ProcessExperienceViewSet(viewsets.ModelViewSet):
             return Response({'error': 'process_experiences list is required'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        profile, created = UserProfile.objects.get_or_create(
-            user=self.request.user,
-            defaults={
-                'display_name': self.request.user.get_full_name() or self.request.user.username,
-                'portfolio_slug': generate_unique_portfolio_id()
-            }
+        serializer = self.get_serializer(data=process_experiences, many=True)
+        serializer.is_valid(raise_exception=True)
+        profile = self.get_profile()
+
+        # (user, process_type) の一意制約で1回の UPSERT にまとめる（省略された項目は既定値に戻す）
+        ProcessExperience.objects.bulk_create(
+            [ProcessExperience(user=profile, **item) for item in serializer.validated_data],
+            update_conflicts=True,
+            unique_fields=['user', 'process_type'],
+            update_fields=['experience_count', 'description'],
         )
-        
-        updated_experiences = []
-        
-        for exp_data in process_experiences:
-            process_type = exp_data.get('process_type')
-            if not process_type:
-                continue
-                
-            experience_count = exp_data.get('experience_count', 0)
-            description = exp_data.get('description', '')
-            
-            # 既存のレコードを更新または新規作成
-            exp, created = ProcessExperience.objects.update_or_create(
-                user=profile,
-                process_type=process_type,
-                defaults={
-                    'experience_count': experience_count,
-                    'description': description
-                }
-            )
-            
-            updated_experiences.append(self.get_serializer(exp).data)
+        process_types = [item['process_type'] for item in serializer.validated_data]
+        experiences = ProcessExperience.objects.filter(user=profile, process_type__in=process_types)
+        updated_experiences = self.get_serializer(experiences, many=True).data
         
         return Response({
             'message': f'{len(updated_experiences)} process experiences updated',
             'process_experiences': updated_experiences
         })
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(RequestProfileMixin, BulkEditMixin, ReorderMixin, viewsets.ModelViewSet):
     """
     プロジェクトのViewSet
     """
@@ -291,26 +417,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
     
     def get_queryset(self):
-        if self.request.user.is_staff:
-            return Project.objects.all()
-        
-        try:
-            profile = UserProfile.objects.get(user=self.request.user)
-            return Project.objects.filter(user=profile)
-        except UserProfile.DoesNotExist:
-            return Project.objects.none()
+        return self.get_owned_queryset(Project.objects.prefetch_related('technologies_used__category'))
     
     def perform_create(self, serializer):
-        profile, created = UserProfile.objects.get_or_create(
-            user=self.request.user,
-            defaults={
-                'display_name': self.request.user.get_full_name() or self.request.user.username,
-                'portfolio_slug': generate_unique_portfolio_id()
-            }
-        )
-        serializer.save(user=profile)
+        serializer.save(user=self.get_profile())
 
-class EducationViewSet(viewsets.ModelViewSet):
+class EducationViewSet(RequestProfileMixin, BulkEditMixin, viewsets.ModelViewSet):
     """
     学歴のViewSet
     """
@@ -318,26 +430,12 @@ class EducationViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
     
     def get_queryset(self):
-        if self.request.user.is_staff:
-            return Education.objects.all()
-        
-        try:
-            profile = UserProfile.objects.get(user=self.request.user)
-            return Education.objects.filter(user=profile)
-        except UserProfile.DoesNotExist:
-            return Education.objects.none()
+        return self.get_owned_queryset(Education.objects.all())
     
     def perform_create(self, serializer):
-        profile, created = UserProfile.objects.get_or_create(
-            user=self.request.user,
-            defaults={
-                'display_name': self.request.user.get_full_name() or self.request.user.username,
-                'portfolio_slug': generate_unique_portfolio_id()
-            }
-        )
-        serializer.save(user=profile)
+        serializer.save(user=self.get_profile())
 
-class WorkExperienceViewSet(viewsets.ModelViewSet):
+class WorkExperienceViewSet(RequestProfileMixin, BulkEditMixin, viewsets.ModelViewSet):
     """
     職歴のViewSet
     """
@@ -345,39 +443,26 @@ class WorkExperienceViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
     
     def get_queryset(self):
-        if self.request.user.is_staff:
-            return WorkExperience.objects.all()
-        
-        try:
-            profile = UserProfile.objects.get(user=self.request.user)
-            return WorkExperience.objects.filter(user=profile)
-        except UserProfile.DoesNotExist:
-            return WorkExperience.objects.none()
+        return self.get_owned_queryset(WorkExperience.objects.prefetch_related('skills_used__category'))
     
     def perform_create(self, serializer):
-        profile, created = UserProfile.objects.get_or_create(
-            user=self.request.user,
-            defaults={
-                'display_name': self.request.user.get_full_name() or self.request.user.username,
-                'portfolio_slug': generate_unique_portfolio_id()
-            }
-        )
-        serializer.save(user=profile)
+        serializer.save(user=self.get_profile())
 
-class GitHubRepositoryViewSet(viewsets.ModelViewSet):
+class GitHubRepositoryViewSet(RequestProfileMixin, viewsets.ModelViewSet):
     """GitHubリポジトリを管理するViewSet"""
     serializer_class = GitHubRepositorySerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
 
     def get_queryset(self):
-        user_profile = get_object_or_404(UserProfile, user=self.request.user)
-        return GitHubRepository.objects.filter(user=user_profile)
+        return GitHubRepository.objects.filter(user=self.get_profile())
     
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], throttle_classes=[SyncThrottle])
+    @track_sync('github')
+    @limit_concurrent_syncs
     def sync(self, request):
         """GitHubからリポジトリ情報を同期する"""
         print("===== GitHub同期処理を開始 =====")
-        user_profile = get_object_or_404(UserProfile, user=request.user)
+        user_profile = self.get_profile()
         
         print(f"ユーザープロフィール情報: ID={user_profile.id}, ユーザー名={user_profile.user.username}")
         print(f"GitHub設定: github_username={user_profile.github_username}, access_token={bool(user_profile.github_access_token)}")
@@ -392,9 +477,8 @@ class GitHubRepositoryViewSet(viewsets.ModelViewSet):
             )
         
         # GitHubアクセストークンがあれば認証付きで、なければ認証なしで
-        headers = {}
-        if user_profile.github_access_token:
-            headers["Authorization"] = f"token {user_profile.github_access_token}"
+        headers = github_headers(user_profile)
+        if headers:
             print(f"GitHub API認証: Authorizationヘッダーを設定しました")
         else:
             print("警告: GitHub APIの認証なしでリクエストを実行します（レート制限あり）")
@@ -403,9 +487,9 @@ class GitHubRepositoryViewSet(viewsets.ModelViewSet):
         
         try:
             # GitHubユーザー情報を取得
-            user_url = f"https://api.github.com/users/{github_username}"
+            user_url = github_url(f"/users/{github_username}")
             print(f"GitHub APIリクエスト: {user_url}")
-            user_response = requests.get(user_url, headers=headers)
+            user_response = upstream_request('github', 'GET', user_url, headers=headers, timeout=settings.UPSTREAM_TIMEOUT_SECONDS)
             print(f"GitHub APIレスポンス (ユーザー情報): status={user_response.status_code}")
             
             if user_response.status_code != 200:
@@ -420,9 +504,9 @@ class GitHubRepositoryViewSet(viewsets.ModelViewSet):
             print(f"GitHubユーザー情報: login={user_data.get('login')}, name={user_data.get('name')}, public_repos={user_data.get('public_repos')}")
             
             # リポジトリ一覧を取得
-            repos_url = f"https://api.github.com/users/{github_username}/repos?per_page=100"
+            repos_url = github_url(f"/users/{github_username}/repos?per_page=100")
             print(f"GitHub APIリクエスト: {repos_url}")
-            repos_response = requests.get(repos_url, headers=headers)
+            repos_response = upstream_request('github', 'GET', repos_url, headers=headers, timeout=settings.UPSTREAM_TIMEOUT_SECONDS)
             print(f"GitHub APIレスポンス (リポジトリ一覧): status={repos_response.status_code}")
             
             if repos_response.status_code != 200:
@@ -443,81 +527,26 @@ class GitHubRepositoryViewSet(viewsets.ModelViewSet):
                 sample_repo = repos_data[0]
                 print(f"サンプルリポジトリ: name={sample_repo.get('name')}, full_name={sample_repo.get('full_name')}, private={sample_repo.get('private')}")
             
-            # 既存のリポジトリIDリスト（同期後に不要なものを削除するため）
-            existing_repos = list(GitHubRepository.objects.filter(
-                user=user_profile
-            ).values_list('full_name', flat=True))
-            print(f"DB上の既存リポジトリ数: {len(existing_repos)}")
-            
-            synced_repos = []
-            
-            # 各リポジトリを処理
+            repositories = []
             for repo_data in repos_data:
                 print(f"リポジトリを処理中: {repo_data.get('full_name')}")
-                # リポジトリの言語を取得
-                languages_url = repo_data.get('languages_url')
-                languages_data = {}
-                
-                if languages_url:
-                    languages_response = requests.get(languages_url, headers=headers)
-                    if languages_response.status_code == 200:
-                        languages_data = languages_response.json()
-                        print(f"  言語情報: {list(languages_data.keys())[:5]}")
-                    else:
-                        print(f"  警告: 言語情報の取得に失敗: status={languages_response.status_code}")
-                
                 # トピックを取得（GitHubAPIv3では別エンドポイントが必要）
                 topics = []
-                topics_url = f"https://api.github.com/repos/{repo_data['full_name']}/topics"
+                topics_url = github_url(f"/repos/{repo_data['full_name']}/topics")
                 topics_headers = headers.copy()
-                topics_headers["Accept"] = "application/vnd.github.mercy-preview+json"
+                topics_headers["Accept"] = GITHUB_TOPICS_ACCEPT
                 
-                topics_response = requests.get(topics_url, headers=topics_headers)
+                topics_response = upstream_request('github', 'GET', topics_url, headers=topics_headers, timeout=settings.UPSTREAM_TIMEOUT_SECONDS)
                 if topics_response.status_code == 200:
                     topics_data = topics_response.json()
                     topics = topics_data.get('names', [])
                     print(f"  トピック: {topics[:5]}")
                 else:
                     print(f"  警告: トピック情報の取得に失敗: status={topics_response.status_code}")
-                
-                try:
-                    # DBに保存または更新
-                    repo, created = GitHubRepository.objects.update_or_create(
-                        user=user_profile,
-                        full_name=repo_data['full_name'],
-                        defaults={
-                            'name': repo_data['name'],
-                            'html_url': repo_data['html_url'],
-                            'description': repo_data['description'] or '',
-                            'language': repo_data['language'] or '',
-                            'stargazers_count': repo_data['stargazers_count'],
-                            'forks_count': repo_data['forks_count'],
-                            'open_issues_count': repo_data['open_issues_count'],
-                            'watchers_count': repo_data['watchers_count'],
-                            'created_at': datetime.strptime(repo_data['created_at'], '%Y-%m-%dT%H:%M:%SZ'),
-                            'updated_at': datetime.strptime(repo_data['updated_at'], '%Y-%m-%dT%H:%M:%SZ'),
-                            'pushed_at': datetime.strptime(repo_data['pushed_at'], '%Y-%m-%dT%H:%M:%SZ') if repo_data['pushed_at'] else None,
-                            'topics': topics,
-                            'is_fork': repo_data['fork'],
-                            'is_private': repo_data['private'],
-                        }
-                    )
-                    print(f"  DB保存結果: {'作成' if created else '更新'}")
-                    synced_repos.append(repo_data['full_name'])
-                except Exception as e:
-                    print(f"  エラー: リポジトリのDB保存中に例外発生: {str(e)}")
-            
-            # 同期されなかったリポジトリを削除（リモートで削除された場合）
-            deleted_count = 0
-            for repo_name in existing_repos:
-                if repo_name not in synced_repos:
-                    GitHubRepository.objects.filter(
-                        user=user_profile, 
-                        full_name=repo_name
-                    ).delete()
-                    deleted_count += 1
-            
-            print(f"削除されたリポジトリ数: {deleted_count}")
+                repositories.append((repo_data, topics))
+            
+            # DBに保存または更新し、同期されなかったリポジトリ（リモートで削除されたもの）を削除
+            synced_repos = save_github_repositories(user_profile, repositories)
             
             # コミット統計情報を取得・更新
             print("コミット統計情報の同期を開始")
@@ -550,51 +579,19 @@ class GitHubRepositoryViewSet(viewsets.ModelViewSet):
         github_username = user_profile.github_username
         
         try:
-            # 貢献度グラフ用のデータを取得（GitHub API v3では取得できないため、別方法が必要）
-            current_year = datetime.now().year
-            year_stats = {}
-            
             # ユーザーの総コミット数を概算（上限あり）
-            search_commits_url = f"https://api.github.com/search/commits?q=author:{github_username}"
+            search_commits_url = github_url(f"/search/commits?q=author:{github_username}")
             search_headers = headers.copy()
-            search_headers["Accept"] = "application/vnd.github.cloak-preview+json"
+            search_headers["Accept"] = GITHUB_SEARCH_ACCEPT
             
-            commits_response = requests.get(search_commits_url, headers=search_headers)
+            commits_response = upstream_request('github', 'GET', search_commits_url, headers=search_headers, timeout=settings.UPSTREAM_TIMEOUT_SECONDS)
             total_commits = 0
             
             if commits_response.status_code == 200:
                 commits_data = commits_response.json()
                 total_commits = commits_data.get('total_count', 0)
             
-            # 言語使用統計を計算
-            repos = GitHubRepository.objects.filter(user=user_profile, is_fork=False)
-            languages_count = {}
-            
-            for repo in repos:
-                if repo.language and repo.language not in ['', 'null', 'None']:
-                    if repo.language in languages_count:
-                        languages_count[repo.language] += 1
-                    else:
-                        languages_count[repo.language] = 1
-            
-            # 月別コントリビューション（簡易的な実装）
-            monthly_contributions = {
-                '01': 0, '02': 0, '03': 0, '04': 0, '05': 0, '06': 0,
-                '07': 0, '08': 0, '09': 0, '10': 0, '11': 0, '12': 0
-            }
-            
-            # 統計情報をDBに保存
-            github_stats, created = GitHubCommitStats.objects.update_or_create(
-                user=user_profile,
-                defaults={
-                    'commit_count_total': total_commits,
-                    'commit_count_last_year': min(total_commits, 1000),  # 概算
-                    'contributions_by_month': monthly_contributions,
-                    'languages_used': languages_count
-                }
-            )
-            
-            return github_stats
+            return save_commit_stats(user_profile, total_commits)
             
         except Exception as e:
             # エラーがあっても処理は続行（ログに記録）
@@ -616,6 +613,8 @@ class CustomObtainAuthToken(ObtainAuthToken):
     """
     CSRF保護を無効化したトークン認証ビュー
     """
+    throttle_classes = [AuthThrottle]
+
     @csrf_exempt
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
@@ -664,7 +663,8 @@ def github_oauth_callback(request):
         
         # GitHubからアクセストークンを取得
         print(f"GitHub APIリクエスト: {token_url}")
-        response = requests.post(
+        response = upstream_request(
+            'github', 'POST',
             token_url,
             data={
                 'client_id': client_id,
@@ -695,7 +695,8 @@ def github_oauth_callback(request):
         if access_token:
             user_url = "https://api.github.com/user"
             print(f"GitHub APIリクエスト (ユーザー情報): {user_url}")
-            user_response = requests.get(
+            user_response = upstream_request(
+                'github', 'GET',
                 user_url,
                 headers={"Authorization": f"token {access_token}"}
             )
@@ -730,7 +731,7 @@ def github_oauth_callback(request):
         print(traceback.format_exc())
         return HttpResponseRedirect(f"{settings.FRONTEND_URL}/dashboard/github?error=server_error")
 
-class QiitaArticleViewSet(viewsets.ModelViewSet):
+class QiitaArticleViewSet(RequestProfileMixin, viewsets.ModelViewSet):
     """
     Qiita記事を管理するViewSet
     """
@@ -738,20 +739,27 @@ class QiitaArticleViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
     
     def get_queryset(self):
-        if self.request.user.is_staff:
-            return QiitaArticle.objects.all()
-        try:
-            profile = UserProfile.objects.get(user=self.request.user)
-            return QiitaArticle.objects.filter(user=profile)
-        except UserProfile.DoesNotExist:
-            return QiitaArticle.objects.none()
+        # 本文は別テーブルのため、一覧では読み込まず、詳細・更新時だけ結合で取得する
+        queryset = QiitaArticle.objects.all()
+        if self.action != 'list':
+            queryset = queryset.select_related('body')
+        return self.get_owned_queryset(queryset)
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return QiitaArticleSummarySerializer
+        return QiitaArticleSerializer
     
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], throttle_classes=[SyncThrottle])
+    @track_sync('qiita')
+    @limit_concurrent_syncs
     def sync(self, request):
         """Qiitaから記事を同期する"""
         try:
             # ユーザープロフィールを取得
-            profile = UserProfile.objects.get(user=request.user)
+            profile = request.profile
+            if profile is None:
+                raise UserProfile.DoesNotExist
             
             # Qiitaユーザー名とアクセストークンを確認
             if not profile.qiita_username or not profile.qiita_access_token:
@@ -760,15 +768,12 @@ class QiitaArticleViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Qiita APIのヘッダー設定
-            headers = {
-                "Authorization": f"Bearer {profile.qiita_access_token}"
-            }
-            
             # 自分の記事を取得（最大100件）
-            response = requests.get(
-                f"https://qiita.com/api/v2/users/{profile.qiita_username}/items?per_page=100",
-                headers=headers
+            response = upstream_request(
+                'qiita', 'GET',
+                qiita_url(f"/users/{profile.qiita_username}/items?per_page=100"),
+                headers={"Authorization": f"Bearer {profile.qiita_access_token}"},
+                timeout=settings.UPSTREAM_TIMEOUT_SECONDS
             )
             
             if response.status_code != 200:
@@ -777,37 +782,8 @@ class QiitaArticleViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            articles_data = response.json()
-            
-            # 記事を同期
-            synced_count = 0
-            
-            for article_data in articles_data:
-                # 記事のIDを取得
-                article_id = article_data["id"]
-                
-                # タグ情報を整形
-                tags = [tag.get("name") for tag in article_data.get("tags", [])]
-                
-                # 記事を更新または作成
-                article, created = QiitaArticle.objects.update_or_create(
-                    user=profile,
-                    article_id=article_id,
-                    defaults={
-                        "title": article_data["title"],
-                        "url": article_data["url"],
-                        "likes_count": article_data["likes_count"],
-                        "stocks_count": article_data.get("stocks_count", 0),
-                        "comments_count": article_data["comments_count"],
-                        "created_at": article_data["created_at"],
-                        "updated_at": article_data["updated_at"],
-                        "tags": tags,
-                        "body_md": article_data.get("body", ""),
-                        "body_html": article_data.get("rendered_body", "")
-                    }
-                )
-                
-                synced_count += 1
+            # 記事を同期（本文は別テーブルへまとめてupsertする）
+            synced_count = save_qiita_articles(profile, response.json())
             
             return Response({
                 "success": True,
@@ -0,0 +1,52 @@
+"""
+gunicorn の設定（起動コマンドは `gunicorn` のみ。このファイルはカレントディレクトリから自動で読み込まれる）
+
+既定は従来どおり WSGI の同期ワーカー。GitHub・Qiita の同期のように外部APIの応答を待つリクエストが多い場合は、
+ASGI で uvicorn ワーカーを使い、非同期版のビュー（api/async_views.py）を有効にする:
+
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker ASYNC_VIEWS=True gunicorn
+
+同期ワーカーは1プロセスで1リクエストずつしか処理できないため、応答の遅い外部APIを待つ間はワーカーが埋まる。
+uvicorn ワーカーはイベントループで待つため、同じワーカー数で外部APIを待つリクエストを多数同時に処理できる
+（比較は fake_upstream と bench_sync_concurrency コマンドで行う）。
+
+/metrics（api/metrics.py）は、各ワーカーが PROMETHEUS_MULTIPROC_DIR に書き込んだ値を合算して返す。
+"""
+import os
+import shutil
+import tempfile
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '8000')}")
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '2'))
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+
+# uvicorn ワーカーは ASGI のアプリケーションを、それ以外は WSGI のアプリケーションを読み込む
+if worker_class.startswith('uvicorn.'):
+    wsgi_app = 'portfolio_backend.asgi:application'
+else:
+    wsgi_app = 'portfolio_backend.wsgi:application'
+
+# ワーカーより先に設定し、ワーカーで prometheus_client のマルチプロセスモードを有効にする
+if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='prometheus-')
+
+
+def on_starting(server):
+    # 前回の起動で残った値を合算しないよう、空のディレクトリから始める
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    # 終了したワーカーの Gauge（live モード）の値を集計から外す
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
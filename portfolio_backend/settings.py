@@ -63,6 +63,8 @@ GITHUB_CLIENT_SECRET = '*****09d8d924'  # 本番環境では環境変数から
 FRONTEND_URL = 'https://portfolio-create-front.vercel.app'
 
 MIDDLEWARE = [
+    'api.timing.RequestTimingMiddleware',  # 他のミドルウェアのDBクエリも計測するため先頭に置く
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -72,6 +74,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'portfolio_backend.urls'
@@ -125,6 +128,42 @@ DATABASES = {
     }
 }
 
+# リードレプリカ（カンマ区切りのデータベースURL）。公開エンドポイントの読み込みのみ振り分ける
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(replica_url.strip())
+    # テストではプライマリのテストDBをそのまま参照する
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
+
+# レプリカから読み込んでよいURL名
+REPLICA_READ_ROUTES = ['public-profile', 'public-profile-summary']
+
+# 書き込み後にプライマリへ固定する秒数（レプリカの遅延より長くする）
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '10'))
+
+# キャッシュ（REDIS_URL があればプロセス間で共有されるRedis、なければプロセス内メモリ）
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# トークン認証の結果をキャッシュする秒数（プロセス内メモリの場合は他プロセスの無効化が届かないため短くする）
+AUTH_TOKEN_CACHE_SECONDS = int(os.getenv('AUTH_TOKEN_CACHE_SECONDS', '60'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -161,17 +200,80 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+STORAGES = {
+    # アップロードファイルは内容のハッシュで命名して重複を保存しない（参照されなくなったものは gc_media で削除）
+    'default': {
+        'BACKEND': 'api.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# スキルアイコンのカタログ（api/data/skill_icons.json）の画像の配信元。自前で配信する場合は static 以下などに変更する
+SKILL_ICON_BASE_URL = os.getenv('SKILL_ICON_BASE_URL', 'https://cdn.jsdelivr.net/gh/devicons/devicon@v2.16.0/icons/')
 
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',  # 認証されていないユーザーも読み取り可能に
     ],
+    # 一覧はキーセット方式でページングする（?page_size= で変更可能、上限は KeysetPagination.max_page_size）
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
+    # api/throttling.py のトークンバケットのレート（'N/期間' = 最大N回連続、期間あたりN回まで補充）
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.getenv('THROTTLE_RATE_ANON', '120/min'),  # 未認証の公開読み込み（IPごと）
+        'auth': os.getenv('THROTTLE_RATE_AUTH', '10/min'),  # 登録・ログイン（IPごと）
+        'sync': os.getenv('THROTTLE_RATE_SYNC', '5/hour'),  # GitHub・Qiita同期（ユーザーごと）
+    },
+    # X-Forwarded-For からクライアントのIPを取り出すため、手前のプロキシの数を指定する
+    'NUM_PROXIES': int(os.environ['NUM_PROXIES']) if os.getenv('NUM_PROXIES') else None,
+}
+
+# プロセスごとの同期処理の同時実行数の上限と、上限に達したときの Retry-After（秒）
+SYNC_MAX_CONCURRENT = int(os.getenv('SYNC_MAX_CONCURRENT', '2'))
+SYNC_RETRY_AFTER_SECONDS = int(os.getenv('SYNC_RETRY_AFTER_SECONDS', '10'))
+
+# GitHub・Qiita APIの配信元（ベンチマークでは遅延を入れた擬似サーバーに向ける）と、1回の呼び出しのタイムアウト（秒）
+GITHUB_API_BASE_URL = os.getenv('GITHUB_API_BASE_URL', 'https://api.github.com')
+QIITA_API_BASE_URL = os.getenv('QIITA_API_BASE_URL', 'https://qiita.com/api/v2')
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv('UPSTREAM_TIMEOUT_SECONDS', '10'))
+
+# 非同期版のビュー（api/async_views.py）を使うかどうか。ASGI（uvicorn ワーカー）で起動する場合に有効にする
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+# 非同期版の同期処理の、イベントループごとの同時実行数の上限と、1回の同期で並行して呼び出す外部APIの数
+ASYNC_SYNC_MAX_CONCURRENT = int(os.getenv('ASYNC_SYNC_MAX_CONCURRENT', '50'))
+SYNC_UPSTREAM_CONCURRENCY = int(os.getenv('SYNC_UPSTREAM_CONCURRENCY', '8'))
+
+# リクエストの処理時間の内訳（api/timing.py）を計測するリクエストの割合（0〜1）と、Server-Timing ヘッダーを付けるかどうか
+# 計測するリクエストは全クエリをラッパー経由で実行するため、本番の既定値は1%にする（DEBUG では全件）
+REQUEST_TIMING_SAMPLE_RATE = float(os.getenv('REQUEST_TIMING_SAMPLE_RATE', '1.0' if DEBUG else '0.01'))
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'True') == 'True'
+# 計測したリクエストのうちログに出力する割合と、割合によらずログに出力する遅いリクエストのしきい値（ミリ秒）
+REQUEST_TIMING_LOG_SAMPLE_RATE = float(os.getenv('REQUEST_TIMING_LOG_SAMPLE_RATE', '0.01'))
+REQUEST_TIMING_SLOW_MS = float(os.getenv('REQUEST_TIMING_SLOW_MS', '1000'))
+
+# Prometheus 形式のメトリクス（api/metrics.py の /metrics）。METRICS_TOKEN の Bearer トークンを要求する
+# （METRICS_TOKEN が空の場合、/metrics は DEBUG のときだけ応答し、それ以外は 404 を返す）
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # 1行に1つのJSONを出力する
+        'api.timing': {'handlers': ['console'], 'level': os.getenv('REQUEST_TIMING_LOG_LEVEL', 'INFO'), 'propagate': False},
+    },
 }
 
 # CORS settings
@@ -203,6 +305,9 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# フロントエンドから処理時間の内訳を読めるようにする
+CORS_EXPOSE_HEADERS = ['Server-Timing']
+
 # CSRF設定
 CSRF_TRUSTED_ORIGINS = [
     'https://portfolio-create-front.vercel.app',
@@ -221,6 +326,32 @@ CSRF_EXEMPT_URLS = [
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# api/media.py の serve_media でアップロードファイルを配信するかどうか
+SERVE_MEDIA = os.getenv('SERVE_MEDIA', 'True') == 'True'
+
+# アップロードの上限（api/uploads.py）。FILE_UPLOAD_MAX_MEMORY_SIZE を超えるファイルは一時ファイルに書き出す
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', str(1024 * 1024)))
+FILE_UPLOAD_HANDLERS = [
+    'api.uploads.UploadSizeLimitHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', str(10 * 1024 * 1024)))  # 受信を打ち切るサイズ
+IMAGE_UPLOAD_MAX_SIZE = int(os.getenv('IMAGE_UPLOAD_MAX_SIZE', str(5 * 1024 * 1024)))
+SKILL_ICON_UPLOAD_MAX_SIZE = int(os.getenv('SKILL_ICON_UPLOAD_MAX_SIZE', str(1024 * 1024)))
+RESUME_UPLOAD_MAX_SIZE = int(os.getenv('RESUME_UPLOAD_MAX_SIZE', str(10 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', '40000000'))  # Pillow の MAX_IMAGE_PIXELS にも設定する
+# 長辺がこれを超える画像はアップロード時に縮小する
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', '2560'))
+IMAGE_DOWNSCALE_ON_UPLOAD = os.getenv('IMAGE_DOWNSCALE_ON_UPLOAD', 'True') == 'True'
+
+# アップロード画像の縮小版（api/images.py）を作成するワーカースレッド数と、コミット後に別スレッドで作成するかどうか
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', '2'))
+IMAGE_VARIANTS_ASYNC = os.getenv('IMAGE_VARIANTS_ASYNC', 'True') == 'True'
+
+# 記事本文などの大きなテキストをzlib圧縮して保存するかどうか
+TEXT_COMPRESSION_ENABLED = os.getenv('TEXT_COMPRESSION_ENABLED', 'True') == 'True'
+TEXT_COMPRESSION_LEVEL = int(os.getenv('TEXT_COMPRESSION_LEVEL', '6'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field